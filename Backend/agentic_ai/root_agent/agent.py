@@ -4,11 +4,7 @@ from rag_agent import rag_agent_ncert, rag_agent_kts
 from search_agent import search_agent_tool
 from imagen_agent import imagen_agent_tool
 
-root_agent = Agent(
-    name="RootAgent",
-    model="gemini-2.5-flash",
-    description="Agent to interact with the user and answer their questions.",
-    instruction='''
+ROOT_INSTRUCTION = '''
     # ROLE
     You are a smart dispatcher agent. If the user asks you to explain a image do it with your inherent ability or using search_agent_tool. Your primary function is to analyze the user's request and route it to the most appropriate tool. You must use one of the available tools to answer the user. 
 
@@ -30,8 +26,41 @@ root_agent = Agent(
     2.  Based on the query's nature, choose between `search_agent_tool` for simple facts and `rag_agent_ncert` or `rag_agent_kts` for Textbook related questions or `imagen_agent_tool` for image generation.
     3.  Invoke the chosen agent with the user's query.
     4.  Directly return the output of the invoked tool to the user.
-    ''',
-    # tools=[agent_tool.AgentTool(agent=search_agent_tool), agent_tool.AgentTool(agent=rag_agent_ncert),agent_tool.AgentTool(agent=rag_agent_kts), agent_tool.AgentTool(agent=imagen_agent)],
-    tools=[agent_tool.AgentTool(agent=search_agent_tool), agent_tool.AgentTool(agent=rag_agent_ncert),agent_tool.AgentTool(agent=rag_agent_kts), agent_tool.AgentTool(agent=imagen_agent_tool)],
-    # tools=[agent_tool.AgentTool(agent=search_agent_tool), agent_tool.AgentTool(agent=rag_agent_ncert),agent_tool.AgentTool(agent=rag_agent_kts), generate_images],
-)
+    '''
+
+
+def build_root_agent(extra_instruction="", model="gemini-2.5-flash"):
+    """
+    Build a RootAgent. extra_instruction is appended to the dispatcher instruction, so
+    per-conversation context (e.g. the Sahayak mentor preamble) can live in the agent
+    instead of being repeated in every message.
+    """
+    return Agent(
+        name="RootAgent",
+        model=model,
+        description="Agent to interact with the user and answer their questions.",
+        instruction=ROOT_INSTRUCTION + extra_instruction,
+        # tools=[agent_tool.AgentTool(agent=search_agent_tool), agent_tool.AgentTool(agent=rag_agent_ncert),agent_tool.AgentTool(agent=rag_agent_kts), agent_tool.AgentTool(agent=imagen_agent)],
+        tools=[agent_tool.AgentTool(agent=search_agent_tool), agent_tool.AgentTool(agent=rag_agent_ncert),agent_tool.AgentTool(agent=rag_agent_kts), agent_tool.AgentTool(agent=imagen_agent_tool)],
+        # tools=[agent_tool.AgentTool(agent=search_agent_tool), agent_tool.AgentTool(agent=rag_agent_ncert),agent_tool.AgentTool(agent=rag_agent_kts), generate_images],
+    )
+
+
+root_agent = build_root_agent()
+
+
+# Sub-agents RootAgent dispatches to, by tool name; intent_router.py may run them directly
+ROUTE_AGENTS = {
+    "search_agent_tool": search_agent_tool,
+    "rag_agent_ncert": rag_agent_ncert,
+    "rag_agent_kts": rag_agent_kts,
+    "imagen_agent_tool": imagen_agent_tool,
+}
+
+
+def build_route_agent(route, extra_instruction=""):
+    """A copy of the sub-agent for `route` with extra_instruction appended to its instruction."""
+    agent = ROUTE_AGENTS[route]
+    if not extra_instruction:
+        return agent
+    return agent.clone(update={"instruction": agent.instruction + extra_instruction})
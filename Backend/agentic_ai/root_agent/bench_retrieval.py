@@ -0,0 +1,113 @@
+"""
+Benchmark: recall@k and search latency of vector, BM25 and hybrid (RRF) retrieval
+over a local index built with build_local_index.py.
+
+Queries come from a JSONL file of {"query": ..., "relevant": [chunk id, ...]}
+records. Without one, queries are sampled from the index itself: a run of
+words from the middle of a chunk, with that chunk as the only relevant result.
+Sampled queries are verbatim text, which favours the lexical index; label real
+teacher questions for a fair comparison.
+
+Queries are embedded once up front (that cost is reported separately), so the
+latencies are search time only. Vector and hybrid search use the distance
+threshold of the RAG tools; "empty" is the share of queries that return no
+result at all, which is when the RAG agent answers "No matching result".
+
+Usage (from root_agent/):
+    python bench_retrieval.py <index_dir> [queries.jsonl] [number_of_sampled_queries]
+"""
+import asyncio
+import json
+import random
+import sys
+import time
+
+import numpy as np
+
+import config
+from embeddings import Embedder
+from local_retrieval import LocalVectorIndex
+
+KS = (1, 5, 10)
+QUERY_WORDS = 8
+EMBED_BATCH_SIZE = 100
+MAX_DISTANCE = 0.6  # vector_distance_threshold of the textbook RAG tools (rag_agent.py)
+
+
+def sample_queries(index, count, seed=0):
+    rng = random.Random(seed)
+    queries = []
+    for row in rng.sample(range(len(index)), min(count, len(index))):
+        words = index.chunks[row]["text"].split()
+        if len(words) < QUERY_WORDS:
+            continue
+        start = rng.randrange(0, len(words) - QUERY_WORDS + 1)
+        queries.append({"query": " ".join(words[start:start + QUERY_WORDS]), "relevant": [index.chunks[row]["id"]]})
+    return queries
+
+
+def load_queries(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run(label, search, queries, vectors, index):
+    found = {k: 0.0 for k in KS}
+    timings = []
+    empty = 0
+    for query, vector in zip(queries, vectors):
+        started = time.perf_counter()
+        rows = search(query["query"], vector)
+        timings.append(time.perf_counter() - started)
+        empty += not rows
+        ids = [index.chunks[row]["id"] for row in rows]
+        relevant = set(query["relevant"])
+        for k in KS:
+            found[k] += len(relevant.intersection(ids[:k])) / len(relevant)
+    timings = np.array(timings) * 1000
+    recall = "  ".join(f"recall@{k} {found[k] / len(queries):.3f}" for k in KS)
+    print(f"{label:<8} {recall}   empty {empty / len(queries):6.1%}   "
+          f"p50 {np.percentile(timings, 50):7.2f} ms  p95 {np.percentile(timings, 95):7.2f} ms")
+
+
+async def embed_queries(embedder, texts):
+    batches = [
+        await embedder.embed(texts[start:start + EMBED_BATCH_SIZE], task_type="RETRIEVAL_QUERY")
+        for start in range(0, len(texts), EMBED_BATCH_SIZE)
+    ]
+    return np.concatenate(batches)
+
+
+def main(index_dir, queries_path=None, sample_count=200):
+    index = LocalVectorIndex(index_dir)
+    queries = load_queries(queries_path) if queries_path else sample_queries(index, sample_count)
+    if not queries:
+        raise SystemExit("No queries to run")
+    top_k = max(KS)
+
+    started = time.perf_counter()
+    embedder = Embedder(index.manifest["embedding_model"])
+    vectors = asyncio.run(embed_queries(embedder, [query["query"] for query in queries]))
+    embed_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    started = time.perf_counter()
+    index.lexical
+    lexical_ms = (time.perf_counter() - started) * 1000
+
+    print(f"{len(index)} chunks, {len(queries)} queries, embedding {embed_ms:.1f} ms/query, "
+          f"BM25 index loaded in {lexical_ms:.0f} ms ({index.lexical.nbytes() / 1024 / 1024:.1f} MiB)")
+    run("vector", lambda text, vector: [row for row, _ in index.search(vector, top_k, MAX_DISTANCE)[0]], queries, vectors, index)
+    run("bm25", lambda text, vector: [row for row, _ in index.lexical.search(text, top_k)], queries, vectors, index)
+    run("hybrid", lambda text, vector: [
+        row for row, _, _ in index.hybrid_search(
+            text, vector, top_k, MAX_DISTANCE, candidates=config.RAG_HYBRID_CANDIDATES, rrf_k=config.RAG_RRF_K
+        )
+    ], queries, vectors, index)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit(__doc__)
+    queries_arg = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].isdigit() else None
+    count_arg = int(sys.argv[-1]) if len(sys.argv) > 2 and sys.argv[-1].isdigit() else 200
+    main(sys.argv[1], queries_arg, count_arg)
@@ -0,0 +1,63 @@
+"""
+Microbenchmark: one Runner per session vs. the shared Runner pool in SessionManager.
+
+Measures the allocation cost of opening a session (time per session and
+tracemalloc bytes per session) for both strategies. No LLM calls are made.
+
+Usage (from root_agent/):
+    python bench_session_runners.py [number_of_sessions]
+"""
+import asyncio
+import contextlib
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+warnings.filterwarnings("ignore")
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from agent import root_agent
+from session_manager import APP_NAME, SessionManager
+
+
+async def per_session_runners(count):
+    """The previous strategy: create the session and a dedicated Runner for every session."""
+    session_service = InMemorySessionService()
+    runners = {}
+    for i in range(count):
+        await session_service.create_session(app_name=APP_NAME, user_id="bench_user", session_id=f"s{i}")
+        runners[f"s{i}"] = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
+    return runners
+
+
+async def pooled_runners(count):
+    manager = SessionManager(root_agent, max_sessions=count + 1, max_sessions_per_user=count + 1)
+    for i in range(count):
+        await manager.get_or_create_runner("bench_user", f"s{i}")
+    return manager
+
+
+def measure(label, factory, count):
+    # Session creation logs one line per session; keep it out of the benchmark output
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = asyncio.run(factory(count))
+        elapsed = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    print(
+        f"{label:<20} {count} sessions: {elapsed * 1e6 / count:8.1f} us/session, "
+        f"{current / count / 1024:7.2f} KiB/session retained, peak {peak / 1024 / 1024:6.2f} MiB"
+    )
+    return result
+
+
+if __name__ == "__main__":
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    measure("runner per session", per_session_runners, sessions)
+    measure("shared runner pool", pooled_runners, sessions)
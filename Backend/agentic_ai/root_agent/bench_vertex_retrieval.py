@@ -0,0 +1,126 @@
+"""
+Benchmark: end-to-end latency of a textbook RAG agent answer with Vertex AI's
+built-in retrieval (the default) vs. retrieval as a function call through
+ShardedVertexRagRetrieval (RAG_VERTEX_BUILTIN_RETRIEVAL=false).
+
+The function-call path adds a model round trip (the model asks for the
+search, then answers from the returned chunks) but sends results through the
+retrieval cache and the context packer. It is run twice over the queries:
+cold (empty cache) and warm (every retrieval served from the cache), so the
+saving of the cache can be weighed against the extra round trip. Only switch
+the default when the warm and cold numbers together beat the built-in path
+for the expected cache hit rate (see "retrieval_cache" in /api/metrics).
+
+Every answer runs in a fresh session of a single RAG agent on the same model
+as rag_agent.py. Needs the same Vertex AI credentials as the app.
+
+Usage (from root_agent/):
+    python bench_vertex_retrieval.py [ncert|kts] [queries.txt]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+warnings.filterwarnings("ignore")
+
+import numpy as np
+from google.adk.agents import Agent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+import config
+from context_packing import ContextPacker
+from corpora import NCERT, RAG_CORPORA
+from retrieval_cache import RetrievalCache
+from vertex_retrieval import ShardedVertexRagRetrieval
+
+MODEL = "gemini-2.5-flash"  # model of the RAG agents in rag_agent.py
+DEFAULT_QUERIES = [
+    "Explain photosynthesis for class 7 science",
+    "What are the parts of a flower? Class 6 science",
+    "Explain the water cycle for grade 5",
+    "What is a fraction? Class 4 mathematics",
+    "Why do we have seasons? Class 8 science",
+]
+
+
+def build_agent(curriculum, builtin, cache):
+    retrieval = ShardedVertexRagRetrieval(
+        name=f"retrieve {curriculum} textbook" if builtin else f"retrieve_{curriculum}_textbook",
+        description=(
+            f"Use this tool to retrieve documentation and reference materials for the question from the "
+            f"{curriculum.upper()} Textbook corpus,"
+        ),
+        rag_corpus=RAG_CORPORA[curriculum],
+        similarity_top_k=10,
+        vector_distance_threshold=0.6,
+        cache=cache,
+        packer=ContextPacker(),
+        builtin_retrieval=builtin,
+        distance_metric=config.RAG_VERTEX_DISTANCE_METRIC,
+    )
+    return Agent(
+        name=f"bench_rag_agent_{curriculum}",
+        model=MODEL,
+        instruction="You are an expert researcher. You always stick to the facts.",
+        tools=[retrieval],
+    )
+
+
+async def answer(agent, query):
+    """Returns (seconds until the final response, model calls made)."""
+    session_service = InMemorySessionService()
+    runner = Runner(agent=agent, app_name="bench", session_service=session_service)
+    session = await session_service.create_session(app_name="bench", user_id="bench_user")
+    content = types.Content(role="user", parts=[types.Part(text=query)])
+    model_calls = 0
+    started = time.perf_counter()
+    async for event in runner.run_async(user_id="bench_user", session_id=session.id, new_message=content):
+        if event.usage_metadata:
+            model_calls += 1
+        if event.is_final_response():
+            break
+    return time.perf_counter() - started, model_calls
+
+
+async def run(label, agent, queries):
+    timings, calls = [], []
+    for query in queries:
+        try:
+            seconds, model_calls = await answer(agent, query)
+        except Exception as e:
+            print(f"{label}: {query!r} failed: {e}")
+            continue
+        timings.append(seconds)
+        calls.append(model_calls)
+    if not timings:
+        return
+    timings = np.array(timings) * 1000
+    print(f"{label:<16} p50 {np.percentile(timings, 50):7.0f} ms  p95 {np.percentile(timings, 95):7.0f} ms  "
+          f"{np.mean(calls):.1f} model calls/answer  ({len(timings)} queries)")
+
+
+async def main(curriculum, queries):
+    await run("builtin", build_agent(curriculum, True, None), queries)
+    with tempfile.TemporaryDirectory() as directory:
+        cache = RetrievalCache(os.path.join(directory, "retrieval_cache.sqlite3"))
+        agent = build_agent(curriculum, False, cache)
+        await run("function, cold", agent, queries)
+        await run("function, warm", agent, queries)
+        print(f"retrieval cache: {cache.stats()['hit_rate']:.0%} hit rate")
+
+
+if __name__ == "__main__":
+    curriculum_arg = sys.argv[1] if len(sys.argv) > 1 else NCERT
+    if curriculum_arg not in RAG_CORPORA:
+        raise SystemExit(__doc__)
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], encoding="utf-8") as f:
+            queries_arg = [line.strip() for line in f if line.strip()]
+    else:
+        queries_arg = DEFAULT_QUERIES
+    asyncio.run(main(curriculum_arg, queries_arg))
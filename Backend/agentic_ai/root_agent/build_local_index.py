@@ -0,0 +1,143 @@
+"""
+Build a local retrieval index (see local_retrieval.py) from textbook files.
+
+PDFs are read page by page; .txt and .md files as a whole. Text is split into
+overlapping chunks on whitespace, embedded with RETRIEVAL_DOCUMENT embeddings
+and written as manifest.json, embeddings.npy and chunks.jsonl. The file name
+without its extension (e.g. ncert_class10_english_part1) is kept as each
+chunk's source, and the grade, subject and part parsed from it (see
+corpora.parse_book_name) as its metadata.
+
+Chunks are stored grouped by (grade, subject), so each shard is one
+contiguous row range; the manifest's "shards" maps "<grade>/<subject>" to
+[start, stop). Books that don't follow the naming convention come last and
+are only searched when no shard applies. A BM25 index of the chunks is saved
+as lexical.npz for hybrid search.
+
+Usage (from root_agent/):
+    python build_local_index.py <curriculum> <input_dir> [output_dir]
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from pypdf import PdfReader
+
+import config
+from corpora import parse_book_name, shard_key
+from embeddings import Embedder
+from lexical_index import LexicalIndex
+
+CHUNK_CHARS = 1500
+CHUNK_OVERLAP = 200
+EMBED_BATCH_SIZE = 100
+
+
+def read_pages(path):
+    """Yield (page number or None, text) for a textbook file."""
+    if path.lower().endswith(".pdf"):
+        for number, page in enumerate(PdfReader(path).pages, start=1):
+            yield number, page.extract_text() or ""
+    else:
+        with open(path, encoding="utf-8") as f:
+            yield None, f.read()
+
+
+def split_text(text, chunk_chars=CHUNK_CHARS, overlap=CHUNK_OVERLAP):
+    text = " ".join(text.split())
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + chunk_chars)
+        if end < len(text):
+            # Break at the last space inside the window rather than mid-word
+            space = text.rfind(" ", start + chunk_chars // 2, end)
+            end = space if space > 0 else end
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return [chunk for chunk in chunks if chunk]
+
+
+def shard_order(name):
+    book = parse_book_name(name)
+    return (0, book.grade, book.subject, book.part or 0, name) if book else (1, 0, "", 0, name)
+
+
+def collect_chunks(input_dir):
+    chunks = []
+    names = [name for name in os.listdir(input_dir) if name.lower().endswith((".pdf", ".txt", ".md"))]
+    for name in sorted(names, key=shard_order):
+        source = os.path.splitext(name)[0]
+        book = parse_book_name(name)
+        metadata = {"grade": book.grade, "subject": book.subject, "part": book.part} if book else {}
+        for page, text in read_pages(os.path.join(input_dir, name)):
+            for chunk in split_text(text):
+                chunks.append(dict({"id": f"{source}:{len(chunks)}", "text": chunk, "source": source, "page": page}, **metadata))
+    return chunks
+
+
+def shard_ranges(chunks):
+    """{"<grade>/<subject>": [start, stop)} for chunks already grouped by shard."""
+    shards = {}
+    for row, chunk in enumerate(chunks):
+        if "grade" not in chunk:
+            continue
+        key = shard_key(chunk["grade"], chunk["subject"])
+        shards.setdefault(key, [row, row])[1] = row + 1
+    return shards
+
+
+async def embed_chunks(chunks, embedder, out_path, dtype):
+    matrix = None
+    for start in range(0, len(chunks), EMBED_BATCH_SIZE):
+        batch = [chunk["text"] for chunk in chunks[start:start + EMBED_BATCH_SIZE]]
+        vectors = await embedder.embed(batch, task_type="RETRIEVAL_DOCUMENT")
+        if matrix is None:
+            matrix = np.lib.format.open_memmap(out_path, mode="w+", dtype=dtype, shape=(len(chunks), vectors.shape[1]))
+        matrix[start:start + len(batch)] = vectors
+        print(f"Embedded {start + len(batch)}/{len(chunks)} chunks")
+    matrix.flush()
+    return matrix.shape[1]
+
+
+def build(curriculum, input_dir, output_dir, model=config.EMBEDDING_MODEL, dtype=config.RAG_LOCAL_DTYPE):
+    chunks = collect_chunks(input_dir)
+    if not chunks:
+        raise SystemExit(f"No textbook text found in {input_dir}")
+    os.makedirs(output_dir, exist_ok=True)
+    dim = asyncio.run(embed_chunks(chunks, Embedder(model), os.path.join(output_dir, "embeddings.npy"), dtype))
+    with open(os.path.join(output_dir, "chunks.jsonl"), "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+    LexicalIndex.build([chunk["text"] for chunk in chunks]).save(os.path.join(output_dir, "lexical.npz"))
+    digest = hashlib.sha1(model.encode("utf-8"))
+    for chunk in chunks:
+        digest.update(chunk["text"].encode("utf-8"))
+    manifest = {
+        "corpus": curriculum,
+        "embedding_model": model,
+        "dim": dim,
+        "count": len(chunks),
+        "dtype": dtype,
+        "version": digest.hexdigest()[:16],
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "shards": shard_ranges(chunks),
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Wrote {output_dir}: {len(chunks)} chunks in {len(manifest['shards'])} shards, dim {dim}, {dtype}, "
+          f"version {manifest['version']}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        raise SystemExit(__doc__)
+    curriculum = sys.argv[1].lower()
+    output_dir = sys.argv[3] if len(sys.argv) > 3 else os.path.join(config.RAG_LOCAL_INDEX_DIR, curriculum)
+    build(curriculum, sys.argv[2], output_dir)
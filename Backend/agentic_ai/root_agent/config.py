@@ -0,0 +1,148 @@
+import json
+import os
+
+
+def _env_flag(name, default):
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+# Directory for local, persistent runtime data (caches, stores). Mount a volume
+# here on Cloud Run / Docker so the data survives container redeploys.
+DATA_DIR = os.getenv("SAHAYAK_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+
+# Translation memory
+TRANSLATION_CACHE_ENABLED = _env_flag("TRANSLATION_CACHE_ENABLED", True)
+TRANSLATION_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", os.path.join(DATA_DIR, "translation_memory.sqlite3"))
+TRANSLATION_CACHE_MEMORY_ENTRIES = int(os.getenv("TRANSLATION_CACHE_MEMORY_ENTRIES", 5000))
+
+# Upstream translation calls run in a thread pool so they never block the event loop
+TRANSLATION_MAX_CONCURRENCY = int(os.getenv("TRANSLATION_MAX_CONCURRENCY", 8))
+TRANSLATION_ITEM_TIMEOUT_SECONDS = float(os.getenv("TRANSLATION_ITEM_TIMEOUT_SECONDS", 10))
+
+# Precompiled UI translation bundles (see translation_bundles.py); the checked-in
+# bundles are only read, bundles rebuilt at runtime are written under DATA_DIR
+TRANSLATION_BUNDLE_DIR = os.getenv("TRANSLATION_BUNDLE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "translation_bundles"))
+TRANSLATION_BUNDLE_CACHE_DIR = os.getenv("TRANSLATION_BUNDLE_CACHE_DIR", os.path.join(DATA_DIR, "translation_bundles"))
+TRANSLATION_BUNDLE_MAX_AGE_SECONDS = int(os.getenv("TRANSLATION_BUNDLE_MAX_AGE_SECONDS", 3600))
+
+# Long agent responses are post-translated in sentence chunks of at most this many characters
+TRANSLATION_SEGMENT_MAX_CHARS = int(os.getenv("TRANSLATION_SEGMENT_MAX_CHARS", 600))
+
+# Text is considered untranslated when more than this share of its letters is outside the target script
+SCRIPT_FOREIGN_RATIO_THRESHOLD = float(os.getenv("SCRIPT_FOREIGN_RATIO_THRESHOLD", 0.5))
+
+# Cross-request coalescing: concurrent small translations for one language pair are merged
+# into a single upstream call if they arrive within this window
+TRANSLATION_BATCH_WINDOW_MS = float(os.getenv("TRANSLATION_BATCH_WINDOW_MS", 15))
+TRANSLATION_BATCH_MAX_ITEMS = int(os.getenv("TRANSLATION_BATCH_MAX_ITEMS", 40))
+TRANSLATION_BATCH_MAX_CHARS = int(os.getenv("TRANSLATION_BATCH_MAX_CHARS", 4500))
+# A joined batch is rejected (and its items translated one by one) when a translated line is
+# outside these length ratios to its source line, or still in the source script
+TRANSLATION_BATCH_MIN_LENGTH_RATIO = float(os.getenv("TRANSLATION_BATCH_MIN_LENGTH_RATIO", 0.3))
+TRANSLATION_BATCH_MAX_LENGTH_RATIO = float(os.getenv("TRANSLATION_BATCH_MAX_LENGTH_RATIO", 4.0))
+
+# Session registry limits. Most traffic arrives as "default_user", so keep the per-user cap generous.
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", 2000))
+SESSION_MAX_PER_USER = int(os.getenv("SESSION_MAX_PER_USER", 1000))
+SESSION_IDLE_TTL_SECONDS = int(os.getenv("SESSION_IDLE_TTL_SECONDS", 1800))
+SESSION_SWEEP_INTERVAL_SECONDS = int(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", 60))
+
+# Number of pre-built Runners shared by all sessions (Runners hold no per-session state)
+RUNNER_POOL_SIZE = int(os.getenv("RUNNER_POOL_SIZE", 1))
+
+# Session backend: "sqlite" keeps sessions on disk so they survive restarts and can be shared
+# by several workers on one host; "memory" keeps them in process only
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite").strip().lower()
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", os.path.join(DATA_DIR, "sessions.sqlite3"))
+# Session writes are committed in batches in the background at most this often
+SESSION_FLUSH_INTERVAL_MS = float(os.getenv("SESSION_FLUSH_INTERVAL_MS", 200))
+SESSION_FLUSH_BATCH_SIZE = int(os.getenv("SESSION_FLUSH_BATCH_SIZE", 256))
+# Older events are compacted away beyond this many per session; idle sessions are purged after the retention period
+SESSION_MAX_EVENTS = int(os.getenv("SESSION_MAX_EVENTS", 200))
+SESSION_RETENTION_DAYS = float(os.getenv("SESSION_RETENTION_DAYS", 14))
+SESSION_COMPACT_INTERVAL_SECONDS = int(os.getenv("SESSION_COMPACT_INTERVAL_SECONDS", 600))
+
+# Session history compaction: once a session's history is estimated above the token budget,
+# older turns are replaced by a short summary and only the most recent turns are kept verbatim
+HISTORY_COMPACTION_ENABLED = _env_flag("HISTORY_COMPACTION_ENABLED", True)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 6000))
+HISTORY_KEEP_RECENT_TURNS = int(os.getenv("HISTORY_KEEP_RECENT_TURNS", 3))
+HISTORY_SUMMARY_MAX_CHARS = int(os.getenv("HISTORY_SUMMARY_MAX_CHARS", 2000))
+
+# Keep static prompt preambles in cached per-language agent instructions instead of resending them with every message
+PROMPT_PREAMBLES_IN_INSTRUCTIONS = _env_flag("PROMPT_PREAMBLES_IN_INSTRUCTIONS", True)
+
+# /learning/concept: run the curriculum lookup and the web search concurrently instead of
+# one after the other (costs an extra web search per curriculum hit; can be set per request)
+CONCEPT_HEDGED_SEARCH = _env_flag("CONCEPT_HEDGED_SEARCH", False)
+
+# Local intent routing: run the sub-agent directly when the route is known or predicted with
+# at least this confidence, skipping the RootAgent dispatcher call (see intent_router.py)
+INTENT_ROUTER_ENABLED = _env_flag("INTENT_ROUTER_ENABLED", True)
+INTENT_ROUTER_MODEL_PATH = os.getenv("INTENT_ROUTER_MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_model.json"))
+INTENT_ROUTER_THRESHOLD = float(os.getenv("INTENT_ROUTER_THRESHOLD", 0.8))
+# Typical latency of the dispatcher LLM call, used to estimate the time saved by direct routes
+INTENT_ROUTER_DISPATCH_HOP_MS = int(os.getenv("INTENT_ROUTER_DISPATCH_HOP_MS", 1500))
+
+# Model tiers (see model_tiers.py): requests scored below MODEL_TIER_FAST_BELOW run on the fast
+# model, above MODEL_TIER_DEEP_ABOVE on the deep model. An empty model keeps the agents' own models.
+MODEL_TIERING_ENABLED = _env_flag("MODEL_TIERING_ENABLED", True)
+MODEL_TIER_FAST = os.getenv("MODEL_TIER_FAST", "gemini-2.0-flash")
+MODEL_TIER_STANDARD = os.getenv("MODEL_TIER_STANDARD", "")
+MODEL_TIER_DEEP = os.getenv("MODEL_TIER_DEEP", "")
+MODEL_TIER_FAST_BELOW = float(os.getenv("MODEL_TIER_FAST_BELOW", 0.25))
+MODEL_TIER_DEEP_ABOVE = float(os.getenv("MODEL_TIER_DEEP_ABOVE", 0.85))
+# JSON object pinning endpoints to a tier, e.g. {"/image/generate": "fast", "/curriculum/generate": "deep"}
+MODEL_TIER_ENDPOINTS = json.loads(os.getenv("MODEL_TIER_ENDPOINTS", '{"/image/generate": "fast", "/image/generate-diagram": "fast"}'))
+
+# Response cache for generation endpoints whose prompt depends only on form fields (see response_cache.py)
+RESPONSE_CACHE_ENABLED = _env_flag("RESPONSE_CACHE_ENABLED", True)
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join(DATA_DIR, "response_cache.sqlite3"))
+RESPONSE_CACHE_MEMORY_ENTRIES = int(os.getenv("RESPONSE_CACHE_MEMORY_ENTRIES", 500))
+RESPONSE_CACHE_TTL_HOURS = float(os.getenv("RESPONSE_CACHE_TTL_HOURS", 168))
+# Bump after re-indexing the textbook corpora so cached responses built on the old content are not served
+CORPUS_VERSION = os.getenv("CORPUS_VERSION", "1")
+
+# Semantic cache for first-turn chat questions (see semantic_cache.py); endpoints are comma-separated
+SEMANTIC_CACHE_ENABLED = _env_flag("SEMANTIC_CACHE_ENABLED", True)
+SEMANTIC_CACHE_ENDPOINTS = [e.strip() for e in os.getenv("SEMANTIC_CACHE_ENDPOINTS", "/chat,/chat/stream").split(",") if e.strip()]
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.9))
+SEMANTIC_CACHE_CAPACITY = int(os.getenv("SEMANTIC_CACHE_CAPACITY", 2000))  # entries per (language, curriculum)
+SEMANTIC_CACHE_TTL_HOURS = float(os.getenv("SEMANTIC_CACHE_TTL_HOURS", 72))
+SEMANTIC_CACHE_INT8 = _env_flag("SEMANTIC_CACHE_INT8", True)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-004")
+
+# Textbook retrieval backend per curriculum: "vertex" (Vertex AI RAG corpora) or "local"
+# (in-process index built with build_local_index.py, see local_retrieval.py)
+RAG_BACKEND_NCERT = os.getenv("RAG_BACKEND_NCERT", "vertex").strip().lower()
+RAG_BACKEND_KTS = os.getenv("RAG_BACKEND_KTS", "vertex").strip().lower()
+RAG_LOCAL_INDEX_DIR = os.getenv("RAG_LOCAL_INDEX_DIR", os.path.join(DATA_DIR, "rag_index"))
+RAG_LOCAL_DTYPE = os.getenv("RAG_LOCAL_DTYPE", "float16")  # embedding matrix dtype written by build_local_index.py
+
+# Hybrid local retrieval: BM25 and vector candidates fused by reciprocal rank (see lexical_index.py)
+RAG_HYBRID_SEARCH = _env_flag("RAG_HYBRID_SEARCH", True)
+RAG_RRF_K = int(os.getenv("RAG_RRF_K", 60))
+RAG_HYBRID_CANDIDATES = int(os.getenv("RAG_HYBRID_CANDIDATES", 50))  # taken from each index before fusion
+
+# Cache of textbook retrieval results, invalidated when a corpus changes (see retrieval_cache.py)
+RETRIEVAL_CACHE_ENABLED = _env_flag("RETRIEVAL_CACHE_ENABLED", True)
+RETRIEVAL_CACHE_PATH = os.getenv("RETRIEVAL_CACHE_PATH", os.path.join(DATA_DIR, "retrieval_cache.sqlite3"))
+RETRIEVAL_CACHE_MEMORY_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MEMORY_ENTRIES", 2000))
+RETRIEVAL_CACHE_TTL_HOURS = float(os.getenv("RETRIEVAL_CACHE_TTL_HOURS", 168))
+# How often a corpus is checked for changes (Vertex file list, local index manifest)
+RAG_CORPUS_CHECK_SECONDS = int(os.getenv("RAG_CORPUS_CHECK_SECONDS", 300))
+# Gemini 2's built-in Vertex RAG tool retrieves inside the model call (the default). Turning it
+# off makes retrieval a function call through our tool, so results go through the retrieval cache
+# and the context packer, at the cost of an extra model round trip; measure both with
+# bench_vertex_retrieval.py before opting in
+RAG_VERTEX_BUILTIN_RETRIEVAL = _env_flag("RAG_VERTEX_BUILTIN_RETRIEVAL", True)
+# Vector distance metric of the Vertex RAG corpora; under a *_DISTANCE metric retrieved scores are
+# distances and are turned into similarities for context packing
+RAG_VERTEX_DISTANCE_METRIC = os.getenv("RAG_VERTEX_DISTANCE_METRIC", "COSINE_DISTANCE").strip().upper()
+
+# Packing of retrieved chunks before they reach the RAG agents (see context_packing.py)
+CONTEXT_PACKING_ENABLED = _env_flag("CONTEXT_PACKING_ENABLED", True)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 2000))  # estimated tokens of chunk text per retrieval
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", 0.7))  # 1.0 ranks by relevance only
+CONTEXT_LEXICAL_WEIGHT = float(os.getenv("CONTEXT_LEXICAL_WEIGHT", 0.3))
+CONTEXT_DEDUPE_THRESHOLD = float(os.getenv("CONTEXT_DEDUPE_THRESHOLD", 0.8))
@@ -0,0 +1,121 @@
+"""
+Post-retrieval context packing for the textbook RAG agents.
+
+similarity_top_k=10 chunks used to go straight into the RAG agent's prompt,
+often several near-copies of the same page (consecutive chunks overlap, and a
+book may be indexed twice). Before the chunks are returned to the model they
+are:
+
+1. de-duplicated: a chunk whose word 3-grams are mostly contained in an
+   already kept chunk is dropped;
+2. re-ranked by a cheap local score, lexical_weight * (share of the query's
+   terms it contains) + (1 - lexical_weight) * (its embedding similarity from
+   the retriever);
+3. selected by maximal marginal relevance under a token budget: each step
+   takes the chunk maximising mmr_lambda * relevance - (1 - mmr_lambda) *
+   (word overlap with the chunks already taken) that still fits the budget.
+
+Everything is computed from the chunk text and the scores the retriever
+already returned; no model or embedding calls are made.
+"""
+from history_compaction import estimate_tokens
+from lexical_index import tokenize
+
+
+def shingles(tokens, size=3):
+    if len(tokens) < size:
+        return {tuple(tokens)} if tokens else set()
+    return {tuple(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+class ContextPacker:
+    def __init__(self, token_budget=2000, mmr_lambda=0.7, lexical_weight=0.3, dedupe_threshold=0.8, enabled=True):
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.lexical_weight = lexical_weight
+        self.dedupe_threshold = dedupe_threshold
+        self.enabled = enabled
+        self.queries = 0
+        self.chunks_in = 0
+        self.chunks_out = 0
+        self.duplicates_dropped = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+
+    def dedupe(self, chunks):
+        """Drop chunks mostly contained in a chunk ranked above them; returns (chunk, tokens, shingles) tuples."""
+        kept = []
+        for chunk in chunks:
+            tokens = tokenize(chunk["text"])
+            grams = shingles(tokens)
+            if any(grams and len(grams & other) / len(grams) >= self.dedupe_threshold for _, _, other in kept):
+                self.duplicates_dropped += 1
+                continue
+            kept.append((chunk, tokens, grams))
+        return kept
+
+    def relevance(self, query_terms, tokens, similarity):
+        overlap = len(query_terms.intersection(tokens)) / len(query_terms) if query_terms else 0.0
+        return self.lexical_weight * overlap + (1 - self.lexical_weight) * (similarity or 0.0)
+
+    def pack(self, query, chunks):
+        """
+        Returns the chunks to give the model, most relevant first.
+
+        The chunk dicts themselves are not modified (they may be shared with the retrieval cache).
+        """
+        if not self.enabled or not chunks:
+            return chunks
+        before = sum(estimate_tokens(chunk["text"]) for chunk in chunks)
+        query_terms = set(tokenize(query))
+        candidates = [
+            {"chunk": chunk, "terms": set(tokens), "tokens": estimate_tokens(chunk["text"]),
+             "relevance": self.relevance(query_terms, tokens, chunk.get("score"))}
+            for chunk, tokens, _ in self.dedupe(chunks)
+        ]
+        selected = []
+        budget = self.token_budget
+        while candidates:
+            best, best_score = None, None
+            for candidate in candidates:
+                if candidate["tokens"] > budget:
+                    continue
+                redundancy = max((jaccard(candidate["terms"], other["terms"]) for other in selected), default=0.0)
+                score = self.mmr_lambda * candidate["relevance"] - (1 - self.mmr_lambda) * redundancy
+                if best_score is None or score > best_score:
+                    best, best_score = candidate, score
+            if best is None:
+                break
+            selected.append(best)
+            candidates.remove(best)
+            budget -= best["tokens"]
+        packed = [candidate["chunk"] for candidate in selected]
+        if not packed:
+            # Even the best chunk is over budget: keep its beginning rather than nothing
+            first = max(candidates, key=lambda candidate: candidate["relevance"])["chunk"]
+            packed = [dict(first, text=first["text"][:self.token_budget * 4])]
+        after = sum(estimate_tokens(chunk["text"]) for chunk in packed)
+        self.queries += 1
+        self.chunks_in += len(chunks)
+        self.chunks_out += len(packed)
+        self.tokens_in += before
+        self.tokens_out += after
+        print(f"Context packing: {len(chunks)} -> {len(packed)} chunks, ~{before} -> ~{after} tokens")
+        return packed
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "token_budget": self.token_budget,
+            "queries": self.queries,
+            "chunks_in": self.chunks_in,
+            "chunks_out": self.chunks_out,
+            "duplicates_dropped": self.duplicates_dropped,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "tokens_saved_per_query": round((self.tokens_in - self.tokens_out) / self.queries, 1) if self.queries else 0.0,
+        }
@@ -0,0 +1,150 @@
+"""
+Textbook corpora and the book naming convention.
+
+Books are named <curriculum>_class<grade>_<subject>_<part>, e.g.
+ncert_class10_english_part1.pdf; a few older uploads use
+grade-<grade>-<subject>-<language>.pdf. parse_book_name() turns either form
+into a BookInfo, which is how retrieval is sharded per (curriculum, grade,
+subject): a search for a Grade 10 English question only scores Grade 10
+English books.
+
+The grade and subject of a search come from the textbook filter that
+endpoints put in session state (from their grade, subject and
+curriculum_type fields) and, for anything missing, from the query text
+("class 10 english part1 glimpses of india").
+"""
+import os
+import re
+from collections import namedtuple
+
+NCERT = "ncert"
+KTS = "kts"
+
+RAG_CORPORA = {
+    NCERT: "projects/265110558107/locations/us-central1/ragCorpora/576460752303423488",
+    KTS: "projects/265110558107/locations/us-central1/ragCorpora/5764607523034234880",
+}
+
+# Session state key holding {"curriculum", "grade", "subject"} for retrieval tools
+FILTER_STATE_KEY = "textbook_filter"
+
+# Textbook retrieval tools created in this process, reported by /api/metrics
+RETRIEVERS = []
+
+BookInfo = namedtuple("BookInfo", ["curriculum", "grade", "subject", "part"])
+
+GRADE_PART_RE = re.compile(r"^(?:class|grade)(\d{1,2})$")
+PART_RE = re.compile(r"^(?:part)?(\d+)$")
+# Name pieces that are never part of the subject
+NON_SUBJECT = {"part", "en", "hi", "kn"}
+
+GRADE_QUERY_RE = re.compile(
+    r"\b(?:class|grade|std|standard)\s*[-:]?\s*(\d{1,2})(?:st|nd|rd|th)?\b"
+    r"|\b(\d{1,2})(?:st|nd|rd|th)\s+(?:class|grade|standard)\b"
+)
+CURRICULUM_QUERY_RE = {
+    NCERT: re.compile(r"\bncert\b"),
+    KTS: re.compile(r"\b(kts|karnataka)\b"),
+}
+
+
+def parse_book_name(name):
+    """BookInfo for a book file name, or None if it doesn't follow the naming convention."""
+    stem = os.path.splitext(os.path.basename(name))[0].lower()
+    if "_" in stem:
+        parts = stem.split("_")
+        for i, piece in enumerate(parts):
+            match = GRADE_PART_RE.match(piece)
+            if match:
+                subject_words, part = [], None
+                for rest in parts[i + 1:]:
+                    part_match = PART_RE.match(rest)
+                    if part_match:
+                        part = part or int(part_match.group(1))
+                    elif rest not in NON_SUBJECT:
+                        subject_words.append(rest)
+                if not subject_words:
+                    return None
+                return BookInfo(parts[0] if i > 0 else None, int(match.group(1)), " ".join(subject_words), part)
+        return None
+    # Older grade-<grade>-<subject>-<language> names
+    parts = stem.split("-")
+    for i, piece in enumerate(parts[:-2]):
+        if piece == "grade" and parts[i + 1].isdigit():
+            subject = parts[i + 2]
+            if subject in NON_SUBJECT or subject.isdigit():
+                return None
+            return BookInfo(None, int(parts[i + 1]), subject, None)
+    return None
+
+
+def shard_key(grade, subject):
+    """Shard of a corpus holding one grade's books for one subject."""
+    return f"{grade}/{subject}"
+
+
+def parse_query_filter(text, known_subjects=()):
+    """{"curriculum", "grade", "subject"} mentioned in free text; keys are omitted when not found."""
+    lowered = " ".join((text or "").lower().replace("_", " ").split())
+    found = {}
+    match = GRADE_QUERY_RE.search(lowered)
+    if match:
+        found["grade"] = int(match.group(1) or match.group(2))
+    for curriculum, pattern in CURRICULUM_QUERY_RE.items():
+        if pattern.search(lowered):
+            found["curriculum"] = curriculum
+            break
+    # Longest names first, so "social science" wins over "science"
+    for subject in sorted(known_subjects, key=len, reverse=True):
+        if re.search(r"\b" + re.escape(subject) + r"\b", lowered):
+            found["subject"] = subject
+            break
+    return found
+
+
+def textbook_filter(curriculum=None, grade=None, subject=None):
+    """State delta that scopes textbook retrieval in a session to a curriculum, grade and subject."""
+    values = {
+        "curriculum": curriculum.lower() if curriculum else None,
+        "grade": int(grade) if grade else None,
+        "subject": " ".join(subject.lower().replace("_", " ").split()) if subject else None,
+    }
+    return {FILTER_STATE_KEY: {key: value for key, value in values.items() if value is not None}}
+
+
+def resolve_filter(state, query, known_subjects=()):
+    """
+    The grade/subject to search: what the query names, completed from the session's textbook filter.
+
+    A grade, subject or curriculum mentioned in the query wins over the stored filter, which
+    may come from an earlier request of the session. A query naming another curriculum
+    ignores the stored filter altogether.
+    """
+    found = parse_query_filter(query, known_subjects)
+    stored = (state.get(FILTER_STATE_KEY) if state is not None else None) or {}
+    if found.get("curriculum") and stored.get("curriculum") not in (None, found["curriculum"]):
+        return found
+    for key, value in stored.items():
+        if value and key not in found:
+            found[key] = value
+    return found
+
+
+def matching_shards(shards, wanted):
+    """
+    Keys of shards ("<grade>/<subject>") to search for the wanted grade and subject.
+
+    A subject with no books in the corpus (e.g. "maths" when the books say
+    "mathematics") falls back to the whole grade. An empty list means search everything.
+    """
+    grade, subject = wanted.get("grade"), wanted.get("subject")
+    if grade is None and subject is None:
+        return []
+    matches = [
+        key for key in shards
+        if (grade is None or key.partition("/")[0] == str(grade))
+        and (subject is None or key.partition("/")[2] == subject)
+    ]
+    if not matches and subject is not None and grade is not None:
+        return matching_shards(shards, {"grade": grade})
+    return matches
@@ -0,0 +1,72 @@
+"""
+Text embeddings through the Gemini / Vertex AI embedding API.
+
+The client is configured from the environment like the rest of the app
+(GOOGLE_GENAI_USE_VERTEXAI, GOOGLE_CLOUD_PROJECT, ...). Vectors are returned
+L2-normalized as float32, so a dot product is the cosine similarity.
+Recently embedded texts are memoized.
+"""
+import time
+
+import numpy as np
+from google import genai
+from google.genai import types
+
+from cache_store import LRUCache
+
+
+class Embedder:
+    def __init__(self, model="text-embedding-004", memo_entries=2000):
+        self.model = model
+        self._client = None
+        self.memo = LRUCache(max_entries=memo_entries)
+        self.calls = 0
+        self.texts_embedded = 0
+        self.memo_hits = 0
+        self.total_ms = 0.0
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = genai.Client()
+        return self._client
+
+    @staticmethod
+    def normalize(matrix):
+        matrix = np.asarray(matrix, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    async def embed(self, texts, task_type="RETRIEVAL_QUERY"):
+        """Embed a list of texts; returns a (len(texts), dim) float32 matrix of unit vectors."""
+        vectors = [self.memo.get((task_type, text)) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        self.memo_hits += len(texts) - len(missing)
+        if missing:
+            started = time.perf_counter()
+            response = await self.client.aio.models.embed_content(
+                model=self.model,
+                contents=[texts[i] for i in missing],
+                config=types.EmbedContentConfig(task_type=task_type),
+            )
+            self.total_ms += 1000 * (time.perf_counter() - started)
+            self.calls += 1
+            self.texts_embedded += len(missing)
+            fresh = self.normalize([embedding.values for embedding in response.embeddings])
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+                self.memo.set((task_type, texts[i]), vector)
+        return np.stack(vectors)
+
+    async def embed_one(self, text, task_type="RETRIEVAL_QUERY"):
+        return (await self.embed([text], task_type))[0]
+
+    def stats(self):
+        return {
+            "model": self.model,
+            "calls": self.calls,
+            "texts_embedded": self.texts_embedded,
+            "memo_hits": self.memo_hits,
+            "mean_call_ms": round(self.total_ms / self.calls, 1) if self.calls else 0.0,
+        }
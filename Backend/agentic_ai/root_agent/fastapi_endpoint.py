@@ -1,16 +1,18 @@
 import io
 import base64
 import json
+import time
 import uuid
 from typing import Tuple, Optional, List
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import asyncio
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from PIL import Image
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
 # Suppress all warnings
@@ -18,13 +20,33 @@ warnings.filterwarnings("ignore")
 
 # Import necessary ADK components
 # Make sure 'agent.py' containing 'root_agent' is in the same directory
-from google.adk.sessions import InMemorySessionService
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.adk.runners import Runner
 from google.genai import types # For creating message Content/Parts
 
 # Assuming 'tts.py' contains the synthesize_text function
 from tts import synthesize_text
-from agent import root_agent
+from agent import root_agent, build_root_agent, build_route_agent
+from rag_agent import context_packer, retrieval_cache
+from session_manager import SessionManager
+from session_store import MemorySessionService, SqliteSessionService
+from history_compaction import HistoryCompactor
+from prompt_templates import PromptRegistry
+from metrics import LatencyStats
+from intent_router import IntentRouter, IMAGEN, RAG_KTS, RAG_NCERT, SEARCH
+from model_tiers import ModelTierPolicy
+from response_cache import ResponseCache
+from embeddings import Embedder
+from semantic_cache import SemanticCache
+from singleflight import SingleFlight
+from corpora import RAG_CORPORA, RETRIEVERS, parse_book_name, textbook_filter
+from translation_memory import TranslationMemory
+from translation_bundles import BundleStore, make_bundle, merge_seeds
+from markdown_segmenter import mask_inline, reassemble, segment_markdown, skip_translated, unmask_inline
+from script_detection import needs_translation, plausible_translation
+from translation_dispatcher import TranslationDispatcher
+from ui_translations import ENGLISH_UI_STRINGS, FALLBACK_TRANSLATIONS, SUPPORTED_LANGUAGES
+import config
 
 # Translation support (fallback if googletrans is not available)
 try:
@@ -56,143 +78,266 @@ def translate_text(text, target_language):
     if not TRANSLATION_AVAILABLE or target_language == 'en':
         return text
     
-    # Simple fallback translations for common UI elements
-    fallback_translations = {
-        'hi': {
-            'dashboard': 'डैशबोर्ड',
-            'learning_concepts': 'अवधारणाएं सीखें',
-            'prepare_lessons': 'पाठ तैयार करें',
-            'create_curriculum': 'पाठ्यक्रम बनाएं',
-            'ai_assistant': 'एआई सहायक',
-            'welcome': 'स्वागत है',
-            'loading': 'लोड हो रहा है...',
-            'save': 'सहेजें',
-            'cancel': 'रद्द करें',
-            'submit': 'सबमिट करें',
-            'close': 'बंद करें',
-            'next': 'अगला',
-            'previous': 'पिछला',
-            'search': 'खोजें',
-            'filter': 'फ़िल्टर',
-            'quick_actions': 'त्वरित कार्य',
-            'recent_activities': 'हाल की गतिविधियां',
-            'teaching_stats': 'शिक्षण आंकड़े',
-            'grade_level': 'कक्षा स्तर',
-            'curriculum_type': 'पाठ्यक्रम प्रकार',
-            'explain_concept': 'अवधारणा समझाएं',
-            'select_topic': 'विषय चुनें',
-            'grade_optional': 'कक्षा (वैकल्पिक)',
-            'not_selected': 'चयनित नहीं',
-            'send_message': 'संदेश भेजें',
-            'generate_materials': 'सामग्री उत्पन्न करें',
-            'study_material': 'अध्ययन सामग्री',
-            'assessment_questions': 'मूल्यांकन प्रश्न',
-            'generated_diagram': 'उत्पन्न आरेख',
-            'select_subject': 'विषय चुनें',
-            'select_grade': 'कक्षा चुनें',
-            'teaching_assistant': 'शिक्षण सहायक',
-            'ask_question': 'प्रश्न पूछें...',
-            'mentor_guidance': 'मार्गदर्शन',
-            'welcome_message': 'सहायक में आपका स्वागत है, आपका एआई शिक्षण सहायक!',
-            'how_can_i_help': 'मैं आपकी शिक्षण में कैसे मदद कर सकता हूं?',
-            'processing': 'आपका अनुरोध संसाधित हो रहा है...',
-            'error_message': 'एक त्रुटि हुई। कृपया पुनः प्रयास करें।',
-            'profile': 'प्रोफ़ाइल',
-            'settings': 'सेटिंग्स',
-            'logout': 'लॉगआउट',
-            'teaching_grades': 'शिक्षण कक्षाएं',
-            'school_name': 'स्कूल का नाम',
-            'district': 'जिला',
-            'state': 'राज्य'
-        },
-        'kn': {
-            'dashboard': 'ಡ್ಯಾಶ್‌ಬೋರ್ಡ್',
-            'learning_concepts': 'ಕಲಿಕೆಯ ಪರಿಕಲ್ಪನೆಗಳು',
-            'prepare_lessons': 'ಪಾಠಗಳನ್ನು ತಯಾರಿಸಿ',
-            'create_curriculum': 'ಪಾಠ್ಯಕ್ರಮ ರಚಿಸಿ',
-            'ai_assistant': 'ಎಐ ಸಹಾಯಕ',
-            'welcome': 'ಸುಸ್ವಾಗತ',
-            'loading': 'ಲೋಡ್ ಆಗುತ್ತಿದೆ...',
-            'save': 'ಉಳಿಸಿ',
-            'cancel': 'ರದ್ದುಮಾಡಿ',
-            'submit': 'ಸಲ್ಲಿಸಿ',
-            'close': 'ಮುಚ್ಚಿ',
-            'next': 'ಮುಂದೆ',
-            'previous': 'ಹಿಂದೆ',
-            'search': 'ಹುಡುಕಿ',
-            'filter': 'ಫಿಲ್ಟರ್',
-            'quick_actions': 'ತ್ವರಿತ ಕ್ರಿಯೆಗಳು',
-            'recent_activities': 'ಇತ್ತೀಚಿನ ಚಟುವಟಿಕೆಗಳು',
-            'teaching_stats': 'ಅಧ್ಯಾಪನ ಅಂಕಿಅಂಶಗಳು',
-            'grade_level': 'ತರಗತಿ ಮಟ್ಟ',
-            'curriculum_type': 'ಪಾಠ್ಯಕ್ರಮ ಪ್ರಕಾರ',
-            'explain_concept': 'ಪರಿಕಲ್ಪನೆಯನ್ನು ವಿವರಿಸಿ',
-            'select_topic': 'ವಿಷಯವನ್ನು ಆಯ್ಕೆಮಾಡಿ',
-            'grade_optional': 'ತರಗತಿ (ಐಚ್ಛಿಕ)',
-            'not_selected': 'ಆಯ್ಕೆಮಾಡಲಾಗಿಲ್ಲ',
-            'send_message': 'ಸಂದೇಶ ಕಳುಹಿಸಿ',
-            'generate_materials': 'ಸಾಮಗ್ರಿಗಳನ್ನು ರಚಿಸಿ',
-            'study_material': 'ಅಧ್ಯಯನ ಸಾಮಗ್ರಿ',
-            'assessment_questions': 'ಮೌಲ್ಯಮಾಪನ ಪ್ರಶ್ನೆಗಳು',
-            'generated_diagram': 'ರಚಿಸಲಾದ ರೇಖಾಚಿತ್ರ',
-            'select_subject': 'ವಿಷಯವನ್ನು ಆಯ್ಕೆಮಾಡಿ',
-            'select_grade': 'ತರಗತಿಯನ್ನು ಆಯ್ಕೆಮಾಡಿ',
-            'teaching_assistant': 'ಅಧ್ಯಾಪನ ಸಹಾಯಕ',
-            'ask_question': 'ಪ್ರಶ್ನೆಯನ್ನು ಕೇಳಿ...',
-            'mentor_guidance': 'ಮಾರ್ಗದರ್ಶನ',
-            'welcome_message': 'ಸಹಾಯಕಕ್ಕೆ ಸುಸ್ವಾಗತ, ನಿಮ್ಮ ಎಐ ಅಧ್ಯಾಪನ ಸಹಾಯಕ!',
-            'how_can_i_help': 'ನಿಮ್ಮ ಅಧ್ಯಾಪನದಲ್ಲಿ ನಾನು ಹೇಗೆ ಸಹಾಯ ಮಾಡಬಹುದು?',
-            'processing': 'ನಿಮ್ಮ ವಿನಂತಿಯನ್ನು ಸಂಸ್ಕರಿಸಲಾಗುತ್ತಿದೆ...',
-            'error_message': 'ದೋಷ ಸಂಭವಿಸಿದೆ. ದಯವಿಟ್ಟು ಮತ್ತೆ ಪ್ರಯತ್ನಿಸಿ.',
-            'profile': 'ಪ್ರೊಫೈಲ್',
-            'settings': 'ಸೆಟ್ಟಿಂಗ್‌ಗಳು',
-            'logout': 'ಲಾಗ್‌ಔಟ್',
-            'teaching_grades': 'ಅಧ್ಯಾಪನ ತರಗತಿಗಳು',
-            'school_name': 'ಶಾಲೆಯ ಹೆಸರು',
-            'district': 'ಜಿಲ್ಲೆ',
-            'state': 'ರಾಜ್ಯ'
-        }
-    }
-    
-    # Return fallback translation if available, otherwise return original text
-    if target_language in fallback_translations:
-        return fallback_translations[target_language].get(text, text)
+    # Return fallback translation for common UI elements if available, otherwise return original text
+    if target_language in FALLBACK_TRANSLATIONS:
+        return FALLBACK_TRANSLATIONS[target_language].get(text, text)
     return text
 
-# In-memory storage for session management (for demonstration purposes)
-# In a production environment, consider a persistent store like Redis or a database
-class SessionManager:
-    def __init__(self):
-        self.sessions = {} # user_id -> {session_id: runner}
-        self.session_service = InMemorySessionService()
+# Persistent translation memory shared by all translation endpoints
+translation_memory = TranslationMemory(
+    config.TRANSLATION_CACHE_PATH,
+    memory_entries=config.TRANSLATION_CACHE_MEMORY_ENTRIES,
+    enabled=config.TRANSLATION_CACHE_ENABLED,
+)
 
-    async def get_or_create_runner(self, user_id: str, session_id: str) -> Runner:
-        if user_id not in self.sessions:
-            self.sessions[user_id] = {}
+def translate_upstream(text, source_language, target_language):
+    """Blocking GoogleTranslator call; the result is written to translation memory."""
+    translated = GoogleTranslator(source=source_language, target=target_language).translate(text)
+    translation_memory.put(source_language, target_language, text, translated)
+    return translated
 
-        if session_id not in self.sessions[user_id]:
-            app_name = "fastapi_adk_chatbot"
-            
-            await self.session_service.create_session(
-                app_name=app_name,
-                user_id=user_id,
-                session_id=session_id
-            )
-            
-            runner = Runner(
-                agent=root_agent,
-                app_name=app_name,
-                session_service=self.session_service
-            )
-            self.sessions[user_id][session_id] = runner
-            print(f"Created new session and runner for user: {user_id}, session: {session_id}")
-        return self.sessions[user_id][session_id]
+def translate_upstream_batch(texts, source_language, target_language):
+    """
+    Translate several single-line texts with one upstream call by joining them with newlines.
 
-session_manager = SessionManager()
+    Returns one result per text (failed items are returned as the exception), or None when
+    the texts contain newlines or the translated lines don't line up or don't look like
+    translations of their source lines; the dispatcher then translates the items one by one.
+    """
+    if len(texts) == 1:
+        try:
+            return [translate_upstream(texts[0], source_language, target_language)]
+        except Exception as e:
+            return [e]
+    if any("\n" in text for text in texts):
+        return None
+    try:
+        joined = GoogleTranslator(source=source_language, target=target_language).translate("\n".join(texts))
+    except Exception as e:
+        print(f"Joined batch translation failed, translating items one by one: {e}")
+        return None
+    lines = [line.strip() for line in joined.split("\n")] if joined else []
+    if len(lines) != len(texts) or not all(
+        plausible_translation(text, line, target_language, source_language) for text, line in zip(texts, lines)
+    ):
+        print(f"Joined batch of {len(texts)} texts did not line up, translating items one by one")
+        return None
+    for text, translated in zip(texts, lines):
+        translation_memory.put(source_language, target_language, text, translated)
+    return lines
+
+# Upstream translation calls are blocking HTTP requests, so they run on this pool
+translation_executor = ThreadPoolExecutor(
+    max_workers=config.TRANSLATION_MAX_CONCURRENCY,
+    thread_name_prefix="translate",
+)
+
+# Deduplicates identical in-flight translations and micro-batches concurrent ones per language pair
+translation_dispatcher = TranslationDispatcher(
+    translate_upstream_batch,
+    translation_executor,
+    window_seconds=config.TRANSLATION_BATCH_WINDOW_MS / 1000,
+    max_batch_items=config.TRANSLATION_BATCH_MAX_ITEMS,
+    max_batch_chars=config.TRANSLATION_BATCH_MAX_CHARS,
+    translate_one=translate_upstream,
+    timeout_seconds=config.TRANSLATION_ITEM_TIMEOUT_SECONDS,
+)
+
+async def translate_async(text, source_language, target_language, no_cache=False):
+    """Translate text, served from translation memory when possible.
 
-async def get_agent_response_async(runner: Runner, user_id: str, session_id: str, query: str, audio_bytes: Optional[bytes] = None, image_bytes: Optional[bytes] = None):
+    Memory hits are returned inline; misses go through the translation dispatcher, which raises
+    asyncio.TimeoutError when the upstream call takes longer than TRANSLATION_ITEM_TIMEOUT_SECONDS.
+    With no_cache=True the lookup is skipped but the fresh translation still refreshes the memory.
     """
-    Sends a query to the ADK agent and retrieves its final response.
+    if not no_cache:
+        cached = translation_memory.get(source_language, target_language, text)
+        if cached is not None:
+            return cached
+    return await translation_dispatcher.translate(text, source_language, target_language)
+
+async def translate_many(texts, source_language, target_language, no_cache=False):
+    """
+    Translate a list of texts concurrently, preserving order.
+
+    Items go through the translation dispatcher, so upstream concurrency is capped by the
+    TRANSLATION_MAX_CONCURRENCY thread pool, and each item has its own timeout.
+    Items that fail or time out keep their original text.
+    Returns (translated_texts, failed_indices).
+    """
+    failed_indices = []
+
+    async def translate_item(index, text):
+        if not isinstance(text, str) or not text.strip():
+            return text
+        if not needs_translation(text, target_language, source_language):
+            return text  # Already written in the target script
+        try:
+            translated = await translate_async(text, source_language, target_language, no_cache=no_cache)
+            return translated if translated else text
+        except asyncio.TimeoutError:
+            print(f"Translation timed out for item {index}")
+        except Exception as e:
+            print(f"Translation error for item {index}: {e}")
+        failed_indices.append(index)
+        return text
+
+    translated_texts = await asyncio.gather(*(translate_item(i, text) for i, text in enumerate(texts)))
+    return list(translated_texts), sorted(failed_indices)
+
+async def translate_markdown(text, source_language, target_language):
+    """
+    Translate a long markdown response chunk by chunk.
+
+    Code, URLs, numbers and markdown syntax are copied through unchanged and the prose
+    chunks are translated concurrently, so latency follows the slowest chunk. Inline
+    markup travels inside its sentence as placeholders and is restored afterwards.
+    """
+    pieces = segment_markdown(text, max_chars=config.TRANSLATION_SEGMENT_MAX_CHARS)
+    # Paragraphs the model already wrote in the target script are left as they are
+    skip_translated(pieces, target_language, source_language)
+    chunks = [piece_text for piece_text, translatable in pieces if translatable]
+    if not chunks:
+        return text
+    masked = [mask_inline(chunk) for chunk in chunks]
+    translated_chunks, failed_indices = await translate_many(
+        [masked_text for masked_text, _ in masked], source_language, target_language,
+    )
+    failed = set(failed_indices)
+    for i, (chunk, (_, spans)) in enumerate(zip(chunks, masked)):
+        restored = None if i in failed else unmask_inline(translated_chunks[i], spans)
+        if restored is None:
+            # Translation failed or mangled a placeholder: keep the original chunk and its markup
+            failed.add(i)
+            restored = chunk
+        translated_chunks[i] = restored
+    if failed:
+        print(f"Post-translation: {len(failed)}/{len(chunks)} chunks kept in {source_language}")
+    return reassemble(pieces, translated_chunks)
+
+# Precompiled per-language UI catalogs served by /api/translations/{language_code}
+translation_bundles = BundleStore(config.TRANSLATION_BUNDLE_DIR, config.TRANSLATION_BUNDLE_CACHE_DIR)
+
+@app.on_event("startup")
+async def load_translation_bundles():
+    translation_bundles.load()
+    if TRANSLATION_AVAILABLE and translation_bundles.stale_languages():
+        # Build missing bundles and rebuild those made from an older English key set
+        asyncio.create_task(translation_bundles.refresh(translate_many))
+
+# Bounded registry of agent sessions; idle and least recently used sessions are evicted
+if config.SESSION_BACKEND == "sqlite":
+    session_service = SqliteSessionService(
+        config.SESSION_STORE_PATH,
+        flush_interval_seconds=config.SESSION_FLUSH_INTERVAL_MS / 1000,
+        flush_batch_size=config.SESSION_FLUSH_BATCH_SIZE,
+        max_events_per_session=config.SESSION_MAX_EVENTS,
+        retention_seconds=config.SESSION_RETENTION_DAYS * 24 * 3600,
+        compact_interval_seconds=config.SESSION_COMPACT_INTERVAL_SECONDS,
+    )
+else:
+    session_service = MemorySessionService()
+
+# Old turns are folded into a summary once a session's history exceeds the token budget
+history_compactor = HistoryCompactor(
+    token_budget=config.HISTORY_TOKEN_BUDGET,
+    keep_recent_turns=config.HISTORY_KEEP_RECENT_TURNS,
+    summary_max_chars=config.HISTORY_SUMMARY_MAX_CHARS,
+) if config.HISTORY_COMPACTION_ENABLED else None
+
+session_manager = SessionManager(
+    root_agent,
+    session_service=session_service,
+    max_sessions=config.SESSION_MAX_SESSIONS,
+    max_sessions_per_user=config.SESSION_MAX_PER_USER,
+    idle_ttl_seconds=config.SESSION_IDLE_TTL_SECONDS,
+    sweep_interval_seconds=config.SESSION_SWEEP_INTERVAL_SECONDS,
+    runner_pool_size=config.RUNNER_POOL_SIZE,
+    history_compactor=history_compactor,
+)
+
+# Endpoint latencies by path (e.g. curriculum hit vs. miss), reported by /api/metrics
+latency_stats = LatencyStats()
+
+# Responses of the generation endpoints that only depend on their form fields
+response_cache = ResponseCache(
+    config.RESPONSE_CACHE_PATH,
+    memory_entries=config.RESPONSE_CACHE_MEMORY_ENTRIES,
+    ttl_seconds=config.RESPONSE_CACHE_TTL_HOURS * 3600,
+    corpus_version=config.CORPUS_VERSION,
+    enabled=config.RESPONSE_CACHE_ENABLED,
+)
+
+# Reuses answers to first-turn chat questions that were already asked in other words
+semantic_cache = SemanticCache(
+    Embedder(config.EMBEDDING_MODEL),
+    threshold=config.SEMANTIC_CACHE_THRESHOLD,
+    capacity_per_partition=config.SEMANTIC_CACHE_CAPACITY,
+    ttl_seconds=config.SEMANTIC_CACHE_TTL_HOURS * 3600,
+    quantize=config.SEMANTIC_CACHE_INT8,
+    endpoints=config.SEMANTIC_CACHE_ENDPOINTS,
+) if config.SEMANTIC_CACHE_ENABLED else None
+
+# Identical generation requests that arrive while one is running share its agent run
+singleflight = SingleFlight()
+
+# Static prompt preambles live in cached per-language agent variants instead of every message
+prompt_registry = PromptRegistry(
+    build_root_agent, enabled=config.PROMPT_PREAMBLES_IN_INSTRUCTIONS, build_route_agent=build_route_agent
+)
+
+# Runs sub-agents directly when the route is known or confidently predicted, skipping RootAgent
+intent_router = IntentRouter(
+    config.INTENT_ROUTER_MODEL_PATH,
+    threshold=config.INTENT_ROUTER_THRESHOLD,
+    dispatch_hop_ms=config.INTENT_ROUTER_DISPATCH_HOP_MS,
+) if config.INTENT_ROUTER_ENABLED else None
+
+def known_route(route, endpoint):
+    """The sub-agent to run directly for an endpoint whose route is fixed, or None to use RootAgent."""
+    if intent_router is None:
+        return None
+    return intent_router.known_route(route, endpoint).route
+
+def predicted_route(text, endpoint):
+    """The sub-agent predicted for free-form text, or None when the router is not confident."""
+    if intent_router is None or not text:
+        return None
+    return intent_router.route(text, endpoint).route
+
+# Runs short lookups on a faster model (and long analytical requests on a deeper one when configured)
+model_tiers = ModelTierPolicy(
+    {"fast": config.MODEL_TIER_FAST, "standard": config.MODEL_TIER_STANDARD, "deep": config.MODEL_TIER_DEEP},
+    endpoint_tiers=config.MODEL_TIER_ENDPOINTS,
+    fast_below=config.MODEL_TIER_FAST_BELOW,
+    deep_above=config.MODEL_TIER_DEEP_ABOVE,
+    enabled=config.MODEL_TIERING_ENABLED,
+)
+
+def tiered_agent(agent, endpoint, prompt, output_tokens=None):
+    """The variant of agent (RootAgent when None) on the model tier chosen for this request."""
+    return model_tiers.select(agent or root_agent, endpoint, prompt, output_tokens)
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    session_manager.start_sweeper()
+
+@app.on_event("shutdown")
+async def stop_session_sweeper():
+    await session_manager.stop_sweeper()
+    if hasattr(session_service, "close"):
+        # Commit any session writes still waiting for the next flush
+        session_service.close()
+
+def add_usage(usage, event):
+    """Adds a final (non-partial) event's token counts to usage = [prompt_tokens, output_tokens]."""
+    if event.usage_metadata and not event.partial:
+        usage[0] += event.usage_metadata.prompt_token_count or 0
+        usage[1] += event.usage_metadata.candidates_token_count or 0
+
+def build_user_content(query: str, audio_bytes: Optional[bytes] = None, image_bytes: Optional[bytes] = None):
+    """
+    Builds the user message Content for a text, audio or image query.
     """
     if audio_bytes:
         audio_content = types.Blob(
@@ -209,11 +354,23 @@ async def get_agent_response_async(runner: Runner, user_id: str, session_id: str
         content = types.Content(role='user', parts=[types.Part(text=query), types.Part(inline_data=image_content)])
     else:
         content = types.Content(role='user', parts=[types.Part(text=query)])
+    return content
+
+async def get_agent_response_async(runner: Runner, user_id: str, session_id: str, query: str, audio_bytes: Optional[bytes] = None, image_bytes: Optional[bytes] = None, state_delta: Optional[dict] = None):
+    """
+    Sends a query to the ADK agent and retrieves its final response.
+
+    state_delta is merged into the session state before the run (e.g. the textbook filter).
+    """
+    content = build_user_content(query, audio_bytes, image_bytes)
 
     final_response_text = "Agent did not produce a final response."
+    started = time.perf_counter()
+    usage = [0, 0]
 
-    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
+    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content, state_delta=state_delta):
         print(f"ADK Event: {event}")
+        add_usage(usage, event)
         if event.is_final_response():
             if event.content and event.content.parts:
                 final_response_text = event.content.parts[0].text
@@ -222,6 +379,9 @@ async def get_agent_response_async(runner: Runner, user_id: str, session_id: str
                 final_response_text = f"Agent escalated: {event.error_message or 'No specific message.'}"
             break
 
+    model_tiers.record(runner.agent, time.perf_counter() - started, *usage)
+    await session_manager.compact_history(user_id, session_id)
+
     # Check for generated images in artifacts
     generated_image_bytes = None
     try:
@@ -249,6 +409,141 @@ async def get_agent_response_async(runner: Runner, user_id: str, session_id: str
         "bytes_base64": encoded_bytes
     }
 
+def cacheable_response(text):
+    return bool(text) and text != "Agent did not produce a final response." and not text.startswith("Agent escalated")
+
+def chat_curriculum(route):
+    """The curriculum a chat question was routed to, used to partition the semantic cache."""
+    return {RAG_NCERT: "ncert", RAG_KTS: "kts"}.get(route, "general")
+
+async def semantic_lookup(endpoint, query, language, route, user_id, session_id, no_cache=False):
+    """
+    Returns (cached_answer, question_vector) for the first text turn of a session.
+
+    (None, None) when the semantic cache doesn't apply; after a miss, pass the vector
+    to semantic_cache.store() together with the fresh answer.
+    """
+    if semantic_cache is None or no_cache or not query or not semantic_cache.enabled_for(endpoint):
+        return None, None
+    if await session_manager.has_history(user_id, session_id):
+        return None, None
+    return await semantic_cache.lookup(endpoint, query, language, chat_curriculum(route))
+
+def saved_artifact(event):
+    """
+    Returns (filename, version) of the last artifact an event saved, or None.
+
+    Artifacts saved by a sub-agent behind an AgentTool are forwarded to the parent
+    session, so they show up in the delta of the parent's function response event.
+    """
+    if event.actions and event.actions.artifact_delta:
+        return list(event.actions.artifact_delta.items())[-1]
+    return None
+
+def encode_stream_record(record, use_sse, event=None):
+    """Encodes one record as an NDJSON line, or as a server-sent event."""
+    payload = json.dumps(record, ensure_ascii=False)
+    if use_sse:
+        return (f"event: {event}\n" if event else "") + f"data: {payload}\n\n"
+    return payload + "\n"
+
+def event_mentions(event, sentinel):
+    """True if the sentinel appears in an event's function call results (e.g. a sub-agent's answer)."""
+    return any(
+        sentinel in json.dumps(function_response.response, default=str, ensure_ascii=False)
+        for function_response in event.get_function_responses()
+    )
+
+async def stream_agent_response(runner: Runner, user_id: str, session_id: str, query: str, audio_bytes: Optional[bytes] = None, image_bytes: Optional[bytes] = None, stop_on: Optional[str] = None, state_delta: Optional[dict] = None):
+    """
+    Runs the agent in streaming mode and yields its output as it is generated.
+
+    Yields {"delta": text} for every partial text chunk, then one final
+    {"done": True, "text", "session_id", "artifact_name", "artifact_version"} record,
+    where the artifact is the last one saved during the run (e.g. a generated image).
+
+    Only the runner's own agent streams: when RootAgent delegates to a sub-agent through
+    an AgentTool (RAG, search, imagen), the sub-agent runs inside the tool call and its
+    text arrives only as RootAgent's final answer. Requests routed straight to a
+    sub-agent (see intent_router.py) do stream it.
+
+    If stop_on is given, the run is abandoned as soon as that text shows up in the
+    streamed output or in a tool result, and the final record has "stopped": True.
+    state_delta is merged into the session state before the run.
+    """
+    content = build_user_content(query, audio_bytes, image_bytes)
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+    final_response_text = "Agent did not produce a final response."
+    artifact = None
+    streamed_text = ""
+    stopped = False
+    started = time.perf_counter()
+    usage = [0, 0]
+    events = runner.run_async(user_id=user_id, session_id=session_id, new_message=content, run_config=run_config, state_delta=state_delta)
+    try:
+        async for event in events:
+            add_usage(usage, event)
+            artifact = saved_artifact(event) or artifact
+            if stop_on and event_mentions(event, stop_on):
+                final_response_text, stopped = stop_on, True
+                break
+            if event.partial:
+                if event.content and event.content.parts:
+                    delta = "".join(part.text for part in event.content.parts if part.text and not part.thought)
+                    if delta:
+                        streamed_text += delta
+                        if stop_on and stop_on in streamed_text:
+                            final_response_text, stopped = streamed_text, True
+                            break
+                        yield {"delta": delta}
+                continue
+            if event.is_final_response():
+                if event.content and event.content.parts:
+                    final_response_text = "".join(part.text for part in event.content.parts if part.text and not part.thought)
+                elif event.actions and event.actions.escalate:
+                    final_response_text = f"Agent escalated: {event.error_message or 'No specific message.'}"
+                break
+    finally:
+        # Stops the agent run when the client disconnects mid-stream
+        await events.aclose()
+
+    model_tiers.record(runner.agent, time.perf_counter() - started, *usage)
+    await session_manager.compact_history(user_id, session_id)
+    artifact_name, artifact_version = artifact or (None, None)
+    record = {
+        "done": True, "text": final_response_text, "session_id": session_id,
+        "artifact_name": artifact_name, "artifact_version": artifact_version,
+    }
+    if stop_on:
+        record["stopped"] = stopped
+    yield record
+
+def agent_stream_response(request: Request, records, **final_fields):
+    """
+    Wraps stream_agent_response() records in a StreamingResponse.
+
+    Server-sent events when the client sends Accept: text/event-stream, NDJSON otherwise.
+    final_fields are added to the final record.
+    """
+    use_sse = "text/event-stream" in request.headers.get("accept", "")
+
+    async def encode_records():
+        try:
+            async for record in records:
+                if record.get("done"):
+                    record.update(final_fields)
+                    yield encode_stream_record(record, use_sse, event="done")
+                else:
+                    yield encode_stream_record(record, use_sse)
+        except Exception as e:
+            print(f"Agent stream error: {e}")
+            yield encode_stream_record({"error": str(e)}, use_sse, event="error")
+        finally:
+            await records.aclose()
+
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(encode_records(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
 # --- FastAPI Endpoints ---
 
 class ChatRequest(BaseModel):
@@ -266,13 +561,14 @@ async def translate_text_endpoint(request: dict):
     text = request.get('text', '')
     target_language = request.get('target_language', 'en')
     source_language = request.get('source_language', 'en')
+    no_cache = bool(request.get('no_cache', False))
     
-    if not text or target_language == source_language:
+    if not text or target_language == source_language or not needs_translation(text, target_language, source_language):
         return {"translated_text": text}
     
     try:
         if TRANSLATION_AVAILABLE:
-            translated = GoogleTranslator(source=source_language, target=target_language).translate(text)
+            translated = await translate_async(text, source_language, target_language, no_cache=no_cache)
             return {"translated_text": translated}
         else:
             # Use fallback translation
@@ -287,17 +583,17 @@ async def translate_batch_endpoint(request: dict):
     texts = request.get('texts', [])
     target_language = request.get('target_language', 'en')
     source_language = request.get('source_language', 'en')
+    no_cache = bool(request.get('no_cache', False))
     
     if not texts or target_language == source_language:
         return {"translated_texts": texts}
     
-    translated_texts = []
+    failed_indices = []
     
     try:
         if TRANSLATION_AVAILABLE:
-            # Deep translator processes each text individually
-            translator_instance = GoogleTranslator(source=source_language, target=target_language)
-            translated_texts = [translator_instance.translate(text) for text in texts]
+            # Items are translated concurrently off the event loop; failures keep their original text
+            translated_texts, failed_indices = await translate_many(texts, source_language, target_language, no_cache=no_cache)
         else:
             # Use fallback translation for each text
             translated_texts = [translate_text(text, target_language) for text in texts]
@@ -305,100 +601,135 @@ async def translate_batch_endpoint(request: dict):
     except Exception as e:
         print(f"Batch translation error: {e}")
         translated_texts = texts  # Fallback to original texts
+        failed_indices = list(range(len(texts)))
     
-    return {"translated_texts": translated_texts}
+    return {
+        "translated_texts": translated_texts,
+        "failed_indices": failed_indices,
+        "partial": bool(failed_indices),
+    }
+
+@app.post("/api/translate-batch/stream")
+async def translate_batch_stream_endpoint(request: Request):
+    """
+    Streaming variant of /api/translate-batch.
+
+    Emits one {"index", "translated_text", "cached"} record per text as soon as it is ready
+    (translation memory hits first), then a final {"done": true, "failed_indices": [...]} record.
+    Records are NDJSON, or server-sent events when the client sends Accept: text/event-stream.
+    """
+    body = await request.json()
+    texts = body.get('texts', [])
+    target_language = body.get('target_language', 'en')
+    source_language = body.get('source_language', 'en')
+    no_cache = bool(body.get('no_cache', False))
+    use_sse = "text/event-stream" in request.headers.get("accept", "")
+
+    def encode(record, event=None):
+        return encode_stream_record(record, use_sse, event)
+
+    async def stream_records():
+        pending = {}  # task -> (index, text)
+        failed_indices = []
+        try:
+            for index, text in enumerate(texts):
+                if (not isinstance(text, str) or not text.strip() or target_language == source_language
+                        or not needs_translation(text, target_language, source_language)):
+                    yield encode({"index": index, "translated_text": text, "cached": True})
+                elif not TRANSLATION_AVAILABLE:
+                    yield encode({"index": index, "translated_text": translate_text(text, target_language), "cached": True})
+                else:
+                    cached = None if no_cache else translation_memory.get(source_language, target_language, text)
+                    if cached is not None:
+                        yield encode({"index": index, "translated_text": cached, "cached": True})
+                    else:
+                        # Memory was already checked above
+                        task = asyncio.ensure_future(translate_async(text, source_language, target_language, no_cache=True))
+                        pending[task] = (index, text)
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index, text = pending.pop(task)
+                    try:
+                        translated = task.result() or text
+                    except Exception as e:
+                        print(f"Streaming translation error for item {index}: {e}")
+                        failed_indices.append(index)
+                        translated = text
+                    yield encode({"index": index, "translated_text": translated, "cached": False})
+            yield encode({"done": True, "failed_indices": sorted(failed_indices)}, event="done")
+        finally:
+            # Client went away: stop waiting on the remaining items
+            for task in pending:
+                task.cancel()
+
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(stream_records(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+def bundle_response(bundle, request: Request):
+    """Serve a precompiled bundle with ETag revalidation and a precompressed body."""
+    headers = {
+        "ETag": bundle.etag,
+        "Cache-Control": f"public, max-age={config.TRANSLATION_BUNDLE_MAX_AGE_SECONDS}",
+        "Vary": "Accept-Encoding",
+    }
+    if request.headers.get("if-none-match") == bundle.etag:
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=bundle.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=bundle.body, media_type="application/json", headers=headers)
 
 @app.get("/api/translations/{language_code}")
-async def get_translations(language_code: str):
+async def get_translations(request: Request, language_code: str, no_cache: bool = Query(False)):
     """Get translations for UI elements in the specified language"""
-    
-    # Base English translations (UI keys)
-    english_translations = {
-        # Navigation
-        "dashboard": "Dashboard",
-        "learning_concepts": "Learning Concepts",
-        "prepare_lessons": "Prepare Lessons",
-        "create_curriculum": "Create Curriculum",
-        "ai_assistant": "AI Assistant",
-        
-        # Common UI
-        "welcome": "Welcome",
-        "loading": "Loading...",
-        "save": "Save",
-        "cancel": "Cancel",
-        "submit": "Submit",
-        "close": "Close",
-        "next": "Next",
-        "previous": "Previous",
-        "search": "Search",
-        "filter": "Filter",
-        
-        # Dashboard
-        "quick_actions": "Quick Actions",
-        "recent_activities": "Recent Activities",
-        "teaching_stats": "Teaching Statistics",
-        "grade_level": "Grade Level",
-        "curriculum_type": "Curriculum Type",
-        
-        # Learning Concepts
-        "explain_concept": "Explain Concept",
-        "select_topic": "Select Topic",
-        "grade_optional": "Grade (Optional)",
-        "not_selected": "Not Selected",
-        "send_message": "Send Message",
-        
-        # Prepare Lessons
-        "generate_materials": "Generate Materials",
-        "study_material": "Study Material",
-        "assessment_questions": "Assessment Questions",
-        "generated_diagram": "Generated Diagram",
-        "select_subject": "Select Subject",
-        "select_grade": "Select Grade",
-        
-        # AI Assistant
-        "teaching_assistant": "Teaching Assistant",
-        "ask_question": "Ask a question...",
-        "mentor_guidance": "Mentor Guidance",
-        
-        # Messages
-        "welcome_message": "Welcome to Sahayak, your AI teaching assistant!",
-        "how_can_i_help": "How can I help you with your teaching today?",
-        "processing": "Processing your request...",
-        "error_message": "An error occurred. Please try again.",
-        
-        # User Profile
-        "profile": "Profile",
-        "settings": "Settings",
-        "logout": "Logout",
-        "teaching_grades": "Teaching Grades",
-        "school_name": "School Name",
-        "district": "District",
-        "state": "State"
-    }
-    
-    if language_code == 'en':
-        return {"translations": english_translations}
+    bundle = translation_bundles.get(language_code)
+    if bundle is not None and not no_cache:
+        if bundle.is_stale and TRANSLATION_AVAILABLE:
+            asyncio.create_task(translation_bundles.refresh(translate_many, [language_code]))
+        return bundle_response(bundle, request)
     
     try:
-        # Translate all keys to the target language
-        translated_texts = {}
-        for key, english_text in english_translations.items():
-            try:
-                if TRANSLATION_AVAILABLE:
-                    translation = GoogleTranslator(source='en', target=language_code).translate(english_text)
-                    translated_texts[key] = translation
-                else:
-                    # Use fallback translation
-                    translated_texts[key] = translate_text(key, language_code)
-            except Exception as e:
-                print(f"Translation error for {key}: {e}")
-                translated_texts[key] = english_text  # Fallback to English
+        # No bundle yet: translate all keys to the target language
+        if TRANSLATION_AVAILABLE:
+            keys = list(ENGLISH_UI_STRINGS.keys())
+            values, failed_indices = await translate_many(list(ENGLISH_UI_STRINGS.values()), 'en', language_code, no_cache=no_cache)
+            translated_texts = dict(zip(keys, values))  # Failed keys fall back to English
+            if failed_indices:
+                print(f"Translation errors for keys: {[keys[i] for i in failed_indices]}")
+            if language_code in SUPPORTED_LANGUAGES:
+                catalog = {key: translated_texts[key] for i, key in enumerate(keys) if i not in failed_indices}
+                # Hand-checked seed entries win over fresh machine translations
+                catalog = merge_seeds(language_code, catalog)
+                translated_texts.update(catalog)
+                translation_bundles.put(make_bundle(language_code, catalog))
+        else:
+            # Use fallback translation
+            translated_texts = {key: translate_text(key, language_code) for key in ENGLISH_UI_STRINGS}
         
         return {"translations": translated_texts}
         
     except Exception as e:
         print(f"Translation service error: {e}")
-        return {"translations": english_translations}  # Fallback to English
+        return {"translations": ENGLISH_UI_STRINGS}  # Fallback to English
+
+async def read_image_as_png(image_file: Optional[UploadFile]) -> Optional[bytes]:
+    """
+    Reads an uploaded image and converts it to PNG bytes.
+    """
+    if not image_file:
+        return None
+    # FastAPI handles file uploads in memory or as temporary files.
+    # We need to read the bytes and potentially convert to PNG if not already.
+    try:
+        image_data = await image_file.read()
+        # Attempt to open as PIL Image to ensure it's a valid image and convert to PNG
+        img = Image.open(io.BytesIO(image_data))
+        png_buffer = io.BytesIO()
+        img.save(png_buffer, format='PNG')
+        return png_buffer.getvalue()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid image file: {e}")
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_with_agent(
@@ -407,7 +738,8 @@ async def chat_with_agent(
     session_id: Optional[str] = Form(None),
     language: str = Form("en"),  # Add language parameter
     audio_file: Optional[UploadFile] = File(None),
-    image_file: Optional[UploadFile] = File(None)
+    image_file: Optional[UploadFile] = File(None),
+    no_cache: bool = Form(False)  # skip the semantic cache for this question
 ):
     """
     Endpoint for chatting with the ADK Agent using text, audio, or image input.
@@ -418,92 +750,53 @@ async def chat_with_agent(
     if session_id is None:
         session_id = str(uuid.uuid4())
     
-    runner = await session_manager.get_or_create_runner(user_id, session_id)
+    # The mentor preamble is part of the per-language agent instruction, only the query is sent.
+    # Text queries with a confidently predicted tool go straight to that sub-agent.
+    route = predicted_route(query, "/chat") if not audio_file and not image_file else None
+    prior_turns = await session_manager.prior_turns(user_id, session_id)
+    chat_agent, chat_message = prompt_registry.render(
+        "chat_mentor", language, route=route, prior_turns=prior_turns, query=query or ""
+    )
+    if query and not audio_file and not image_file:
+        chat_agent = tiered_agent(chat_agent, "/chat", query)
+    runner = await session_manager.get_or_create_runner(user_id, session_id, agent=chat_agent)
+    started = time.perf_counter()
 
     audio_bytes = None
     if audio_file:
         audio_bytes = await audio_file.read()
 
-    image_bytes = None
-    if image_file:
-        # FastAPI handles file uploads in memory or as temporary files.
-        # We need to read the bytes and potentially convert to PNG if not already.
-        try:
-            image_data = await image_file.read()
-            # Attempt to open as PIL Image to ensure it's a valid image and convert to PNG
-            img = Image.open(io.BytesIO(image_data))
-            png_buffer = io.BytesIO()
-            img.save(png_buffer, format='PNG')
-            image_bytes = png_buffer.getvalue()
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Invalid image file: {e}")
+    image_bytes = await read_image_as_png(image_file)
 
-    # Create enhanced prompt with system instructions for friendly mentor behavior
     enhanced_query = query or ""
     if enhanced_query:
-        # Get language information for better AI understanding
-        supported_languages = {
-            'en': 'English', 'hi': 'Hindi', 'kn': 'Kannada', 'te': 'Telugu', 
-            'ta': 'Tamil', 'ml': 'Malayalam', 'bn': 'Bengali', 'gu': 'Gujarati',
-            'mr': 'Marathi', 'pa': 'Punjabi', 'or': 'Odia', 'as': 'Assamese',
-            'fr': 'French', 'de': 'German', 'es': 'Spanish', 'pt': 'Portuguese',
-            'ja': 'Japanese', 'ko': 'Korean', 'ar': 'Arabic', 'ru': 'Russian', 'zh': 'Chinese'
-        }
-        language_name = supported_languages.get(language, 'English')
-        
-        system_prompt = f"""You are Sahayak, an expert educational AI assistant and friendly mentor for teachers. 
-
-CRITICAL INSTRUCTION: You MUST respond in {language_name} language only. If the language is not English, ensure your entire response is in {language_name}.
-
-Your role is to:
-
-🎓 **Be a Subject Expert**: Provide accurate, comprehensive knowledge across all subjects (Mathematics, Science, English, Social Studies, etc.)
-
-🤝 **Be a Friendly Mentor**: Always respond in a warm, encouraging, and supportive manner. Use appropriate honorific phrases in {language_name} for addressing teachers respectfully.
-
-💡 **Provide Practical Guidance**: Offer actionable teaching tips, classroom strategies, and real-world examples
-
-📚 **Curriculum-Aware**: Consider the teacher's curriculum (NCERT/KTS) and grade level when providing advice
-
-🎯 **Address Educational Needs**: Help with:
-- Lesson planning and curriculum development
-- Classroom management and student engagement
-- Assessment strategies and evaluation methods
-- Subject-specific teaching methodologies
-- Student motivation and learning difficulties
-- Professional development and teaching resources
-- Multi-grade classroom strategies
-- Technology integration in education
-
-🌟 **Always Be**: 
-- Polite, respectful, and encouraging
-- Solution-oriented and practical
-- Age-appropriate in your suggestions
-- Culturally sensitive and inclusive
-- Patient and understanding of teaching challenges
-
-LANGUAGE REQUIREMENT: Your entire response must be in {language_name}. Do not mix languages or provide English translations unless specifically requested.
-
-Now, please respond to the teacher's query in {language_name}: {enhanced_query}"""
-        
-        result = await get_agent_response_async(
-            runner,
-            user_id,
-            session_id,
-            system_prompt,
-            audio_bytes,
-            image_bytes
+        cached_answer, question_vector = (None, None) if audio_bytes or image_bytes else await semantic_lookup(
+            "/chat", query, language, route, user_id, session_id, no_cache
         )
-        response_text = result["text"]
+        if cached_answer is not None:
+            await session_manager.append_turn(user_id, session_id, chat_message, cached_answer, (chat_agent or root_agent).name)
+            response_text = cached_answer
+            latency_stats.record("chat.semantic_hit", time.perf_counter() - started)
+        else:
+            result = await get_agent_response_async(
+                runner,
+                user_id,
+                session_id,
+                chat_message,
+                audio_bytes,
+                image_bytes
+            )
+            response_text = result["text"]
+            if question_vector is not None and cacheable_response(response_text):
+                semantic_cache.store(question_vector, query, response_text, language, chat_curriculum(route))
+            latency_stats.record("chat.direct" if route else "chat.dispatcher", time.perf_counter() - started)
         
         # Additional translation if the AI didn't respond in the target language
         if language != 'en' and TRANSLATION_AVAILABLE:
             try:
-                # Check if response needs translation (basic detection)
-                if any(char in response_text for char in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ') and language in ['hi', 'kn', 'te', 'ta', 'ml', 'bn', 'gu', 'mr', 'pa', 'or', 'as']:
-                    # Looks like English text but should be in local language
-                    translation = GoogleTranslator(source='en', target=language).translate(response_text)
-                    response_text = translation
+                # Only the chunks still written outside the target script are translated
+                if language in ['hi', 'kn', 'te', 'ta', 'ml', 'bn', 'gu', 'mr', 'pa', 'or', 'as']:
+                    response_text = await translate_markdown(response_text, 'en', language)
             except Exception as e:
                 print(f"Post-processing translation error: {e}")
     else:
@@ -520,8 +813,124 @@ Now, please respond to the teacher's query in {language_name}: {enhanced_query}"
     
     return ChatResponse(response=response_text, session_id=session_id, user_id=user_id)
 
+@app.post("/chat/stream")
+async def chat_with_agent_stream(
+    request: Request,
+    query: Optional[str] = Form(None),
+    user_id: str = Form("default_user"),
+    session_id: Optional[str] = Form(None),
+    language: str = Form("en"),
+    audio_file: Optional[UploadFile] = File(None),
+    image_file: Optional[UploadFile] = File(None),
+    no_cache: bool = Form(False)  # skip the semantic cache for this question
+):
+    """
+    Streaming variant of /chat: partial text is forwarded as it is generated.
+
+    The final record carries the complete response; for Indic languages it is
+    post-translated like /chat, so clients should replace the streamed text with it.
+    Answers RootAgent gets from a sub-agent tool (textbook RAG, web search, image
+    generation) are not streamed token by token; they arrive with the final record.
+    Questions routed directly to a sub-agent stream normally.
+    """
+    if not query and not audio_file and not image_file:
+        raise HTTPException(status_code=400, detail="Either 'query', 'audio_file', or 'image_file' must be provided.")
+
+    if session_id is None:
+        session_id = str(uuid.uuid4())
+
+    route = predicted_route(query, "/chat/stream") if not audio_file and not image_file else None
+    prior_turns = await session_manager.prior_turns(user_id, session_id)
+    chat_agent, chat_message = prompt_registry.render(
+        "chat_mentor", language, route=route, prior_turns=prior_turns, query=query or ""
+    )
+    if query and not audio_file and not image_file:
+        chat_agent = tiered_agent(chat_agent, "/chat/stream", query)
+    runner = await session_manager.get_or_create_runner(user_id, session_id, agent=chat_agent)
+    audio_bytes = await audio_file.read() if audio_file else None
+    image_bytes = await read_image_as_png(image_file)
+
+    async def agent_records():
+        cached_answer, question_vector = (None, None) if audio_bytes or image_bytes else await semantic_lookup(
+            "/chat/stream", query, language, route, user_id, session_id, no_cache
+        )
+        if cached_answer is not None:
+            await session_manager.append_turn(user_id, session_id, chat_message, cached_answer, (chat_agent or root_agent).name)
+            yield {"delta": cached_answer}
+            yield {
+                "done": True, "text": cached_answer, "session_id": session_id,
+                "artifact_name": None, "artifact_version": None, "cached": True,
+            }
+            return
+        async for record in stream_agent_response(runner, user_id, session_id, chat_message if query else "", audio_bytes, image_bytes):
+            if record.get("done") and question_vector is not None and cacheable_response(record["text"]):
+                semantic_cache.store(question_vector, query, record["text"], language, chat_curriculum(route))
+            yield record
+
+    async def records():
+        async for record in agent_records():
+            if record.get("done") and query and language in ['hi', 'kn', 'te', 'ta', 'ml', 'bn', 'gu', 'mr', 'pa', 'or', 'as'] and TRANSLATION_AVAILABLE:
+                try:
+                    record["text"] = await translate_markdown(record["text"], 'en', language)
+                except Exception as e:
+                    print(f"Post-processing translation error: {e}")
+            yield record
+
+    return agent_stream_response(request, records(), user_id=user_id)
+
 # --- New Educational Endpoints ---
 
+CURRICULUM_NOT_FOUND = "CURRICULUM_NOT_FOUND"
+
+# Outcomes of hedged /learning/concept lookups
+hedge_stats = {"requests": 0, "curriculum_wins": 0, "web_wins": 0, "web_cancelled": 0, "curriculum_errors": 0}
+
+def curriculum_missed(rag_result):
+    return rag_result["stopped"] or CURRICULUM_NOT_FOUND in rag_result["text"]
+
+async def run_curriculum_pass(runner: Runner, user_id: str, session_id: str, rag_prompt: str, state_delta: Optional[dict] = None):
+    """
+    Runs the curriculum lookup, streaming it so a miss is noticed in the first tokens (or in the
+    retrieval agent's result) and the run is abandoned instead of generating to the end.
+    """
+    rag_result = None
+    async for record in stream_agent_response(runner, user_id, session_id, rag_prompt, stop_on=CURRICULUM_NOT_FOUND, state_delta=state_delta):
+        if record.get("done"):
+            rag_result = record
+    return rag_result
+
+async def hedged_concept_lookup(runner: Runner, rag_prompt: str, search_agent, search_prompt: str, user_id: str, session_id: str, state_delta: Optional[dict] = None):
+    """
+    Runs the curriculum lookup and the web search concurrently and returns (curriculum_found, text).
+
+    The web search runs in its own throwaway session, unique to this call, so the two runs don't
+    interleave events in one history. It is cancelled as soon as the curriculum answer is found.
+    """
+    hedge_stats["requests"] += 1
+    # One helper session per request: concurrent lookups on the same session must not share (and delete) it
+    web_session_id = f"{session_id}_web_{uuid.uuid4().hex}"
+    search_runner = await session_manager.get_or_create_runner(user_id, web_session_id, agent=search_agent)
+    web_task = asyncio.ensure_future(get_agent_response_async(search_runner, user_id, web_session_id, search_prompt))
+    try:
+        try:
+            rag_result = await run_curriculum_pass(runner, user_id, session_id, rag_prompt, state_delta)
+        except Exception as e:
+            print(f"Hedged curriculum lookup failed, using web search: {e}")
+            hedge_stats["curriculum_errors"] += 1
+            rag_result = None
+        if rag_result is not None and not curriculum_missed(rag_result):
+            hedge_stats["curriculum_wins"] += 1
+            if not web_task.done():
+                hedge_stats["web_cancelled"] += 1
+            return True, rag_result["text"]
+        hedge_stats["web_wins"] += 1
+        return False, (await web_task)["text"]
+    finally:
+        web_task.cancel()
+        # Let the cancelled run unwind before its session is deleted under it
+        await asyncio.gather(web_task, return_exceptions=True)
+        await session_manager.discard_session(user_id, web_session_id)
+
 @app.post("/learning/concept")
 async def explain_concept(
     concept: str = Form(...),
@@ -529,10 +938,12 @@ async def explain_concept(
     language: str = Form("en"),
     user_id: str = Form("default_user"),
     session_id: Optional[str] = Form(None),
-    curriculum_type: str = Form("ncert")  # Add curriculum type parameter
+    curriculum_type: str = Form("ncert"),  # Add curriculum type parameter
+    hedged: Optional[bool] = Form(None)  # None uses CONCEPT_HEDGED_SEARCH
 ):
     """
-    Explain educational concept with RAG-first approach: check curriculum DB first, then fallback to Google search
+    Explain educational concept with RAG-first approach: check curriculum DB first, then fallback to Google search.
+    In hedged mode both lookups start at once and the curriculum answer wins when it is found.
     """
     if session_id is None:
         session_id = f"learning_{concept}_{grade}_{uuid.uuid4()}"
@@ -540,75 +951,63 @@ async def explain_concept(
     try:
         print(f"Learning concept request: concept={concept}, grade={grade}, language={language}, curriculum_type={curriculum_type}")
         
-        runner = await session_manager.get_or_create_runner(user_id, session_id)
+        # The curriculum decides the retrieval agent, so RootAgent's dispatch step can be skipped
+        curriculum_route = {"ncert": RAG_NCERT, "kts": RAG_KTS}.get(curriculum_type.lower())
+        rag_route = known_route(curriculum_route, "/learning/concept") if curriculum_route else None
+        rag_agent, rag_prompt = prompt_registry.render(
+            "concept_curriculum", language, route=rag_route,
+            concept=concept, grade=grade, curriculum=curriculum_type.upper()
+        )
+        runner = await session_manager.get_or_create_runner(
+            user_id, session_id, agent=tiered_agent(rag_agent, "/learning/concept", rag_prompt)
+        )
         print(f"Got runner for session: {session_id}")
+        rag_filter = textbook_filter(curriculum_type, grade)
         
-        # First, try to find the concept in the curriculum database
-        rag_prompt = f"""First, search the {curriculum_type.upper()} curriculum database for Grade {grade} to find information about "{concept}".
-
-IMPORTANT: Please respond in {language} language only.
-
-If you find relevant information in the curriculum:
-- Provide a comprehensive summary of what's found
-- Include key points, definitions, and examples from the curriculum
-- Format it appropriately for Grade {grade} students
-- Include page references or chapter information if available
-- Respond in {language} language
-
-If NO information is found in the curriculum:
-- Respond with "CURRICULUM_NOT_FOUND"
-- Then proceed to search the web for general information about this concept
-
-Search the curriculum database now."""
-        
-        print(f"Sending RAG prompt to agent...")
-        # Get RAG response
-        rag_result = await get_agent_response_async(runner, user_id, session_id, rag_prompt)
-        print(f"RAG result received: {rag_result}")
+        def render_search_prompt():
+            search_agent, search_prompt = prompt_registry.render(
+                "concept_web", language, route=known_route(SEARCH, "/learning/concept"),
+                concept=concept, grade=grade, curriculum=curriculum_type.upper()
+            )
+            return tiered_agent(search_agent, "/learning/concept", search_prompt), search_prompt
         
-        # Check if curriculum data was found
-        if "CURRICULUM_NOT_FOUND" in rag_result["text"]:
-            # Fallback to Google search with grade-specific tailoring
-            search_prompt = f"""Since "{concept}" was not found in the {curriculum_type.upper()} curriculum for Grade {grade}, 
-search the web for information about this concept and provide a grade-appropriate explanation.
-
-IMPORTANT: Please respond in {language} language only.
-
-Requirements:
-1. Search for general information about "{concept}"
-2. Tailor the explanation specifically for Grade {grade} students
-3. Use simple, age-appropriate language
-4. Include real-world examples relevant to {grade}-year-old students
-5. Provide teaching tips for classroom delivery
-6. Start your response with: "📚 **Curriculum Note**: The requested topic '{concept}' was not found in Grade {grade} {curriculum_type.upper()} curriculum. Below is a custom explanation tailored for your grade level."
-7. Respond entirely in {language} language
-
-Make the explanation engaging and suitable for classroom teaching."""
-            
-            search_result = await get_agent_response_async(runner, user_id, session_id, search_prompt)
-            
-            return {
-                "response": search_result["text"],
-                "session_id": session_id,
-                "concept": concept,
-                "grade": grade,
-                "language": language,
-                "curriculum_type": curriculum_type,
-                "source": "web_search",
-                "curriculum_found": False
-            }
+        started = time.perf_counter()
+        use_hedged = config.CONCEPT_HEDGED_SEARCH if hedged is None else hedged
+        if use_hedged:
+            search_agent, search_prompt = render_search_prompt()
+            curriculum_found, response_text = await hedged_concept_lookup(
+                runner, rag_prompt, search_agent, search_prompt, user_id, session_id, rag_filter
+            )
+            latency_stats.record("concept.hedged_hit" if curriculum_found else "concept.hedged_miss", time.perf_counter() - started)
         else:
-            # Curriculum data was found
-            return {
-                "response": rag_result["text"],
-                "session_id": session_id,
-                "concept": concept,
-                "grade": grade,
-                "language": language,
-                "curriculum_type": curriculum_type,
-                "source": "curriculum_db",
-                "curriculum_found": True
-            }
+            print(f"Sending RAG prompt to agent...")
+            rag_result = await run_curriculum_pass(runner, user_id, session_id, rag_prompt, rag_filter)
+            print(f"RAG result received: {rag_result}")
+            
+            # Check if curriculum data was found
+            curriculum_found = not curriculum_missed(rag_result)
+            if curriculum_found:
+                response_text = rag_result["text"]
+                latency_stats.record("concept.hit", time.perf_counter() - started)
+            else:
+                latency_stats.record("concept.miss_detected", time.perf_counter() - started)
+                # Fallback to Google search with grade-specific tailoring
+                search_agent, search_prompt = render_search_prompt()
+                search_runner = await session_manager.get_or_create_runner(user_id, session_id, agent=search_agent)
+                search_result = await get_agent_response_async(search_runner, user_id, session_id, search_prompt)
+                response_text = search_result["text"]
+                latency_stats.record("concept.miss", time.perf_counter() - started)
+        
+        return {
+            "response": response_text,
+            "session_id": session_id,
+            "concept": concept,
+            "grade": grade,
+            "language": language,
+            "curriculum_type": curriculum_type,
+            "source": "curriculum_db" if curriculum_found else "web_search",
+            "curriculum_found": curriculum_found
+        }
         
     except Exception as e:
         print(f"Error in explain_concept: {e}")
@@ -649,13 +1048,50 @@ You can find more specific information about {concept} in your Grade {grade} {cu
             "error": str(e)
         }
 
+async def record_turn(prompt, text, user_id, session_id):
+    """Create a session for a response produced without running the agent and record the turn in it."""
+    await session_manager.get_or_create_runner(user_id, session_id)
+    await session_manager.append_turn(user_id, session_id, prompt, text, root_agent.name)
+
+async def generate_cached(endpoint, params, prompt, user_id, session_id, no_cache=False, state_delta=None):
+    """
+    Runs a generation prompt built only from params, answered from the response cache when possible.
+
+    Returns (text, cached). state_delta (the textbook filter) must be derived from params too. With no_cache=True the lookup is skipped but the fresh response
+    replaces the cached one. A miss joins an identical request that is already running,
+    if any. For cache hits and joined requests the session is created with the prompt and
+    the response as its first turn, so the returned session_id can be continued like any other.
+    """
+    key = response_cache.key(endpoint, params)
+    if no_cache:
+        response_cache.bypass(endpoint)
+    else:
+        text = response_cache.get(endpoint, key)
+        if text is not None:
+            await record_turn(prompt, text, user_id, session_id)
+            return text, True
+
+    async def run():
+        runner = await session_manager.get_or_create_runner(user_id, session_id, agent=tiered_agent(None, endpoint, prompt))
+        response_data = await get_agent_response_async(runner, user_id, session_id, prompt, state_delta=state_delta)
+        if cacheable_response(response_data["text"]):
+            response_cache.put(key, response_data["text"])
+        return response_data["text"]
+
+    text, shared = await singleflight.do(key, run)
+    if shared:
+        # The run used the first caller's session, not this one
+        await record_turn(prompt, text, user_id, session_id)
+    return text, False
+
 @app.post("/learning/activities")
 async def generate_activities(
     concept: str = Form(...),
     grade: int = Form(...),
     activity_type: str = Form("classroom"),  # classroom, homework, assessment
     count: int = Form(3),
-    user_id: str = Form("default_user")
+    user_id: str = Form("default_user"),
+    no_cache: bool = Form(False)  # regenerate instead of serving a cached response
 ):
     """
     Generate educational activities for a concept
@@ -665,10 +1101,23 @@ async def generate_activities(
     prompt = f"""Generate {count} {activity_type} activities for teaching {concept} to Grade {grade} students.
                 Include materials needed, step-by-step instructions, and learning objectives."""
     
-    runner = await session_manager.get_or_create_runner(user_id, session_id)
-    response_data = await get_agent_response_async(runner, user_id, session_id, prompt)
+    params = {"concept": concept, "grade": grade, "activity_type": activity_type, "count": count}
+    text, cached = await generate_cached(
+        "/learning/activities", params, prompt, user_id, session_id, no_cache, textbook_filter(grade=grade)
+    )
     
-    return {"response": response_data["text"], "session_id": session_id}
+    return {"response": text, "session_id": session_id, "cached": cached}
+
+def lesson_plan_prompt(topic, grade, subject, duration):
+    return f"""Create a comprehensive {duration}-minute lesson plan for teaching {topic} in {subject} for Grade {grade} students.
+                Include:
+                - Learning objectives
+                - Introduction (5-10 min)
+                - Main content with activities (20-30 min)
+                - Assessment methods
+                - Homework suggestions
+                - Teaching tips and strategies
+                Format for easy implementation in classroom."""
 
 @app.post("/lesson/prepare")
 async def prepare_lesson(
@@ -678,28 +1127,51 @@ async def prepare_lesson(
     duration: int = Form(45),
     lesson_type: str = Form("comprehensive"),  # comprehensive, basic, advanced
     user_id: str = Form("default_user"),
-    session_id: Optional[str] = Form(None)
+    session_id: Optional[str] = Form(None),
+    no_cache: bool = Form(False)  # regenerate instead of serving a cached response
 ):
     """
     Generate comprehensive lesson plan and study materials
     """
-    if session_id is None:
-        session_id = f"lesson_{topic}_{grade}_{uuid.uuid4()}"
+    prompt = lesson_plan_prompt(topic, grade, subject, duration)
     
-    prompt = f"""Create a comprehensive {duration}-minute lesson plan for teaching {topic} in {subject} for Grade {grade} students.
-                Include:
-                - Learning objectives
-                - Introduction (5-10 min)
-                - Main content with activities (20-30 min)
-                - Assessment methods
-                - Homework suggestions
-                - Teaching tips and strategies
-                Format for easy implementation in classroom."""
+    if session_id is not None:
+        # Continuing a conversation: the answer depends on its history, so it isn't cached
+        runner = await session_manager.get_or_create_runner(user_id, session_id, agent=tiered_agent(None, "/lesson/prepare", prompt))
+        response_data = await get_agent_response_async(
+            runner, user_id, session_id, prompt, state_delta=textbook_filter(grade=grade, subject=subject)
+        )
+        return {"response": response_data["text"], "session_id": session_id, "cached": False}
     
-    runner = await session_manager.get_or_create_runner(user_id, session_id)
-    response_data = await get_agent_response_async(runner, user_id, session_id, prompt)
+    session_id = f"lesson_{topic}_{grade}_{uuid.uuid4()}"
+    params = {"topic": topic, "grade": grade, "subject": subject, "duration": duration}
+    text, cached = await generate_cached(
+        "/lesson/prepare", params, prompt, user_id, session_id, no_cache, textbook_filter(grade=grade, subject=subject)
+    )
     
-    return {"response": response_data["text"], "session_id": session_id}
+    return {"response": text, "session_id": session_id, "cached": cached}
+
+@app.post("/lesson/prepare/stream")
+async def prepare_lesson_stream(
+    request: Request,
+    topic: str = Form(...),
+    grade: int = Form(...),
+    subject: str = Form(...),
+    duration: int = Form(45),
+    lesson_type: str = Form("comprehensive"),
+    user_id: str = Form("default_user"),
+    session_id: Optional[str] = Form(None)
+):
+    """
+    Streaming variant of /lesson/prepare
+    """
+    if session_id is None:
+        session_id = f"lesson_{topic}_{grade}_{uuid.uuid4()}"
+    
+    prompt = lesson_plan_prompt(topic, grade, subject, duration)
+    runner = await session_manager.get_or_create_runner(user_id, session_id, agent=tiered_agent(None, "/lesson/prepare/stream", prompt))
+    records = stream_agent_response(runner, user_id, session_id, prompt, state_delta=textbook_filter(grade=grade, subject=subject))
+    return agent_stream_response(request, records)
 
 @app.post("/lesson/materials")
 async def generate_study_materials(
@@ -707,7 +1179,8 @@ async def generate_study_materials(
     grade: int = Form(...),
     subject: str = Form(...),
     material_type: str = Form("comprehensive"),  # comprehensive, summary, detailed
-    user_id: str = Form("default_user")
+    user_id: str = Form("default_user"),
+    no_cache: bool = Form(False)  # regenerate instead of serving a cached response
 ):
     """
     Generate study materials for a specific topic
@@ -722,10 +1195,23 @@ async def generate_study_materials(
                 - NCERT textbook references
                 - Additional resources"""
     
-    runner = await session_manager.get_or_create_runner(user_id, session_id)
-    response_data = await get_agent_response_async(runner, user_id, session_id, prompt)
+    params = {"topic": topic, "grade": grade, "subject": subject, "material_type": material_type}
+    text, cached = await generate_cached(
+        "/lesson/materials", params, prompt, user_id, session_id, no_cache, textbook_filter(grade=grade, subject=subject)
+    )
     
-    return {"response": response_data["text"], "session_id": session_id}
+    return {"response": text, "session_id": session_id, "cached": cached}
+
+def curriculum_prompt(grade, subjects_list, curriculum_type, academic_year):
+    return f"""Generate a comprehensive year-long curriculum for Grade {grade} covering {', '.join(subjects_list)} for academic year {academic_year}.
+                Based on {curriculum_type.upper()} guidelines.
+                Include:
+                - Monthly planning for each subject
+                - Chapter breakdown with learning objectives
+                - Assessment schedule
+                - Resource requirements
+                - Integration opportunities between subjects
+                Format as structured curriculum plan."""
 
 @app.post("/curriculum/generate")
 async def generate_curriculum(
@@ -747,27 +1233,48 @@ async def generate_curriculum(
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON format for subjects")
     
-    prompt = f"""Generate a comprehensive year-long curriculum for Grade {grade} covering {', '.join(subjects_list)} for academic year {academic_year}.
-                Based on {curriculum_type.upper()} guidelines.
-                Include:
-                - Monthly planning for each subject
-                - Chapter breakdown with learning objectives
-                - Assessment schedule
-                - Resource requirements
-                - Integration opportunities between subjects
-                Format as structured curriculum plan."""
+    prompt = curriculum_prompt(grade, subjects_list, curriculum_type, academic_year)
     
-    runner = await session_manager.get_or_create_runner(user_id, session_id)
-    response_data = await get_agent_response_async(runner, user_id, session_id, prompt)
+    runner = await session_manager.get_or_create_runner(user_id, session_id, agent=tiered_agent(None, "/curriculum/generate", prompt))
+    response_data = await get_agent_response_async(
+        runner, user_id, session_id, prompt, state_delta=textbook_filter(curriculum_type, grade)
+    )
     
     return {"response": response_data["text"], "session_id": session_id}
 
+@app.post("/curriculum/generate/stream")
+async def generate_curriculum_stream(
+    request: Request,
+    grade: int = Form(...),
+    subjects: str = Form(...),
+    curriculum_type: str = Form("ncert"),
+    academic_year: str = Form("2024-25"),
+    user_id: str = Form("default_user"),
+    session_id: Optional[str] = Form(None)
+):
+    """
+    Streaming variant of /curriculum/generate
+    """
+    if session_id is None:
+        session_id = f"curriculum_{grade}_{uuid.uuid4()}"
+    
+    try:
+        subjects_list = json.loads(subjects)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON format for subjects")
+    
+    prompt = curriculum_prompt(grade, subjects_list, curriculum_type, academic_year)
+    runner = await session_manager.get_or_create_runner(user_id, session_id, agent=tiered_agent(None, "/curriculum/generate/stream", prompt))
+    records = stream_agent_response(runner, user_id, session_id, prompt, state_delta=textbook_filter(curriculum_type, grade))
+    return agent_stream_response(request, records)
+
 @app.post("/curriculum/monthly-plan")
 async def generate_monthly_plan(
     grade: int = Form(...),
     subject: str = Form(...),
     month: str = Form(...),
-    user_id: str = Form("default_user")
+    user_id: str = Form("default_user"),
+    no_cache: bool = Form(False)  # regenerate instead of serving a cached response
 ):
     """
     Generate detailed monthly plan for a specific subject
@@ -777,10 +1284,12 @@ async def generate_monthly_plan(
     prompt = f"""Create a detailed monthly plan for {subject} in Grade {grade} for {month}.
                 Include weekly breakdown, learning objectives, activities, and assessments."""
     
-    runner = await session_manager.get_or_create_runner(user_id, session_id)
-    response_data = await get_agent_response_async(runner, user_id, session_id, prompt)
+    params = {"grade": grade, "subject": subject, "month": month}
+    text, cached = await generate_cached(
+        "/curriculum/monthly-plan", params, prompt, user_id, session_id, no_cache, textbook_filter(grade=grade, subject=subject)
+    )
     
-    return {"response": response_data["text"], "session_id": session_id}
+    return {"response": text, "session_id": session_id, "cached": cached}
 
 @app.post("/assessment/generate")
 async def generate_assessment(
@@ -789,7 +1298,8 @@ async def generate_assessment(
     question_type: str = Form("mcq"),  # mcq, short_answer, long_answer, true_false
     count: int = Form(5),
     difficulty: str = Form("medium"),  # easy, medium, hard
-    user_id: str = Form("default_user")
+    user_id: str = Form("default_user"),
+    no_cache: bool = Form(False)  # regenerate instead of serving a cached response
 ):
     """
     Generate assessment questions for a topic
@@ -805,10 +1315,12 @@ async def generate_assessment(
                 - Learning objectives covered
                 Format questions for easy use in classroom."""
     
-    runner = await session_manager.get_or_create_runner(user_id, session_id)
-    response_data = await get_agent_response_async(runner, user_id, session_id, prompt)
+    params = {"topic": topic, "grade": grade, "question_type": question_type, "count": count, "difficulty": difficulty}
+    text, cached = await generate_cached(
+        "/assessment/generate", params, prompt, user_id, session_id, no_cache, textbook_filter(grade=grade)
+    )
     
-    return {"questions": response_data["text"], "topic": topic, "grade": grade}
+    return {"questions": text, "topic": topic, "grade": grade, "cached": cached}
 
 @app.post("/assessment/quiz")
 async def generate_quiz(
@@ -837,8 +1349,8 @@ async def generate_quiz(
                 - Time allocation per question
                 - Difficulty distribution"""
     
-    runner = await session_manager.get_or_create_runner(user_id, session_id)
-    response_data = await get_agent_response_async(runner, user_id, session_id, prompt)
+    runner = await session_manager.get_or_create_runner(user_id, session_id, agent=tiered_agent(None, "/assessment/quiz", prompt))
+    response_data = await get_agent_response_async(runner, user_id, session_id, prompt, state_delta=textbook_filter(grade=grade))
     
     return {"response": response_data["text"], "session_id": session_id}
 
@@ -858,7 +1370,11 @@ async def generate_educational_image(
     
     enhanced_prompt = f"Educational {style}: {prompt}. Style: {style}, suitable for classroom teaching, clear and informative."
     
-    runner = await session_manager.get_or_create_runner(user_id, session_id)
+    image_route = known_route(IMAGEN, "/image/generate")
+    image_agent = build_route_agent(image_route) if image_route else None
+    runner = await session_manager.get_or_create_runner(
+        user_id, session_id, agent=tiered_agent(image_agent, "/image/generate", enhanced_prompt)
+    )
     response_data = await get_agent_response_async(runner, user_id, session_id, enhanced_prompt)
     
     if response_data["bytes_base64"]:
@@ -885,8 +1401,19 @@ async def generate_diagram(
     prompt = f"""Generate a {diagram_type} diagram to explain {concept} for Grade {grade} students.
                 Make it educational, clear, and suitable for classroom use."""
     
-    runner = await session_manager.get_or_create_runner(user_id, session_id)
-    response_data = await get_agent_response_async(runner, user_id, session_id, prompt)
+    async def run():
+        image_route = known_route(IMAGEN, "/image/generate-diagram")
+        image_agent = build_route_agent(image_route) if image_route else None
+        runner = await session_manager.get_or_create_runner(
+            user_id, session_id, agent=tiered_agent(image_agent, "/image/generate-diagram", prompt)
+        )
+        return await get_agent_response_async(runner, user_id, session_id, prompt)
+    
+    # Concurrent requests for the same diagram share one generation
+    key = response_cache.key("/image/generate-diagram", {"concept": concept, "diagram_type": diagram_type, "grade": grade})
+    response_data, shared = await singleflight.do(key, run)
+    if shared:
+        await record_turn(prompt, response_data["text"], user_id, session_id)
     
     if response_data["bytes_base64"]:
         return {
@@ -902,7 +1429,8 @@ async def get_classroom_tips(
     topic: str = Form(...),
     grade: int = Form(...),
     classroom_size: str = Form("medium"),  # small, medium, large
-    user_id: str = Form("default_user")
+    user_id: str = Form("default_user"),
+    no_cache: bool = Form(False)  # regenerate instead of serving a cached response
 ):
     """
     Get classroom management and teaching tips
@@ -918,16 +1446,19 @@ async def get_classroom_tips(
                 - Assessment methods
                 - Common challenges and solutions"""
     
-    runner = await session_manager.get_or_create_runner(user_id, session_id)
-    response_data = await get_agent_response_async(runner, user_id, session_id, prompt)
+    params = {"topic": topic, "grade": grade, "classroom_size": classroom_size}
+    text, cached = await generate_cached(
+        "/teacher/classroom-tips", params, prompt, user_id, session_id, no_cache, textbook_filter(grade=grade)
+    )
     
-    return {"response": response_data["text"], "session_id": session_id}
+    return {"response": text, "session_id": session_id, "cached": cached}
 
 @app.post("/teacher/multi-grade-strategies")
 async def get_multi_grade_strategies(
     grades: str = Form(...),  # JSON array of grades
     subject: str = Form(...),
-    user_id: str = Form("default_user")
+    user_id: str = Form("default_user"),
+    no_cache: bool = Form(False)  # regenerate instead of serving a cached response
 ):
     """
     Get strategies for teaching multiple grades simultaneously
@@ -947,10 +1478,12 @@ async def get_multi_grade_strategies(
                 - Time management
                 - Student grouping methods"""
     
-    runner = await session_manager.get_or_create_runner(user_id, session_id)
-    response_data = await get_agent_response_async(runner, user_id, session_id, prompt)
+    params = {"grades": grades_list, "subject": subject}
+    text, cached = await generate_cached(
+        "/teacher/multi-grade-strategies", params, prompt, user_id, session_id, no_cache, textbook_filter(subject=subject)
+    )
     
-    return {"response": response_data["text"], "session_id": session_id}
+    return {"response": text, "session_id": session_id, "cached": cached}
 
 @app.get("/ncert/resources")
 async def get_ncert_resources(
@@ -1007,67 +1540,44 @@ async def synthesize_speech(text: str = Form(...)):
 async def list_corpus_books(curriculum: str, grade: int):
     """
     List available books in RAG corpus for specific curriculum and grade
-    Format: <curriculum>_<grade>_<subject>_<part>
+    Format: <curriculum>_class<grade>_<subject>_<part> (see corpora.parse_book_name)
     Returns: List of unique subjects
     """
     try:
         from vertexai.preview import rag
         
-        # Select corpus based on curriculum
-        if curriculum.lower() == "ncert":
-            corpus_id = "576460752303423488"
-        elif curriculum.lower() == "kts":
-            corpus_id = "5764607523034234880"
-        else:
+        corpus_name = RAG_CORPORA.get(curriculum.lower())
+        if corpus_name is None:
             return {"error": "Invalid curriculum type", "books": []}
         
-        corpus_name = f"projects/265110558107/locations/us-central1/ragCorpora/{corpus_id}"
-        
-        # List files in corpus
-        files = list(rag.list_files(corpus_name=corpus_name))
+        files = await asyncio.to_thread(lambda: list(rag.list_files(corpus_name=corpus_name)))
         
-        # Extract subjects from filenames
         subjects = set()
         for file in files:
-            filename = file.display_name.lower()
-            print(f"Processing file: {filename}")  # Debug log
-            
-            # Parse filename pattern: ncert_classX_subject_part.pdf
-            if f"class{grade}" in filename or f"grade{grade}" in filename:
-                # Remove .pdf extension
-                filename_clean = filename.replace('.pdf', '')
-                
-                # Split by underscores: ['ncert', 'class6', 'english', '1']
-                parts = filename_clean.split('_')
-                
-                if len(parts) >= 3:
-                    # Find the class/grade part
-                    for i, part in enumerate(parts):
-                        if f"class{grade}" in part or f"grade{grade}" in part:
-                            # Subject should be the next part
-                            if i + 1 < len(parts):
-                                subject = parts[i + 1]
-                                # Skip numeric parts and common suffixes
-                                if not subject.isdigit() and subject not in ['part', 'en', 'hi']:
-                                    subjects.add(subject.title())
-                            break
-            
-            # Also handle grade-X-subject format for backward compatibility
-            elif f"grade-{grade}" in filename:
-                parts = filename.replace('.pdf', '').split('-')
-                if len(parts) >= 3:
-                    for i, part in enumerate(parts):
-                        if str(grade) in part and i + 1 < len(parts):
-                            subject = parts[i + 1]
-                            if subject not in ['en', 'hi', 'part1', 'part2'] and not subject.isdigit():
-                                subjects.add(subject.title())
-                            break
+            book = parse_book_name(file.display_name or "")
+            if book and book.grade == grade:
+                subjects.add(book.subject.title())
         
-        return {"books": sorted(list(subjects))}
+        return {"books": sorted(subjects)}
     except Exception as e:
         print(f"Error listing corpus books: {e}")
         return {"error": str(e), "books": []}
 
+def next_working_days(count=5):
+    """
+    The next `count` weekdays after today, formatted like "Monday, July 14".
+    """
+    from datetime import datetime, timedelta
+    
+    working_days = []
+    current_date = datetime.now()
+    while len(working_days) < count:
+        current_date += timedelta(days=1)
+        # Check if it's a weekday (Monday=0, Sunday=6)
+        if current_date.weekday() < 5:  # Monday to Friday
+            working_days.append(current_date.strftime("%A, %B %d"))
+    return working_days
+
 @app.post("/api/schedule/generate")
 async def generate_ai_schedule(
     curriculum: str = Form(...),
@@ -1080,69 +1590,24 @@ async def generate_ai_schedule(
     Generate 5-day lesson schedule for specific subject based on vector DB analysis
     """
     try:
-        from datetime import datetime, timedelta
+        working_days = next_working_days()
         
-        # Calculate next 5 working days
-        def calculate_working_days():
-            today = datetime.now()
-            working_days = []
-            current_date = today
-            
-            while len(working_days) < 5:
-                current_date += timedelta(days=1)
-                # Check if it's a weekday (Monday=0, Sunday=6)
-                if current_date.weekday() < 5:  # Monday to Friday
-                    working_days.append(current_date.strftime("%A, %B %d"))
-            
-            return working_days
-        
-        working_days = calculate_working_days()
-        
-        # Create AI prompt to analyze subject content from vector DB
-        prompt = f"""
-        You are an expert educational content designer and child psychology specialist. Analyze the {curriculum.upper()} Grade {grade} {subject} textbook content from the vector database to create a FUN, ENGAGING, and DIGESTIBLE 5-day lesson schedule.
-
-        CRITICAL INSTRUCTIONS:
-        1. First, search and retrieve ALL content from the {curriculum.upper()} Grade {grade} {subject} textbook in the vector database
-        2. Identify TOPICS (not chapters) - focus on learning concepts, skills, and knowledge areas
-        3. Analyze topic COMPLEXITY and DIFFICULTY LEVEL for Grade {grade} students
-        4. Distribute content based on TOPIC COMPLEXITY, not page counts:
-           - Simple/fun topics: Can cover more in one day
-           - Complex/abstract topics: Break into smaller, digestible chunks
-           - Interactive topics: Prioritize hands-on activities
-        5. Make learning ENJOYABLE and INTERESTING for children
-        6. Each day should build logical progression while maintaining engagement
-        7. Respond in {language} language
-
-        Schedule for these working days: {', '.join(working_days)}
-
-        For EACH DAY, provide this EXACT format:
-
-        **DAY 1 - [Date]:**
-        **Topic:** [Specific topic name from textbook]
-        **Why this topic today:** [Brief explanation of complexity/reasoning]
-        **Learning Goals:** [What students will understand/be able to do]
-        **Fun Activities:** [Engaging, age-appropriate activities from textbook]
-        **Practice:** [Simple exercises to reinforce learning]
-        **Assessment:** [Quick, fun way to check understanding]
-        **Pages/References:** [Specific textbook pages or sections]
-
-        **DAY 2 - [Date]:**
-        [Same format]
-
-        [Continue for all 5 days]
-
-        IMPORTANT: Base daily content distribution on topic complexity and student engagement, NOT on fixed page counts. Some days might cover 2 pages of complex topics, others might cover 10 pages of simple, fun content.
-
-        Start by analyzing the vector database content for {subject} Grade {grade} now.
-        """
+        # The schedule format and rules are part of the agent instruction; only the request is sent
+        schedule_agent, prompt = prompt_registry.render(
+            "lesson_schedule", language,
+            curriculum=curriculum.upper(), grade=grade, subject=subject, working_days=", ".join(working_days),
+        )
         
         # Use RAG agent to generate schedule based on actual curriculum content
         session_id = f"schedule_{curriculum}_{grade}_{subject.replace(' ', '_')}_{uuid.uuid4()}"
-        runner = await session_manager.get_or_create_runner(user_id, session_id)
+        runner = await session_manager.get_or_create_runner(
+            user_id, session_id, agent=tiered_agent(schedule_agent, "/api/schedule/generate", prompt)
+        )
         
         # Get response using curriculum-specific RAG agent
-        result = await get_agent_response_async(runner, user_id, session_id, prompt)
+        result = await get_agent_response_async(
+            runner, user_id, session_id, prompt, state_delta=textbook_filter(curriculum, grade, subject)
+        )
         
         return {
             "schedule": result["text"], 
@@ -1155,6 +1620,57 @@ async def generate_ai_schedule(
         print(f"Error generating AI schedule: {e}")
         return {"error": str(e)}
 
+@app.post("/api/schedule/generate/stream")
+async def generate_ai_schedule_stream(
+    request: Request,
+    curriculum: str = Form(...),
+    grade: int = Form(...),
+    subject: str = Form(...),
+    language: str = Form("en"),
+    user_id: str = Form("default_user")
+):
+    """
+    Streaming variant of /api/schedule/generate
+    """
+    working_days = next_working_days()
+    schedule_agent, prompt = prompt_registry.render(
+        "lesson_schedule", language,
+        curriculum=curriculum.upper(), grade=grade, subject=subject, working_days=", ".join(working_days),
+    )
+    session_id = f"schedule_{curriculum}_{grade}_{subject.replace(' ', '_')}_{uuid.uuid4()}"
+    runner = await session_manager.get_or_create_runner(
+        user_id, session_id, agent=tiered_agent(schedule_agent, "/api/schedule/generate/stream", prompt)
+    )
+    records = stream_agent_response(runner, user_id, session_id, prompt, state_delta=textbook_filter(curriculum, grade, subject))
+    return agent_stream_response(
+        request, records, working_days=working_days, curriculum=curriculum, grade=grade, subject=subject
+    )
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """
+    Runtime counters for the caching layers.
+    """
+    return {
+        "translation_memory": translation_memory.stats(),
+        "translation_bundles": translation_bundles.stats(),
+        "translation_dispatcher": translation_dispatcher.stats(),
+        "sessions": session_manager.stats(),
+        "session_store": session_service.stats() if hasattr(session_service, "stats") else {"backend": "memory"},
+        "history": history_compactor.stats() if history_compactor else {"enabled": False},
+        "prompts": prompt_registry.stats(),
+        "latency": latency_stats.stats(),
+        "concept_hedging": dict(hedge_stats, enabled=config.CONCEPT_HEDGED_SEARCH),
+        "intent_router": intent_router.stats() if intent_router else {"enabled": False},
+        "model_tiers": model_tiers.stats(),
+        "response_cache": response_cache.stats(),
+        "semantic_cache": semantic_cache.stats() if semantic_cache else {"enabled": False},
+        "singleflight": singleflight.stats(),
+        "retrieval": {retriever.name: retriever.stats() for retriever in RETRIEVERS},
+        "retrieval_cache": retrieval_cache.stats(),
+        "context_packing": context_packer.stats(),
+    }
+
 @app.get("/health")
 async def health_check():
     """
@@ -0,0 +1,191 @@
+"""
+Conversation history compaction.
+
+ADK sends a session's whole event history to the model on every turn, so
+input tokens grow with the length of a conversation. After each turn the
+compactor:
+
+- strips the Sahayak mentor preamble from every stored user message except
+  the latest one (each /chat message used to carry its own copy), and
+- once the history exceeds the token budget, replaces the oldest turns with
+  one summary event, keeping the most recent turns verbatim.
+
+Token counts are estimated (about 4 characters per token); no tokenizer call
+is made.
+"""
+import re
+from collections import OrderedDict
+
+from google.adk.events import Event
+from google.genai import types
+
+PREAMBLE_MARKER = "You are Sahayak, an expert educational AI assistant"
+# Everything from the preamble marker up to and including "respond to the teacher's query in <language>:"
+PREAMBLE_RE = re.compile(
+    re.escape(PREAMBLE_MARKER) + r".*?respond to the teacher's query in [^:\n]*:[ \t]*",
+    re.DOTALL,
+)
+SUMMARY_PREFIX = "Summary of the earlier conversation:"
+FIRST_SENTENCE_RE = re.compile(r"^(.+?[.!?।॥])(\s|$)", re.DOTALL)
+
+
+def estimate_tokens(text):
+    return (len(text) + 3) // 4 if text else 0
+
+
+def event_text(event):
+    if not event.content or not event.content.parts:
+        return ""
+    return "".join(part.text for part in event.content.parts if part.text)
+
+
+def session_tokens(events):
+    return sum(estimate_tokens(event_text(event)) for event in events)
+
+
+def strip_preamble(text):
+    """Return text without the Sahayak preamble, or None if it has none."""
+    if not text or PREAMBLE_MARKER not in text:
+        return None
+    stripped = PREAMBLE_RE.sub("", text, count=1)
+    return stripped if stripped != text else None
+
+
+def _clip(text, max_chars):
+    text = " ".join(text.split())
+    match = FIRST_SENTENCE_RE.match(text)
+    if match and len(match.group(1)) <= max_chars:
+        return match.group(1)
+    return text[:max_chars].rstrip() + ("…" if len(text) > max_chars else "")
+
+
+def extractive_summary(turns, max_chars=2000):
+    """
+    Summarize (question, answer) turns by keeping the first sentence of each.
+
+    The most recent turns are kept when the summary would exceed max_chars.
+    A previous summary, if any, arrives as a turn with an empty answer and is kept as is.
+    """
+    lines = []
+    for question, answer in turns:
+        if question.startswith(SUMMARY_PREFIX):
+            lines.append(question[len(SUMMARY_PREFIX):].strip())
+            continue
+        line = f"- Teacher asked: {_clip(question, 200)}"
+        if answer:
+            line += f" Sahayak answered: {_clip(answer, 300)}"
+        lines.append(line)
+    summary = "\n".join(lines)
+    if len(summary) > max_chars:
+        summary = summary[-max_chars:]
+        summary = summary[summary.find("\n") + 1:] if "\n" in summary else summary
+    return summary
+
+
+def _split_turns(events):
+    """Group events into turns, each starting at a user message."""
+    turns = []
+    for event in events:
+        if event.author == "user" or not turns:
+            turns.append([])
+        turns[-1].append(event)
+    return turns
+
+
+def _turn_text(turn):
+    question = event_text(turn[0]) if turn[0].author == "user" else ""
+    answer = ""
+    for event in reversed(turn):
+        if event.author != "user" and event_text(event):
+            answer = event_text(event)
+            break
+    return question, answer
+
+
+class HistoryCompactor:
+    """
+    Compacts stored session history through the session service's replace_events().
+
+    summarizer(turns, max_chars) -> str receives (question, answer) text pairs for
+    the turns being folded away and defaults to extractive_summary.
+    """
+
+    def __init__(self, token_budget=6000, keep_recent_turns=3, summary_max_chars=2000,
+                 summarizer=None, tracked_sessions=1000):
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.summary_max_chars = summary_max_chars
+        self.summarizer = summarizer or extractive_summary
+        self.tracked_sessions = tracked_sessions
+        self.session_token_counts = OrderedDict()  # session_id -> estimated history tokens
+        self.compactions = 0
+        self.preambles_stripped = 0
+        self.tokens_removed = 0
+
+    def compact_events(self, events):
+        """Return (events, changed) with duplicate preambles stripped and old turns summarized."""
+        events = list(events)
+        changed = False
+
+        user_indexes = [i for i, event in enumerate(events) if event.author == "user"]
+        for i in user_indexes[:-1]:
+            stripped = strip_preamble(event_text(events[i]))
+            if stripped is None:
+                continue
+            event = events[i].model_copy(deep=True)
+            # The text parts collapse into one; audio and image parts are kept
+            event.content.parts = [types.Part(text=stripped)] + [
+                part for part in event.content.parts if not part.text
+            ]
+            events[i] = event
+            self.preambles_stripped += 1
+            changed = True
+
+        if self.token_budget and session_tokens(events) > self.token_budget:
+            turns = _split_turns(events)
+            if len(turns) > self.keep_recent_turns:
+                old_turns = turns[:-self.keep_recent_turns] if self.keep_recent_turns else turns
+                kept = [event for turn in turns[len(old_turns):] for event in turn]
+                summary = self.summarizer([_turn_text(turn) for turn in old_turns], self.summary_max_chars)
+                summary_event = Event(
+                    author="user",
+                    invocation_id=old_turns[-1][0].invocation_id,
+                    timestamp=old_turns[-1][-1].timestamp,
+                    content=types.Content(role="user", parts=[types.Part(text=f"{SUMMARY_PREFIX}\n{summary}")]),
+                )
+                events = [summary_event] + kept
+                self.compactions += 1
+                changed = True
+        return events, changed
+
+    async def compact(self, session_service, app_name, user_id, session_id):
+        """Compact one session's stored history in place and return its estimated token size."""
+        replace_events = getattr(session_service, "replace_events", None)
+        session = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        if session is None:
+            return 0
+        before = session_tokens(session.events)
+        after = before
+        if replace_events is not None:
+            events, changed = self.compact_events(session.events)
+            if changed:
+                replace_events(session, events)
+                after = session_tokens(events)
+                self.tokens_removed += before - after
+                print(f"Compacted session {session_id}: ~{before} -> ~{after} tokens")
+        self.session_token_counts[session_id] = after
+        self.session_token_counts.move_to_end(session_id)
+        while len(self.session_token_counts) > self.tracked_sessions:
+            self.session_token_counts.popitem(last=False)
+        return after
+
+    def stats(self):
+        largest = sorted(self.session_token_counts.items(), key=lambda item: item[1], reverse=True)[:10]
+        return {
+            "token_budget": self.token_budget,
+            "compactions": self.compactions,
+            "preambles_stripped": self.preambles_stripped,
+            "tokens_removed": self.tokens_removed,
+            "tracked_sessions": len(self.session_token_counts),
+            "largest_sessions": [{"session_id": sid, "tokens": tokens} for sid, tokens in largest],
+        }
@@ -0,0 +1,193 @@
+"""
+Local intent routing in front of the RootAgent dispatcher.
+
+RootAgent spends a full LLM call just choosing one of its four tools
+(search_agent_tool, rag_agent_ncert, rag_agent_kts, imagen_agent_tool) before
+that tool makes its own call. When the route is known (/image/generate) or
+can be predicted locally with confidence, the chosen sub-agent is run
+directly and the dispatcher hop is skipped. Anything uncertain still goes
+through RootAgent.
+
+Free-form text is routed by a TF-IDF + logistic regression model trained
+offline with train_intent_router.py and stored as JSON (scored with NumPy
+only). Keyword rules only raise the prior of the routes they match: the
+sub-agent is run directly when the model's own top route is also the top
+route after the rule prior, with a probability above the threshold. Without
+a model every free-form request goes through RootAgent.
+
+The model has a DISPATCHER class trained on requests that look like a route
+but are not (e.g. "explain electric current" is not a news search), so they
+stay with RootAgent.
+"""
+import json
+import os
+import re
+
+import numpy as np
+
+SEARCH = "search_agent_tool"
+RAG_NCERT = "rag_agent_ncert"
+RAG_KTS = "rag_agent_kts"
+IMAGEN = "imagen_agent_tool"
+ROUTES = (SEARCH, RAG_NCERT, RAG_KTS, IMAGEN)
+DISPATCHER = "dispatcher"  # model class for requests that should stay with RootAgent
+
+RULES = {
+    # An imperative image request: "draw a diagram of ...", "can you create a poster ..."
+    IMAGEN: re.compile(
+        r"^(please )?((can|could|would) you )?(please )?(generate|create|draw|make|design)\b[^.?!\n]{0,40}"
+        r"\b(image|images|diagram|diagrams|picture|pictures|photo|illustration|drawing|poster|chart)\b"
+    ),
+    RAG_KTS: re.compile(r"\b(kts|karnataka (state )?(text ?books?|syllabus|board))\b"),
+    RAG_NCERT: re.compile(r"\bncert\b"),
+    SEARCH: re.compile(
+        r"^(who|when|where) (is|was|are|were)\b|\bcapital of\b"
+        r"|\b(latest|today'?s) (news|headlines|updates)\b|\bcurrent (affairs|events)\b"
+        r"|\b(news|stock price|weather forecast|live score|match score)\b"
+    ),
+}
+# Prior weight of a route whose rule matched, relative to 1.0 for the others
+RULE_PRIOR = 3.0
+
+# Word tokens in Latin and Indic scripts; zero-width (non-)joiners are part of Indic words
+TOKEN_RE = re.compile(r"[\w\u0900-\u0DFF\u200c\u200d]+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def ngrams(tokens, max_n=2):
+    terms = list(tokens)
+    for n in range(2, max_n + 1):
+        terms.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    return terms
+
+
+def tfidf_matrix(texts, vocabulary, idf, max_n=2):
+    """Rows of L2-normalized TF-IDF features (sublinear tf) over the given vocabulary."""
+    matrix = np.zeros((len(texts), len(vocabulary)), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for term in ngrams(tokenize(text), max_n):
+            column = vocabulary.get(term)
+            if column is not None:
+                matrix[row, column] += 1.0
+    np.log1p(matrix, out=matrix)
+    matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class IntentModel:
+    """TF-IDF + multinomial logistic regression, loaded from the JSON written by train_intent_router.py."""
+
+    def __init__(self, classes, terms, idf, coef, intercept, max_n=2):
+        self.classes = list(classes)
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.coef = np.asarray(coef, dtype=np.float32)
+        self.intercept = np.asarray(intercept, dtype=np.float32)
+        self.max_n = max_n
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["classes"], data["terms"], data["idf"], data["coef"], data["intercept"], data.get("max_n", 2))
+
+    def to_json(self):
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        return {
+            "classes": self.classes,
+            "terms": terms,
+            "idf": [round(float(v), 5) for v in self.idf],
+            "coef": [[round(float(v), 5) for v in row] for row in self.coef],
+            "intercept": [round(float(v), 5) for v in self.intercept],
+            "max_n": self.max_n,
+        }
+
+    def predict_proba(self, texts):
+        features = tfidf_matrix(texts, self.vocabulary, self.idf, self.max_n)
+        logits = features @ self.coef.T + self.intercept
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def predict(self, text):
+        probabilities = self.predict_proba([text])[0]
+        best = int(np.argmax(probabilities))
+        return self.classes[best], float(probabilities[best])
+
+
+class RouteDecision:
+    def __init__(self, route, confidence, source):
+        self.route = route  # a sub-agent name, or None to use the RootAgent dispatcher
+        self.confidence = confidence
+        self.source = source  # "endpoint", "model", "rules+model" or "dispatcher"
+
+    def __repr__(self):
+        return f"RouteDecision({self.route}, {self.confidence:.2f}, {self.source})"
+
+
+class IntentRouter:
+    def __init__(self, model_path=None, threshold=0.8, dispatch_hop_ms=1500):
+        self.threshold = threshold
+        self.dispatch_hop_ms = dispatch_hop_ms
+        self.model = None
+        if model_path and os.path.exists(model_path):
+            try:
+                self.model = IntentModel.load(model_path)
+            except Exception as e:
+                print(f"Could not load intent model {model_path}: {e}")
+        self.decisions = {}  # "source:route" -> count
+        self.estimated_ms_saved = 0
+
+    def classify(self, text):
+        """Predict a route for free-form text; route is None when not confident."""
+        lowered = (text or "").lower().strip()
+        if not lowered or self.model is None:
+            return RouteDecision(None, 0.0, "dispatcher")
+        probabilities = self.model.predict_proba([lowered])[0]
+        model_best = self.model.classes[int(np.argmax(probabilities))]
+        matched = [route for route, rule in RULES.items() if rule.search(lowered)]
+        if matched:
+            prior = np.array([RULE_PRIOR if route in matched else 1.0 for route in self.model.classes])
+            probabilities = probabilities * prior
+            probabilities /= probabilities.sum()
+        best = int(np.argmax(probabilities))
+        route, confidence = self.model.classes[best], float(probabilities[best])
+        # The rule prior alone never bypasses the dispatcher: the model has to pick the same route
+        if route != DISPATCHER and route == model_best and confidence >= self.threshold:
+            return RouteDecision(route, confidence, "rules+model" if route in matched else "model")
+        return RouteDecision(None, confidence, "dispatcher")
+
+    def record(self, decision, endpoint):
+        """Count and log a routing decision."""
+        key = f"{decision.source}:{decision.route or 'RootAgent'}"
+        self.decisions[key] = self.decisions.get(key, 0) + 1
+        if decision.route:
+            self.estimated_ms_saved += self.dispatch_hop_ms
+            print(f"Intent router [{endpoint}]: {decision.route} via {decision.source} "
+                  f"(confidence {decision.confidence:.2f}), dispatcher hop skipped (~{self.dispatch_hop_ms} ms)")
+        else:
+            print(f"Intent router [{endpoint}]: no confident route, using RootAgent dispatcher")
+
+    def route(self, text, endpoint):
+        decision = self.classify(text)
+        self.record(decision, endpoint)
+        return decision
+
+    def known_route(self, route, endpoint):
+        """Record a route fixed by the endpoint itself (e.g. /image/generate)."""
+        decision = RouteDecision(route, 1.0, "endpoint")
+        self.record(decision, endpoint)
+        return decision
+
+    def stats(self):
+        return {
+            "model_loaded": self.model is not None,
+            "threshold": self.threshold,
+            "decisions": dict(self.decisions),
+            "estimated_ms_saved": self.estimated_ms_saved,
+        }
@@ -0,0 +1,113 @@
+"""
+BM25 inverted index over textbook chunks.
+
+Embeddings blur exact chapter titles, names and Hindi/Kannada terms that
+teachers type verbatim; a lexical index finds them. Tokens are NFC-normalized,
+lowercased words in Latin or Indic scripts. Vowel signs and viramas stay
+inside the word, zero-width (non-)joiners are dropped (they vary between
+sources of the same text), and dandas separate words. English tokens lose a
+plural "s" and a few stopwords are ignored.
+
+The index is a CSR layout in NumPy arrays: for each term, the rows that
+contain it and their precomputed BM25 term weights, so a query is a handful of
+slices added into one score vector. It is saved as lexical.npz next to the
+vector index.
+"""
+import re
+import unicodedata
+
+import numpy as np
+
+# Latin and Indic letters, vowel signs and digits; dandas (U+0964, U+0965) end a word
+TOKEN_RE = re.compile(r"[\w\u0900-\u0963\u0966-\u0DFF]+")
+ZERO_WIDTH_RE = re.compile(r"[\u200b-\u200d]")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on", "or",
+    "that", "the", "this", "to", "was", "with", "what", "how", "why", "explain",
+}
+
+
+def tokenize(text):
+    text = ZERO_WIDTH_RE.sub("", unicodedata.normalize("NFC", text or "").lower())
+    tokens = []
+    for token in TOKEN_RE.findall(text):
+        if token in STOPWORDS:
+            continue
+        if token.isascii() and len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class LexicalIndex:
+    def __init__(self, terms, indptr, rows, weights, idf, count):
+        self.vocab = {term: i for i, term in enumerate(terms)}
+        self.terms = terms
+        self.indptr = indptr
+        self.rows = rows
+        self.weights = weights
+        self.idf = idf
+        self.count = count
+
+    @classmethod
+    def build(cls, texts, k1=1.5, b=0.75):
+        postings = {}  # term -> {row: term frequency}
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[row] = len(tokens)
+            for token in tokens:
+                counts = postings.setdefault(token, {})
+                counts[row] = counts.get(row, 0) + 1
+        terms = sorted(postings)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            indptr[i + 1] = indptr[i] + len(postings[term])
+        rows = np.empty(indptr[-1], dtype=np.int32)
+        tf = np.empty(indptr[-1], dtype=np.float32)
+        for i, term in enumerate(terms):
+            rows[indptr[i]:indptr[i + 1]] = list(postings[term])
+            tf[indptr[i]:indptr[i + 1]] = list(postings[term].values())
+        avg_length = float(lengths.mean()) if len(texts) else 1.0
+        norm = k1 * (1 - b + b * lengths[rows] / max(avg_length, 1e-9))
+        weights = (tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+        df = np.diff(indptr).astype(np.float32)
+        idf = np.log(1 + (len(texts) - df + 0.5) / (df + 0.5)).astype(np.float32)
+        return cls(np.array(terms, dtype=str), indptr, rows, weights, idf, len(texts))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["terms"], data["indptr"], data["rows"], data["weights"], data["idf"], int(data["count"]))
+
+    def save(self, path):
+        np.savez(path, terms=self.terms, indptr=self.indptr, rows=self.rows, weights=self.weights,
+                 idf=self.idf, count=np.int64(self.count))
+
+    def search(self, query, top_k=10, rows=None):
+        """
+        BM25 top-k for a query string; rows optionally restricts it to [start, stop) ranges.
+
+        Returns (row, score) pairs, best first; rows sharing no term with the query are left out.
+        """
+        term_ids = {self.vocab[token] for token in tokenize(query) if token in self.vocab}
+        if not term_ids:
+            return []
+        scores = np.zeros(self.count, dtype=np.float32)
+        for term_id in term_ids:
+            start, stop = self.indptr[term_id], self.indptr[term_id + 1]
+            # A row appears at most once per term, so plain fancy-index addition is safe
+            scores[self.rows[start:stop]] += self.idf[term_id] * self.weights[start:stop]
+        if rows:
+            mask = np.zeros(self.count, dtype=bool)
+            for start, stop in rows:
+                mask[start:stop] = True
+            scores[~mask] = 0.0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [(int(row), float(scores[row])) for row in candidates]
+
+    def nbytes(self):
+        return self.indptr.nbytes + self.rows.nbytes + self.weights.nbytes + self.idf.nbytes
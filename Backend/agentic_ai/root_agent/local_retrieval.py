@@ -0,0 +1,299 @@
+"""
+In-process textbook retrieval, a local alternative to VertexAiRagRetrieval.
+
+An index directory (written by build_local_index.py) holds:
+
+- manifest.json: corpus name, embedding model, dimension, row count, dtype,
+  version;
+- embeddings.npy: an (N, dim) float16 or float32 matrix of unit vectors,
+  memory-mapped, so only the pages that are touched are read from disk;
+- chunks.jsonl: one {"id", "text", "source", "page", "grade", "subject",
+  "part"} record per matrix row;
+- the manifest's "shards": the [start, stop) rows of each "<grade>/<subject>";
+- lexical.npz: the BM25 index of the same chunks (see lexical_index.py),
+  rebuilt in memory for indexes that don't have one.
+
+Queries are embedded with the model named in the manifest and scored with
+NumPy matrix products over blocks of rows; the best k of each block are
+merged with argpartition. As with Vertex AI RAG, vector_distance_threshold is a cosine
+distance (1 - cosine similarity): chunks further away than it are dropped.
+
+With hybrid search the best candidates of both indexes are fused by
+reciprocal rank (score = sum of 1 / (k + rank)), so exact chapter titles and
+Indic terms found lexically still surface when their embeddings don't. The
+distance threshold only filters the vector candidates.
+
+A search only scores the rows of the shards matching the session's textbook
+filter and the query (see corpora.py), and falls back to the whole corpus
+when they have nothing close enough.
+"""
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+from google.adk.tools.retrieval.base_retrieval_tool import BaseRetrievalTool
+
+from corpora import RETRIEVERS, matching_shards, resolve_filter
+from embeddings import Embedder
+from lexical_index import LexicalIndex
+from metrics import LatencyStats
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuse ranked lists of rows; returns (row, score) pairs, best first."""
+    scores = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            scores[row] = scores.get(row, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class LocalVectorIndex:
+    def __init__(self, path, block_rows=65536):
+        self.path = path
+        self.block_rows = block_rows
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.matrix = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        with open(os.path.join(path, "chunks.jsonl"), encoding="utf-8") as f:
+            self.chunks = [json.loads(line) for line in f if line.strip()]
+        if len(self.chunks) != self.matrix.shape[0]:
+            raise ValueError(f"{path}: {len(self.chunks)} chunks for {self.matrix.shape[0]} embeddings")
+        self._lexical = None
+
+    @property
+    def lexical(self):
+        if self._lexical is None:
+            lexical_path = os.path.join(self.path, "lexical.npz")
+            if os.path.exists(lexical_path):
+                self._lexical = LexicalIndex.load(lexical_path)
+            else:
+                print(f"{self.path} has no lexical.npz, building the BM25 index in memory")
+                self._lexical = LexicalIndex.build([chunk["text"] for chunk in self.chunks])
+            if self._lexical.count != len(self):
+                raise ValueError(f"{self.path}: lexical index has {self._lexical.count} rows for {len(self)} chunks")
+        return self._lexical
+
+    @property
+    def version(self):
+        return self.manifest.get("version")
+
+    @property
+    def shards(self):
+        return self.manifest.get("shards", {})
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def search(self, query_vectors, top_k=10, max_distance=None, rows=None):
+        """
+        Top-k cosine search for a batch of unit query vectors.
+
+        rows optionally restricts the search to a list of [start, stop) row ranges. Returns
+        one list of (row, similarity) pairs per query, best first.
+        """
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start, stop in rows or [(0, len(self))]:
+            for block_start in range(start, stop, self.block_rows):
+                block = np.asarray(self.matrix[block_start:min(stop, block_start + self.block_rows)], dtype=np.float32)
+                scores = queries @ block.T
+                k = min(top_k, scores.shape[1])
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                best_rows = np.concatenate([best_rows, top + block_start], axis=1)
+                best_scores = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+                if best_rows.shape[1] > top_k:
+                    keep = np.argpartition(-best_scores, top_k - 1, axis=1)[:, :top_k]
+                    best_rows = np.take_along_axis(best_rows, keep, axis=1)
+                    best_scores = np.take_along_axis(best_scores, keep, axis=1)
+        results = []
+        for query_rows, query_scores in zip(best_rows, best_scores):
+            order = np.argsort(-query_scores)
+            results.append([
+                (int(query_rows[i]), float(query_scores[i])) for i in order
+                if max_distance is None or 1.0 - query_scores[i] <= max_distance
+            ])
+        return results
+
+    def hybrid_search(self, query, query_vector, top_k=10, max_distance=None, rows=None, candidates=50, rrf_k=60):
+        """
+        Vector and BM25 search in one call, fused by reciprocal rank.
+
+        Returns (row, fused score, cosine similarity or None for lexical-only rows), best first.
+        With max_distance, nothing is returned unless at least one row is within it: BM25
+        matches on common words alone would otherwise always produce results, and callers
+        could never tell that the corpus has nothing relevant.
+        """
+        vector_hits = self.search(query_vector, max(candidates, top_k), max_distance, rows)[0]
+        if max_distance is not None and not vector_hits:
+            return []
+        lexical_hits = self.lexical.search(query, max(candidates, top_k), rows)
+        similarity = dict(vector_hits)
+        fused = reciprocal_rank_fusion([[row for row, _ in vector_hits], [row for row, _ in lexical_hits]], rrf_k)
+        return [(row, score, similarity.get(row)) for row, score in fused[:top_k]]
+
+
+class LocalRagRetrieval(BaseRetrievalTool):
+    """
+    Retrieval tool with the same interface as VertexAiRagRetrieval, backed by a LocalVectorIndex.
+
+    The index is loaded on first use, so the app starts even before it is built, and is
+    reloaded when its manifest changes on disk (checked every reload_check_seconds).
+    Loading the index and scanning it are blocking, so both run in a worker thread.
+    Results go through the retrieval cache, keyed by the manifest version, and are packed
+    (de-duplicated, re-ranked, trimmed to a token budget) by the context packer before
+    they are returned to the model.
+    """
+
+    def __init__(self, *, name, description, index_path, similarity_top_k=10, vector_distance_threshold=None,
+                 hybrid=False, rrf_k=60, hybrid_candidates=50, cache=None, packer=None,
+                 reload_check_seconds=300):
+        super().__init__(name=name, description=description)
+        self.index_path = index_path
+        self.similarity_top_k = similarity_top_k
+        self.vector_distance_threshold = vector_distance_threshold
+        self.hybrid = hybrid
+        self.rrf_k = rrf_k
+        self.hybrid_candidates = hybrid_candidates
+        self.cache = cache
+        self.packer = packer
+        self.reload_check_seconds = reload_check_seconds
+        self._index = None
+        self._embedder = None
+        self._manifest_mtime = None
+        self._checked_at = 0.0
+        self.latency = LatencyStats()
+        self.queries = 0
+        self.empty_results = 0
+        self.shard_searches = 0
+        self.shard_fallbacks = 0
+        self.rows_scanned = 0
+        self.lexical_only_results = 0
+        RETRIEVERS.append(self)
+
+    def _manifest_changed(self):
+        now = time.time()
+        if now - self._checked_at < self.reload_check_seconds:
+            return False
+        self._checked_at = now
+        try:
+            return os.path.getmtime(os.path.join(self.index_path, "manifest.json")) != self._manifest_mtime
+        except OSError:
+            return False
+
+    def _load_index(self):
+        if self._index is not None and self._manifest_changed():
+            print(f"Local retrieval index {self.index_path} was rebuilt, reloading it")
+            self._index = None
+        if self._index is None:
+            self._manifest_mtime = os.path.getmtime(os.path.join(self.index_path, "manifest.json"))
+            self._checked_at = time.time()
+            self._index = LocalVectorIndex(self.index_path)
+            if self.hybrid:
+                self._index.lexical  # load (or build) BM25 now, in the loader's thread, not on the first query
+            self._embedder = Embedder(self._index.manifest["embedding_model"])
+            print(f"Loaded local retrieval index {self.index_path}: {len(self._index)} chunks, version {self._index.version}")
+        return self._index
+
+    @staticmethod
+    def shard_rows(index, keys):
+        """Row ranges of the given shards; None for the whole corpus."""
+        return [tuple(index.shards[key]) for key in keys] or None
+
+    async def retrieve(self, query, wanted=None):
+        """
+        Return the matching chunk records for a query, best first, from the cache when possible.
+
+        wanted is an optional {"grade", "subject"} filter that picks the shards to search.
+        """
+        index = await asyncio.to_thread(self._load_index)
+        keys = matching_shards(index.shards, wanted or {})
+        cache_key = None
+        if self.cache is not None and index.version:
+            cache_key = self.cache.key(
+                os.path.abspath(self.index_path), index.version, query, self.similarity_top_k,
+                self.vector_distance_threshold, scope={"shards": keys, "hybrid": self.hybrid},
+            )
+            cached = self.cache.get(self.name, cache_key)
+            if cached is not None:
+                return cached
+        started = time.perf_counter()
+        vector = await self._embedder.embed_one(query, task_type="RETRIEVAL_QUERY")
+        embedded = time.perf_counter()
+        hits, rows = await asyncio.to_thread(self._search_shards, index, query, vector, self.shard_rows(index, keys))
+        self.rows_scanned += sum(stop - start for start, stop in rows) if rows else len(index)
+        self.latency.record("embed", embedded - started)
+        self.latency.record("search", time.perf_counter() - embedded)
+        self.queries += 1
+        if cache_key is not None:
+            self.cache.put(cache_key, hits)
+        return hits
+
+    def _search_shards(self, index, query, vector, rows):
+        """(hits, rows searched) for the given shard rows, or the whole corpus when they have nothing."""
+        hits = self.search(index, query, vector, rows)
+        if rows is not None:
+            self.shard_searches += 1
+            if not hits:
+                # Nothing close enough in the shard; the book may be filed under another name
+                self.shard_fallbacks += 1
+                hits = self.search(index, query, vector, None)
+                rows = None
+        return hits, rows
+
+    def search(self, index, query, vector, rows):
+        """
+        Chunk records for one query, best first. Blocking: the vector scan, BM25 scoring
+        and the re-scoring of lexical-only rows all run here, in the caller's worker thread.
+        """
+        if not self.hybrid:
+            hits = index.search(vector, self.similarity_top_k, self.vector_distance_threshold, rows)[0]
+            return [dict(index.chunks[row], score=round(score, 4)) for row, score in hits]
+        hits = index.hybrid_search(
+            query, vector, self.similarity_top_k, self.vector_distance_threshold, rows, self.hybrid_candidates, self.rrf_k
+        )
+        lexical_only = sorted(row for row, _, similarity in hits if similarity is None)
+        self.lexical_only_results += len(lexical_only)
+        # Rows found only by BM25 still get their cosine similarity, for re-ranking downstream
+        similarities = dict(zip(lexical_only, np.asarray(index.matrix[lexical_only], dtype=np.float32) @ vector))
+        return [
+            dict(index.chunks[row], score=round(float(similarities.get(row, similarity)), 4), rrf=round(fused, 5))
+            for row, fused, similarity in hits
+        ]
+
+    @staticmethod
+    def known_subjects(index):
+        return {key.partition("/")[2] for key in index.shards}
+
+    async def run_async(self, *, args, tool_context):
+        index = await asyncio.to_thread(self._load_index)
+        wanted = resolve_filter(tool_context.state, args["query"], self.known_subjects(index))
+        chunks = await self.retrieve(args["query"], wanted)
+        if self.packer is not None:
+            chunks = self.packer.pack(args["query"], chunks)
+        if not chunks:
+            self.empty_results += 1
+            return (f"No matching result found with the config: similarity_top_k={self.similarity_top_k}, "
+                    f"vector_distance_threshold={self.vector_distance_threshold}")
+        return [chunk["text"] for chunk in chunks]
+
+    def stats(self):
+        return {
+            "backend": "local",
+            "index_path": self.index_path,
+            "loaded": self._index is not None,
+            "version": self._index.version if self._index is not None else None,
+            "chunks": len(self._index) if self._index is not None else None,
+            "shards": len(self._index.shards) if self._index is not None else None,
+            "queries": self.queries,
+            "empty_results": self.empty_results,
+            "shard_searches": self.shard_searches,
+            "shard_fallbacks": self.shard_fallbacks,
+            "hybrid": self.hybrid,
+            "lexical_only_results": self.lexical_only_results,
+            "avg_rows_scanned": round(self.rows_scanned / self.queries, 1) if self.queries else 0.0,
+            "latency": self.latency.stats(),
+        }
@@ -0,0 +1,222 @@
+"""
+Markdown-aware segmentation for translating long agent responses.
+
+A response is split into an ordered list of pieces. Each piece is either
+translatable prose (a sentence or a few sentences, at most max_chars long) or
+protected text that must be copied through unchanged. Only block-level
+structure is a hard boundary: code blocks, line prefixes (headings, bullets,
+quotes), table cells, bare URLs and whitespace between chunks.
+
+Inline markup (emphasis, inline code, link brackets and targets, inline html)
+stays inside its sentence: mask_inline replaces each span with a numbered
+placeholder before translation and unmask_inline puts the markup back, so the
+translator sees whole sentences instead of fragments cut at every "**".
+"""
+import re
+
+from script_detection import needs_translation
+
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+RULE_RE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+# Headings, block quotes, bullets, numbered items and task boxes at the start of a line
+LINE_PREFIX_RE = re.compile(r"^(\s*(?:#{1,6}\s+|>\s*|[-*+]\s+(?:\[[ xX]\]\s+)?|\d+[.)]\s+))*")
+# Inline markup kept inside a sentence as a placeholder
+INLINE_RE = re.compile(
+    r"`[^`\n]+`"                # inline code
+    r"|\]\([^)\s]*\)"           # link target: ](url)
+    r"|!?\["                    # link / image opener
+    r"|\*\*|__|~~"              # emphasis markers
+    r"|(?<!\w)[*_](?=\S)|(?<=\S)[*_](?!\w)"  # single-char emphasis
+    r"|<[^>\n]+>"               # inline html
+)
+# Bare URLs split a line; inline code and link targets are matched first so URLs inside them don't
+URL_RE = re.compile(r"(`[^`\n]+`|\]\([^)\s]*\))|https?://[^\s)>\]]+")
+TABLE_ROW_RE = re.compile(r"^\s*\|")
+TABLE_CELL_RE = re.compile(r"\s*\|\s*")
+EMPHASIS_MARKERS = {"**", "__", "~~", "*", "_"}
+PLACEHOLDER = "{{{{{}}}}}"  # {{0}}, {{1}}, ...
+PLACEHOLDER_RE = re.compile(r"(\s*)\{\{\s*(\d+)\s*\}\}(\s*)")
+SENTENCE_END_RE = re.compile(r"(?<=[.!?।॥])(\s+)")
+HAS_LETTER_RE = re.compile(r"[^\W\d_]")
+
+
+def _shadow(text):
+    """text with inline markup blanked out (same length), for sentence splitting and letter checks."""
+    return INLINE_RE.sub(lambda match: "\0" * len(match.group(0)), text)
+
+
+def _add_prose(pieces, text, max_chars):
+    """
+    Add a run of prose as sentence chunks of at most max_chars (a longer single
+    sentence stays whole). Surrounding whitespace, the whitespace between chunks
+    and runs without letters outside markup, such as bare numbers, stay protected.
+    """
+    shadow = _shadow(text)
+    if not HAS_LETTER_RE.search(shadow):
+        pieces.append([text, False])
+        return
+    stripped = text.strip()
+    start = text.index(stripped)
+    end = start + len(stripped)
+    if start:
+        pieces.append([text[:start], False])
+    sentences = []  # (start, stop) of each sentence; the whitespace between them separates chunks
+    position = start
+    for match in SENTENCE_END_RE.finditer(shadow, start, end):
+        sentences.append((position, match.start()))
+        position = match.end()
+    sentences.append((position, end))
+    chunk_start, chunk_end = sentences[0]
+    for sentence_start, sentence_end in sentences[1:]:
+        if sentence_end - chunk_start > max_chars:
+            pieces.append([text[chunk_start:chunk_end], bool(HAS_LETTER_RE.search(shadow[chunk_start:chunk_end]))])
+            pieces.append([text[chunk_end:sentence_start], False])
+            chunk_start = sentence_start
+        chunk_end = sentence_end
+    pieces.append([text[chunk_start:end], bool(HAS_LETTER_RE.search(shadow[chunk_start:end]))])
+    if end < len(text):
+        pieces.append([text[end:], False])
+
+
+def _segment_run(pieces, text, max_chars):
+    """Prose between hard boundaries; bare URLs are copied through and split the run."""
+    position = 0
+    for match in URL_RE.finditer(text):
+        if match.group(1):
+            continue  # inline code or a link target: stays in the sentence as a placeholder
+        if match.start() > position:
+            _add_prose(pieces, text[position:match.start()], max_chars)
+        pieces.append([match.group(0), False])
+        position = match.end()
+    if position < len(text):
+        _add_prose(pieces, text[position:], max_chars)
+
+
+def _segment_line(pieces, line, max_chars):
+    body = line.rstrip("\r\n")
+    newline = line[len(body):]
+    if not body.strip() or RULE_RE.match(body):
+        pieces.append([line, False])
+        return
+    if TABLE_ROW_RE.match(body):
+        # Each table cell is translated on its own
+        position = 0
+        for match in TABLE_CELL_RE.finditer(body):
+            if match.start() > position:
+                _segment_run(pieces, body[position:match.start()], max_chars)
+            pieces.append([match.group(0), False])
+            position = match.end()
+        if position < len(body):
+            _segment_run(pieces, body[position:], max_chars)
+    else:
+        prefix = LINE_PREFIX_RE.match(body).group(0)
+        if prefix:
+            pieces.append([prefix, False])
+        if len(prefix) < len(body):
+            _segment_run(pieces, body[len(prefix):], max_chars)
+    if newline:
+        pieces.append([newline, False])
+
+
+def segment_markdown(text, max_chars=600):
+    """
+    Split markdown text into pieces.
+
+    Returns a list of [text, translatable] pairs; "".join(p[0] for p in pieces) == text.
+    Translatable pieces may contain inline markup; translate mask_inline(text)[0] rather than the text.
+    """
+    pieces = []
+    in_code_block = False
+    for line in text.splitlines(keepends=True):
+        if FENCE_RE.match(line):
+            in_code_block = not in_code_block
+            pieces.append([line, False])
+        elif in_code_block:
+            pieces.append([line, False])
+        else:
+            _segment_line(pieces, line, max_chars)
+    return pieces
+
+
+def paragraphs(pieces):
+    """Group piece indices into paragraphs: runs of lines separated by blank lines or code fences."""
+    groups = [[]]
+    previous = "\n"
+    for i, (text, _) in enumerate(pieces):
+        blank_line = not text.strip() and text.endswith("\n") and previous.endswith("\n")
+        if blank_line or FENCE_RE.match(text):
+            if groups[-1]:
+                groups.append([])
+        else:
+            groups[-1].append(i)
+        previous = text
+    return [group for group in groups if group]
+
+
+def skip_translated(pieces, target_language, source_language="en"):
+    """
+    Mark the pieces of paragraphs already written in the target script as not translatable.
+
+    The decision is made on a whole paragraph, so an English term the model put in bold,
+    a heading or a table cell of a Hindi answer is not sent to the translator on its own.
+    """
+    for group in paragraphs(pieces):
+        prose = " ".join(pieces[i][0] for i in group if pieces[i][1])
+        if prose and not needs_translation(prose, target_language, source_language):
+            for i in group:
+                pieces[i][1] = False
+    return pieces
+
+
+def mask_inline(text):
+    """Return (masked_text, spans): inline markup replaced by {{0}}, {{1}}, ... placeholders."""
+    spans = []
+
+    def placeholder(match):
+        spans.append((match.group(0), match.start(), match.end()))
+        return PLACEHOLDER.format(len(spans) - 1)
+
+    masked = INLINE_RE.sub(placeholder, text)
+    # Emphasis markers hug their text: "**DNA**" has an opening and a closing marker
+    kinds = []
+    for span, start, end in spans:
+        before = text[start - 1] if start else " "
+        after = text[end] if end < len(text) else " "
+        if span not in EMPHASIS_MARKERS:
+            kinds.append(None)
+        elif not before.isspace() and not (after.isalnum() or after == "_"):
+            kinds.append("close")
+        elif not after.isspace() and not (before.isalnum() or before == "_"):
+            kinds.append("open")
+        else:
+            kinds.append(None)
+    return masked, list(zip((span for span, _, _ in spans), kinds))
+
+
+def unmask_inline(translated, spans):
+    """
+    Put the markup back into a translated text.
+
+    Returns None when the translation lost or duplicated a placeholder. Spaces the
+    translator put inside an emphasis span ("** DNA **") are removed.
+    """
+    found = sorted(int(match.group(2)) for match in PLACEHOLDER_RE.finditer(translated))
+    if found != list(range(len(spans))):
+        return None
+
+    def restore(match):
+        before, index, after = match.group(1), int(match.group(2)), match.group(3)
+        span, kind = spans[index]
+        if kind == "open":
+            after = ""
+        elif kind == "close":
+            before = ""
+        return before + span + after
+
+    return PLACEHOLDER_RE.sub(restore, translated)
+
+
+def reassemble(pieces, translations):
+    """Join pieces back together, substituting translations for the translatable pieces in order."""
+    translations = iter(translations)
+    return "".join(next(translations) if translatable else text for text, translatable in pieces)
@@ -0,0 +1,45 @@
+import threading
+from collections import deque
+
+
+class LatencyStats:
+    """
+    Per-label latency samples (seconds) with count, mean and percentiles.
+
+    Only the most recent `window` samples of each label are kept, so the
+    percentiles follow current behaviour rather than the whole uptime.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = {}  # label -> deque of seconds
+        self._counts = {}  # label -> total samples ever recorded
+        self._lock = threading.Lock()
+
+    def record(self, label, seconds):
+        with self._lock:
+            samples = self._samples.get(label)
+            if samples is None:
+                samples = self._samples[label] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._counts[label] = self._counts.get(label, 0) + 1
+
+    @staticmethod
+    def _percentile(ordered, fraction):
+        index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+        return ordered[index]
+
+    def stats(self):
+        with self._lock:
+            snapshot = {label: sorted(samples) for label, samples in self._samples.items()}
+            counts = dict(self._counts)
+        result = {}
+        for label, ordered in sorted(snapshot.items()):
+            result[label] = {
+                "count": counts[label],
+                "mean_ms": round(1000 * sum(ordered) / len(ordered), 1),
+                "p50_ms": round(1000 * self._percentile(ordered, 0.5), 1),
+                "p95_ms": round(1000 * self._percentile(ordered, 0.95), 1),
+                "max_ms": round(1000 * ordered[-1], 1),
+            }
+        return result
@@ -0,0 +1,167 @@
+"""
+Model tiering: pick the model an agent runs with per request.
+
+The agents hard-code their models (gemini-2.5-flash for RootAgent, the RAG
+agents and the image agent, gemini-2.0-flash for web search). The policy
+scores each request from its endpoint, prompt length, expected output size
+and a cheap keyword estimate of how much reasoning it asks for, and maps the
+score to a tier:
+
+- "fast": short lookups and small outputs,
+- "standard": everything else,
+- "deep": long, analytical requests.
+
+A tier without a configured model leaves the agents' own models unchanged.
+Otherwise a copy of the agent (and of the sub-agents it calls as tools) using
+the tier's model is built on first use and cached.
+
+Latency and token usage are recorded per tier. Token counts come from the
+usage_metadata of the events a Runner yields, so calls made inside an
+AgentTool sub-agent are not included.
+"""
+import re
+import threading
+
+from google.adk.tools.agent_tool import AgentTool
+
+from intent_router import tokenize
+from metrics import LatencyStats
+
+FAST = "fast"
+STANDARD = "standard"
+DEEP = "deep"
+TIERS = (FAST, STANDARD, DEEP)
+
+# Typical response size (tokens) of each endpoint, used when the caller gives none
+ENDPOINT_OUTPUT_TOKENS = {
+    "/chat": 400,
+    "/learning/concept": 1500,
+    "/learning/activities": 1200,
+    "/lesson/prepare": 2000,
+    "/lesson/materials": 1500,
+    "/curriculum/generate": 4000,
+    "/curriculum/monthly-plan": 2500,
+    "/assessment/generate": 1500,
+    "/assessment/quiz": 1500,
+    "/image/generate": 150,
+    "/image/generate-diagram": 150,
+    "/teacher/classroom-tips": 1000,
+    "/teacher/multi-grade-strategies": 1500,
+    "/api/schedule/generate": 2500,
+}
+
+# Wording that asks for explanation, comparison or planning rather than a fact
+REASONING_RE = re.compile(
+    r"\b(why|explain|explanation|compare|comparison|difference between|analy[sz]e|evaluate|justify"
+    r"|derive|prove|step by step|in detail|design|plan|strategy|strategies|pros and cons)\b"
+)
+
+
+def estimate_complexity(prompt, output_tokens=0):
+    """A 0..1 score from prompt length, reasoning cues, number of questions and expected output size."""
+    text = (prompt or "").lower()
+    score = 0.3 * min(len(tokenize(text)) / 300, 1.0)
+    score += min(0.2 * len(REASONING_RE.findall(text)), 0.4)
+    if text.count("?") > 1:
+        score += 0.1
+    score += 0.4 * min((output_tokens or 0) / 2000, 1.0)
+    return min(score, 1.0)
+
+
+def with_model(agent, model):
+    """A copy of agent, and of the agents it calls through AgentTool, that runs with model."""
+    tools = [
+        AgentTool(agent=with_model(tool.agent, model), skip_summarization=tool.skip_summarization)
+        if isinstance(tool, AgentTool) else tool
+        for tool in agent.tools
+    ]
+    return agent.clone(update={"model": model, "tools": tools})
+
+
+class ModelTierPolicy:
+    """
+    Chooses a tier per request and hands out the cached agent variant for it.
+
+    models maps tier -> model name (None keeps the agents' own models).
+    endpoint_tiers pins endpoints to a tier regardless of the score. Scores
+    below fast_below use the fast tier, scores above deep_above the deep tier.
+    """
+
+    def __init__(self, models, endpoint_tiers=None, fast_below=0.25, deep_above=0.85, enabled=True):
+        self.models = {tier: models.get(tier) for tier in TIERS}
+        self.endpoint_tiers = dict(endpoint_tiers or {})
+        self.fast_below = fast_below
+        self.deep_above = deep_above
+        self.enabled = enabled
+        self._variants = {}  # (id(base agent), tier) -> (base agent, variant)
+        self._agent_tiers = {}  # id(variant) -> tier; agents running on their own models count as standard
+        self._lock = threading.Lock()
+        self.latency = LatencyStats()
+        self.requests = {tier: 0 for tier in TIERS}
+        self.tokens = {tier: {"prompt": 0, "output": 0} for tier in TIERS}
+
+    def choose(self, endpoint, prompt, output_tokens=None):
+        if not self.enabled:
+            return STANDARD
+        endpoint = endpoint.removesuffix("/stream")  # streaming variants share their endpoint's policy
+        pinned = self.endpoint_tiers.get(endpoint)
+        if pinned in TIERS:
+            return pinned
+        if output_tokens is None:
+            output_tokens = ENDPOINT_OUTPUT_TOKENS.get(endpoint, 1000)
+        score = estimate_complexity(prompt, output_tokens)
+        if score < self.fast_below:
+            return FAST
+        if score > self.deep_above:
+            return DEEP
+        return STANDARD
+
+    def agent_for(self, agent, tier):
+        """The variant of agent for tier; agent itself when the tier has no model of its own."""
+        model = self.models.get(tier)
+        if not model:
+            return agent
+        key = (id(agent), tier)
+        entry = self._variants.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._variants.get(key)
+                if entry is None:
+                    # The base agent is kept in the entry so its id can't be reused by another agent
+                    entry = self._variants[key] = (agent, with_model(agent, model))
+                    self._agent_tiers[id(entry[1])] = tier
+                    print(f"Built {tier} tier variant of {agent.name} with model {model}")
+        return entry[1]
+
+    def select(self, agent, endpoint, prompt, output_tokens=None):
+        """Pick the tier for a request and return the agent variant to run."""
+        tier = self.choose(endpoint, prompt, output_tokens)
+        self.requests[tier] += 1
+        return self.agent_for(agent, tier)
+
+    def tier_of(self, agent):
+        return self._agent_tiers.get(id(agent), STANDARD)
+
+    def record(self, agent, seconds, prompt_tokens=0, output_tokens=0):
+        """Record one agent run's latency and token usage under the agent's tier."""
+        tier = self.tier_of(agent)
+        self.latency.record(tier, seconds)
+        self.tokens[tier]["prompt"] += prompt_tokens or 0
+        self.tokens[tier]["output"] += output_tokens or 0
+
+    def stats(self):
+        latency = self.latency.stats()
+        return {
+            "enabled": self.enabled,
+            "tiers": {
+                tier: {
+                    "model": self.models[tier] or "agent default",
+                    "requests": self.requests[tier],
+                    "prompt_tokens": self.tokens[tier]["prompt"],
+                    "output_tokens": self.tokens[tier]["output"],
+                    "latency": latency.get(tier),
+                }
+                for tier in TIERS
+            },
+            "agent_variants": len(self._variants),
+        }
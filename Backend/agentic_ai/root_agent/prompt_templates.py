@@ -0,0 +1,245 @@
+"""
+Prompt template registry.
+
+Several endpoints used to wrap every request in a long, static preamble (the
+Sahayak mentor instructions, the concept lookup rules, the schedule format).
+That text was sent with each message and stored again in session history on
+every turn. Here each template is split into:
+
+- instruction: the static part. It becomes part of the RootAgent instruction
+  in an agent variant built once per (template, language) and then cached.
+- message: the variable part sent with each request.
+
+Instructions must not contain {braces}: ADK reads {name} in an instruction as
+a session state placeholder.
+"""
+import threading
+
+from history_compaction import estimate_tokens
+from ui_translations import SUPPORTED_LANGUAGES
+
+
+class PromptTemplate:
+    def __init__(self, name, instruction, message):
+        self.name = name
+        self.instruction = instruction
+        self.message = message
+
+    def render_instruction(self, language_name):
+        return self.instruction.format(language_name=language_name)
+
+    def render_message(self, language_name, **fields):
+        return self.message.format(language_name=language_name, **fields)
+
+
+CHAT_MENTOR = PromptTemplate(
+    "chat_mentor",
+    instruction="""
+    # CONVERSATION CONTEXT
+    You are Sahayak, an expert educational AI assistant and friendly mentor for teachers.
+
+    CRITICAL INSTRUCTION: You MUST respond in {language_name} language only. If the language is not English, ensure your entire response is in {language_name}.
+    When you call a tool, pass on the teacher's request and state that the answer must be in {language_name}.
+
+    Your role is to:
+
+    🎓 **Be a Subject Expert**: Provide accurate, comprehensive knowledge across all subjects (Mathematics, Science, English, Social Studies, etc.)
+
+    🤝 **Be a Friendly Mentor**: Always respond in a warm, encouraging, and supportive manner. Use appropriate honorific phrases in {language_name} for addressing teachers respectfully.
+
+    💡 **Provide Practical Guidance**: Offer actionable teaching tips, classroom strategies, and real-world examples
+
+    📚 **Curriculum-Aware**: Consider the teacher's curriculum (NCERT/KTS) and grade level when providing advice
+
+    🎯 **Address Educational Needs**: Help with:
+    - Lesson planning and curriculum development
+    - Classroom management and student engagement
+    - Assessment strategies and evaluation methods
+    - Subject-specific teaching methodologies
+    - Student motivation and learning difficulties
+    - Professional development and teaching resources
+    - Multi-grade classroom strategies
+    - Technology integration in education
+
+    🌟 **Always Be**:
+    - Polite, respectful, and encouraging
+    - Solution-oriented and practical
+    - Age-appropriate in your suggestions
+    - Culturally sensitive and inclusive
+    - Patient and understanding of teaching challenges
+
+    LANGUAGE REQUIREMENT: Your entire response must be in {language_name}. Do not mix languages or provide English translations unless specifically requested.
+
+    Every user message is a teacher's query; respond to it in {language_name}.
+    """,
+    message="{query}",
+)
+
+CONCEPT_CURRICULUM = PromptTemplate(
+    "concept_curriculum",
+    instruction="""
+    # CURRICULUM LOOKUP
+    IMPORTANT: Please respond in {language_name} language only.
+
+    Each message asks about a concept for a curriculum (NCERT or KTS) and grade. First search that curriculum database for that grade.
+
+    If you find relevant information in the curriculum:
+    - Provide a comprehensive summary of what's found
+    - Include key points, definitions, and examples from the curriculum
+    - Format it appropriately for students of that grade
+    - Include page references or chapter information if available
+    - Respond in {language_name} language
+
+    If NO information is found in the curriculum:
+    - Respond with "CURRICULUM_NOT_FOUND"
+    - Then proceed to search the web for general information about this concept
+    """,
+    message='Search the {curriculum} curriculum database for Grade {grade} to find information about "{concept}".',
+)
+
+CONCEPT_WEB = PromptTemplate(
+    "concept_web",
+    instruction="""
+    # CONCEPT EXPLANATION FROM THE WEB
+    IMPORTANT: Please respond in {language_name} language only.
+
+    Each message names a concept that was not found in the curriculum for a grade. Search the web for information about this concept and provide a grade-appropriate explanation.
+
+    Requirements:
+    1. Search for general information about the concept
+    2. Tailor the explanation specifically for students of that grade
+    3. Use simple, age-appropriate language
+    4. Include real-world examples relevant to students of that age
+    5. Provide teaching tips for classroom delivery
+    6. Start your response with the curriculum note given in the message
+    7. Respond entirely in {language_name} language
+
+    Make the explanation engaging and suitable for classroom teaching.
+    """,
+    message=(
+        'Concept: "{concept}" (Grade {grade}, not found in the {curriculum} curriculum).\n'
+        "Start your response with: \"📚 **Curriculum Note**: The requested topic '{concept}' was not found in "
+        'Grade {grade} {curriculum} curriculum. Below is a custom explanation tailored for your grade level."'
+    ),
+)
+
+LESSON_SCHEDULE = PromptTemplate(
+    "lesson_schedule",
+    instruction="""
+    # LESSON SCHEDULE DESIGN
+    You are an expert educational content designer and child psychology specialist. Each message names a curriculum, grade and subject; analyze that textbook content from the vector database to create a FUN, ENGAGING, and DIGESTIBLE 5-day lesson schedule.
+
+    CRITICAL INSTRUCTIONS:
+    1. First, search and retrieve ALL content from the textbook for that curriculum, grade and subject in the vector database
+    2. Identify TOPICS (not chapters) - focus on learning concepts, skills, and knowledge areas
+    3. Analyze topic COMPLEXITY and DIFFICULTY LEVEL for students of that grade
+    4. Distribute content based on TOPIC COMPLEXITY, not page counts:
+       - Simple/fun topics: Can cover more in one day
+       - Complex/abstract topics: Break into smaller, digestible chunks
+       - Interactive topics: Prioritize hands-on activities
+    5. Make learning ENJOYABLE and INTERESTING for children
+    6. Each day should build logical progression while maintaining engagement
+    7. Respond in {language_name} language
+
+    For EACH DAY, provide this EXACT format:
+
+    **DAY 1 - [Date]:**
+    **Topic:** [Specific topic name from textbook]
+    **Why this topic today:** [Brief explanation of complexity/reasoning]
+    **Learning Goals:** [What students will understand/be able to do]
+    **Fun Activities:** [Engaging, age-appropriate activities from textbook]
+    **Practice:** [Simple exercises to reinforce learning]
+    **Assessment:** [Quick, fun way to check understanding]
+    **Pages/References:** [Specific textbook pages or sections]
+
+    **DAY 2 - [Date]:**
+    [Same format]
+
+    [Continue for all 5 days]
+
+    IMPORTANT: Base daily content distribution on topic complexity and student engagement, NOT on fixed page counts. Some days might cover 2 pages of complex topics, others might cover 10 pages of simple, fun content.
+    """,
+    message=(
+        "Create the 5-day schedule for the {curriculum} Grade {grade} {subject} textbook.\n"
+        "Schedule for these working days: {working_days}\n"
+        "Start by analyzing the vector database content for {subject} Grade {grade} now."
+    ),
+)
+
+TEMPLATES = {template.name: template for template in (CHAT_MENTOR, CONCEPT_CURRICULUM, CONCEPT_WEB, LESSON_SCHEDULE)}
+
+
+class PromptRegistry:
+    """
+    Renders templates and caches one agent variant per (template, language).
+
+    build_agent(extra_instruction) -> Agent builds a RootAgent with the template's
+    instruction appended; build_route_agent(route, extra_instruction) does the same
+    for a sub-agent that is run directly (see intent_router.py). When enabled is
+    False, render() falls back to sending instruction and message together as a
+    single prompt, as before.
+    """
+
+    def __init__(self, build_agent, templates=None, enabled=True, build_route_agent=None):
+        self.build_agent = build_agent
+        self.build_route_agent = build_route_agent
+        self.templates = templates or TEMPLATES
+        self.enabled = enabled
+        self._agents = {}  # (template name, language code, route) -> Agent
+        self._lock = threading.Lock()
+        self.requests = {}  # template name -> count
+        self.history_bytes_saved = 0
+        self.history_tokens_saved = 0
+
+    def agent_for(self, name, language, route=None):
+        key = (name, language, route)
+        agent = self._agents.get(key)
+        if agent is None:
+            with self._lock:
+                agent = self._agents.get(key)
+                if agent is None:
+                    instruction = self.templates[name].render_instruction(SUPPORTED_LANGUAGES.get(language, language))
+                    if route:
+                        agent = self.build_route_agent(route, instruction)
+                    else:
+                        agent = self.build_agent(instruction)
+                    self._agents[key] = agent
+                    print(f"Built agent variant for prompt template {name} ({language}{', ' + route if route else ''})")
+        return agent
+
+    def render(self, name, language="en", route=None, prior_turns=0, **fields):
+        """
+        Return (agent, message): the agent variant to run and the text to send.
+
+        route runs a sub-agent directly instead of RootAgent. The agent is None when the
+        default agent should be used (RootAgent, or the plain sub-agent when disabled).
+
+        The instruction is sent with every model call either way; what is saved is the copy
+        of it that each earlier user message in the session would carry in the history.
+        prior_turns is the number of those messages, and the stats count only that.
+        """
+        template = self.templates[name]
+        language_name = SUPPORTED_LANGUAGES.get(language, language)
+        message = template.render_message(language_name, **fields)
+        instruction = template.render_instruction(language_name)
+        if not self.enabled:
+            agent = self.build_route_agent(route) if route else None
+            return agent, instruction + "\n" + message
+
+        saved_bytes = len(instruction.encode("utf-8")) * prior_turns
+        saved_tokens = estimate_tokens(instruction) * prior_turns
+        self.requests[name] = self.requests.get(name, 0) + 1
+        self.history_bytes_saved += saved_bytes
+        self.history_tokens_saved += saved_tokens
+        print(f"Prompt {name} ({language}): sent {len(message.encode('utf-8'))} bytes, "
+              f"{saved_bytes} bytes (~{saved_tokens} tokens) of repeated preambles kept out of the history")
+        return self.agent_for(name, language, route), message
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "agent_variants": len(self._agents),
+            "requests": dict(self.requests),
+            "history_bytes_saved": self.history_bytes_saved,
+            "history_tokens_saved": self.history_tokens_saved,
+        }
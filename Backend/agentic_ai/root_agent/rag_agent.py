@@ -1,44 +1,101 @@
 from google.adk.agents import Agent
 from google.adk.tools import google_search, VertexAiSearchTool 
-from google.adk.tools.retrieval.vertex_ai_rag_retrieval import VertexAiRagRetrieval
-from vertexai.preview import rag
 
 from dotenv import load_dotenv
 # from .prompts import return_instructions_root
 import os
 
+import config
+from context_packing import ContextPacker
+from corpora import KTS, NCERT, RAG_CORPORA
+from local_retrieval import LocalRagRetrieval
+from retrieval_cache import RetrievalCache
+from vertex_retrieval import ShardedVertexRagRetrieval
+
 load_dotenv()
 
-ncert_retrieval = VertexAiRagRetrieval(
-    name='retrieve ncert textbook',
-    description=(
-        'Use this tool to retrieve documentation and reference materials for the question from the NCERT Textbook corpus,'
-    ),
-    rag_resources=[
-        #NCERT Textbooks
-        rag.RagResource(
-            rag_corpus="projects/265110558107/locations/us-central1/ragCorpora/576460752303423488"
-        ),
-    ],
-    similarity_top_k=10,
-    vector_distance_threshold=0.6,
+retrieval_cache = RetrievalCache(
+    config.RETRIEVAL_CACHE_PATH,
+    memory_entries=config.RETRIEVAL_CACHE_MEMORY_ENTRIES,
+    ttl_seconds=int(config.RETRIEVAL_CACHE_TTL_HOURS * 3600),
+    enabled=config.RETRIEVAL_CACHE_ENABLED,
 )
 
-kts_retrieval = VertexAiRagRetrieval(
-    name='retrieve kts textbook',
-    description=(
-        'Use this tool to retrieve documentation and reference materials for the question from the KTS Textbook corpus,'
-    ),
-    rag_resources=[
-        # KTS Textbooks
-        rag.RagResource(
-            rag_corpus="projects/265110558107/locations/us-central1/ragCorpora/5764607523034234880"
-        ),
-    ],
-    similarity_top_k=10,
-    vector_distance_threshold=0.6,
+context_packer = ContextPacker(
+    token_budget=config.CONTEXT_TOKEN_BUDGET,
+    mmr_lambda=config.CONTEXT_MMR_LAMBDA,
+    lexical_weight=config.CONTEXT_LEXICAL_WEIGHT,
+    dedupe_threshold=config.CONTEXT_DEDUPE_THRESHOLD,
+    enabled=config.CONTEXT_PACKING_ENABLED,
 )
 
+# Curricula configured for the local backend are served from an in-process index; either way
+# searches are restricted to the books of the request's grade and subject (see corpora.py)
+if config.RAG_BACKEND_NCERT == "local":
+    ncert_retrieval = LocalRagRetrieval(
+        name='retrieve_ncert_textbook',
+        description=(
+            'Use this tool to retrieve documentation and reference materials for the question from the NCERT Textbook corpus,'
+        ),
+        index_path=os.path.join(config.RAG_LOCAL_INDEX_DIR, NCERT),
+        similarity_top_k=10,
+        vector_distance_threshold=0.6,
+        hybrid=config.RAG_HYBRID_SEARCH,
+        rrf_k=config.RAG_RRF_K,
+        hybrid_candidates=config.RAG_HYBRID_CANDIDATES,
+        cache=retrieval_cache,
+        packer=context_packer,
+        reload_check_seconds=config.RAG_CORPUS_CHECK_SECONDS,
+    )
+else:
+    ncert_retrieval = ShardedVertexRagRetrieval(
+        # A function call needs a valid function name; the built-in tool keeps its original name
+        name='retrieve ncert textbook' if config.RAG_VERTEX_BUILTIN_RETRIEVAL else 'retrieve_ncert_textbook',
+        description=(
+            'Use this tool to retrieve documentation and reference materials for the question from the NCERT Textbook corpus,'
+        ),
+        rag_corpus=RAG_CORPORA[NCERT],
+        similarity_top_k=10,
+        vector_distance_threshold=0.6,
+        refresh_seconds=config.RAG_CORPUS_CHECK_SECONDS,
+        cache=retrieval_cache,
+        packer=context_packer,
+        builtin_retrieval=config.RAG_VERTEX_BUILTIN_RETRIEVAL,
+        distance_metric=config.RAG_VERTEX_DISTANCE_METRIC,
+    )
+
+if config.RAG_BACKEND_KTS == "local":
+    kts_retrieval = LocalRagRetrieval(
+        name='retrieve_kts_textbook',
+        description=(
+            'Use this tool to retrieve documentation and reference materials for the question from the KTS Textbook corpus,'
+        ),
+        index_path=os.path.join(config.RAG_LOCAL_INDEX_DIR, KTS),
+        similarity_top_k=10,
+        vector_distance_threshold=0.6,
+        hybrid=config.RAG_HYBRID_SEARCH,
+        rrf_k=config.RAG_RRF_K,
+        hybrid_candidates=config.RAG_HYBRID_CANDIDATES,
+        cache=retrieval_cache,
+        packer=context_packer,
+        reload_check_seconds=config.RAG_CORPUS_CHECK_SECONDS,
+    )
+else:
+    kts_retrieval = ShardedVertexRagRetrieval(
+        name='retrieve kts textbook' if config.RAG_VERTEX_BUILTIN_RETRIEVAL else 'retrieve_kts_textbook',
+        description=(
+            'Use this tool to retrieve documentation and reference materials for the question from the KTS Textbook corpus,'
+        ),
+        rag_corpus=RAG_CORPORA[KTS],
+        similarity_top_k=10,
+        vector_distance_threshold=0.6,
+        refresh_seconds=config.RAG_CORPUS_CHECK_SECONDS,
+        cache=retrieval_cache,
+        packer=context_packer,
+        builtin_retrieval=config.RAG_VERTEX_BUILTIN_RETRIEVAL,
+        distance_metric=config.RAG_VERTEX_DISTANCE_METRIC,
+    )
+
 # vertexai_search_tool = VertexAiSearchTool(
 #    data_store_id="projects/tough-nature-466516-r4/locations/global/collections/default_collection/dataStores/YOUR_DATA_STORE_ID"
 # )
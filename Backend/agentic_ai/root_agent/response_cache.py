@@ -0,0 +1,112 @@
+import hashlib
+import json
+import time
+import unicodedata
+
+from cache_store import LRUCache, SqliteKVStore
+
+
+class ResponseCache:
+    """
+    Two-tier cache of agent responses for generation endpoints whose prompt is built
+    only from form fields (lesson plans, study materials, activities, ...).
+
+    Entries are keyed by the normalized (endpoint, parameters, language, curriculum,
+    corpus version) tuple and expire after ttl_seconds. Bumping corpus_version
+    (e.g. after re-indexing the textbooks) makes every older entry unreachable.
+    """
+
+    def __init__(self, path, memory_entries=500, ttl_seconds=7 * 24 * 3600, corpus_version="1", enabled=True):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.corpus_version = corpus_version
+        self.memory = LRUCache(max_entries=memory_entries, ttl_seconds=ttl_seconds)
+        self.store = None
+        if enabled:
+            try:
+                self.store = SqliteKVStore(path, table="responses")
+                self.store.purge_expired()
+            except Exception as e:
+                print(f"Response cache: persistent store unavailable ({e}), using memory only")
+        self.endpoints = {}  # endpoint -> {"hits", "misses", "bypassed"}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    @staticmethod
+    def normalize(value):
+        if isinstance(value, str):
+            return " ".join(unicodedata.normalize("NFC", value).casefold().split())
+        if isinstance(value, (list, tuple)):
+            items = [ResponseCache.normalize(item) for item in value]
+            # The order of e.g. grades or subjects doesn't change what is generated
+            return sorted(items, key=lambda item: json.dumps(item, ensure_ascii=False))
+        return value
+
+    def key(self, endpoint, params, language="en", curriculum=None):
+        normalized = {name: self.normalize(value) for name, value in params.items()}
+        material = json.dumps(
+            [endpoint, normalized, language, self.normalize(curriculum), self.corpus_version],
+            sort_keys=True, ensure_ascii=False,
+        )
+        return f"{endpoint}:{hashlib.sha1(material.encode('utf-8')).hexdigest()}"
+
+    def _count(self, endpoint, outcome):
+        counts = self.endpoints.setdefault(endpoint, {"hits": 0, "misses": 0, "bypassed": 0})
+        counts[outcome] += 1
+
+    def get(self, endpoint, key):
+        if not self.enabled:
+            return None
+        text = self.memory.get(key)
+        if text is not None:
+            self.memory_hits += 1
+            self._count(endpoint, "hits")
+            return text
+        if self.store is not None:
+            try:
+                stored = self.store.get(key)
+            except Exception as e:
+                print(f"Response cache read error: {e}")
+                stored = None
+            if stored is not None:
+                entry = json.loads(stored)
+                self.disk_hits += 1
+                self._count(endpoint, "hits")
+                self.memory.set(key, entry["text"], ttl_seconds=max(entry["expires_at"] - time.time(), 1))
+                return entry["text"]
+        self.misses += 1
+        self._count(endpoint, "misses")
+        return None
+
+    def bypass(self, endpoint):
+        """Count a request that asked for a fresh response (no_cache)."""
+        self._count(endpoint, "bypassed")
+
+    def put(self, key, text):
+        if not self.enabled or not text:
+            return
+        self.memory.set(key, text)
+        if self.store is not None:
+            entry = {"text": text, "expires_at": time.time() + self.ttl_seconds}
+            try:
+                self.store.set(key, json.dumps(entry, ensure_ascii=False), ttl_seconds=self.ttl_seconds)
+            except Exception as e:
+                print(f"Response cache write error: {e}")
+        self.writes += 1
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "corpus_version": self.corpus_version,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_evictions": self.memory.evictions,
+            "endpoints": {endpoint: dict(counts) for endpoint, counts in self.endpoints.items()},
+        }
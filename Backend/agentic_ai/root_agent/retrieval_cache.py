@@ -0,0 +1,110 @@
+import hashlib
+import json
+import time
+
+from cache_store import LRUCache, SqliteKVStore
+from response_cache import ResponseCache
+
+
+class RetrievalCache:
+    """
+    Two-tier cache of textbook retrieval results (chunk ids and text) shared by the
+    NCERT/KTS retrieval tools.
+
+    Entries are keyed by (corpus, corpus version, normalized query, top_k, threshold,
+    scope), where scope holds whatever else changes the result, such as the shards
+    searched. The version comes from the corpus itself: the local index manifest, or
+    the file list of a Vertex AI RAG corpus. When the corpus changes, its old entries
+    can no longer be reached and expire after ttl_seconds.
+    """
+
+    def __init__(self, path, memory_entries=2000, ttl_seconds=7 * 24 * 3600, enabled=True):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.memory = LRUCache(max_entries=memory_entries, ttl_seconds=ttl_seconds)
+        self.store = None
+        if enabled:
+            try:
+                self.store = SqliteKVStore(path, table="retrievals")
+                self.store.purge_expired()
+            except Exception as e:
+                print(f"Retrieval cache: persistent store unavailable ({e}), using memory only")
+        self.versions = {}  # corpus -> last version seen
+        self.corpora = {}  # corpus label -> {"hits", "misses"}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.invalidations = 0
+
+    def key(self, corpus, version, query, top_k, threshold, scope=None):
+        if self.versions.get(corpus, version) != version:
+            self.invalidations += 1
+            print(f"Retrieval cache: {corpus} changed to version {version}, older results are no longer used")
+        self.versions[corpus] = version
+        material = json.dumps(
+            [corpus, version, ResponseCache.normalize(query), top_k, threshold, scope],
+            sort_keys=True, ensure_ascii=False,
+        )
+        return hashlib.sha1(material.encode("utf-8")).hexdigest()
+
+    def _count(self, label, outcome):
+        counts = self.corpora.setdefault(label, {"hits": 0, "misses": 0})
+        counts[outcome] += 1
+
+    def get(self, label, key):
+        """The cached chunk list for a key, or None; label names the tool in the stats."""
+        if not self.enabled:
+            return None
+        chunks = self.memory.get(key)
+        if chunks is not None:
+            self.memory_hits += 1
+            self._count(label, "hits")
+            return chunks
+        if self.store is not None:
+            try:
+                stored = self.store.get(key)
+            except Exception as e:
+                print(f"Retrieval cache read error: {e}")
+                stored = None
+            if stored is not None:
+                entry = json.loads(stored)
+                self.disk_hits += 1
+                self._count(label, "hits")
+                self.memory.set(key, entry["chunks"], ttl_seconds=max(entry["expires_at"] - time.time(), 1))
+                return entry["chunks"]
+        self.misses += 1
+        self._count(label, "misses")
+        return None
+
+    def put(self, key, chunks):
+        """Store a result; an empty list is cached too, so repeated misses skip the search as well."""
+        if not self.enabled:
+            return
+        self.memory.set(key, chunks)
+        if self.store is not None:
+            entry = {"chunks": chunks, "expires_at": time.time() + self.ttl_seconds}
+            try:
+                self.store.set(key, json.dumps(entry, ensure_ascii=False), ttl_seconds=self.ttl_seconds)
+            except Exception as e:
+                print(f"Retrieval cache write error: {e}")
+        self.writes += 1
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "versions": dict(self.versions),
+            "memory_entries": len(self.memory),
+            "memory_evictions": self.memory.evictions,
+            "corpora": {
+                label: dict(counts, hit_rate=round(counts["hits"] / (counts["hits"] + counts["misses"]), 4))
+                for label, counts in self.corpora.items()
+            },
+        }
@@ -0,0 +1,125 @@
+"""
+Unicode script detection.
+
+Builds a per-script histogram of a text's characters in one vectorized pass
+(code points -> Unicode block lookup with NumPy) and uses it to decide whether
+text really needs translating into a target language, instead of treating any
+Latin letter as a sign of an untranslated answer.
+"""
+import numpy as np
+
+import config
+
+# (first code point, last code point + 1, script) for the blocks we care about
+SCRIPT_BLOCKS = [
+    (0x0041, 0x005B, "latin"),
+    (0x0061, 0x007B, "latin"),
+    (0x00C0, 0x0250, "latin"),
+    (0x0370, 0x0400, "greek"),
+    (0x0400, 0x0530, "cyrillic"),
+    (0x0600, 0x0700, "arabic"),
+    (0x0750, 0x0780, "arabic"),
+    (0x0900, 0x0980, "devanagari"),
+    (0x0980, 0x0A00, "bengali"),
+    (0x0A00, 0x0A80, "gurmukhi"),
+    (0x0A80, 0x0B00, "gujarati"),
+    (0x0B00, 0x0B80, "oriya"),
+    (0x0B80, 0x0C00, "tamil"),
+    (0x0C00, 0x0C80, "telugu"),
+    (0x0C80, 0x0D00, "kannada"),
+    (0x0D00, 0x0D80, "malayalam"),
+    (0x1100, 0x1200, "hangul"),
+    (0x1E00, 0x1F00, "latin"),
+    (0x3040, 0x3100, "kana"),
+    (0x3400, 0x4DC0, "han"),
+    (0x4E00, 0xA000, "han"),
+    (0xAC00, 0xD7B0, "hangul"),
+]
+
+# Scripts a language is normally written in
+LANGUAGE_SCRIPTS = {
+    "en": ("latin",), "fr": ("latin",), "de": ("latin",), "es": ("latin",), "pt": ("latin",),
+    "hi": ("devanagari",), "mr": ("devanagari",),
+    "bn": ("bengali",), "as": ("bengali",),
+    "pa": ("gurmukhi",), "gu": ("gujarati",), "or": ("oriya",),
+    "ta": ("tamil",), "te": ("telugu",), "kn": ("kannada",), "ml": ("malayalam",),
+    "ru": ("cyrillic",), "ar": ("arabic",),
+    "ja": ("kana", "han"), "zh": ("han",), "ko": ("hangul", "han"),
+}
+
+SCRIPTS = sorted({script for _, _, script in SCRIPT_BLOCKS})
+OTHER = len(SCRIPTS)  # bucket for digits, punctuation, emoji, whitespace...
+
+# Sorted interval edges and the script index of each interval, for np.searchsorted
+_edges = []
+_labels = []
+for start, end, script in sorted(SCRIPT_BLOCKS):
+    if _edges and _edges[-1] == start:
+        _labels[-1] = SCRIPTS.index(script)
+    else:
+        _edges.append(start)
+        _labels.append(SCRIPTS.index(script))
+    _edges.append(end)
+    _labels.append(OTHER)
+_EDGES = np.array(_edges, dtype=np.uint32)
+_LABELS = np.array([OTHER] + _labels, dtype=np.intp)
+
+
+def script_histogram(text):
+    """Return {script: character count} for the scripts present in text (other characters are ignored)."""
+    if not text:
+        return {}
+    code_points = np.frombuffer(text.encode("utf-32-le"), dtype="<u4")
+    buckets = _LABELS[np.searchsorted(_EDGES, code_points, side="right")]
+    counts = np.bincount(buckets, minlength=OTHER + 1)[:OTHER]
+    return {SCRIPTS[i]: int(count) for i, count in enumerate(counts) if count}
+
+
+def foreign_ratio(text, target_language):
+    """Share of script characters in text that are not written in target_language's script(s)."""
+    histogram = script_histogram(text)
+    total = sum(histogram.values())
+    if not total:
+        return 0.0
+    native = sum(histogram.get(script, 0) for script in LANGUAGE_SCRIPTS.get(target_language, ()))
+    return 1.0 - native / total
+
+
+def needs_translation(text, target_language, source_language="en", threshold=None):
+    """
+    Decide whether text still has to be translated into target_language.
+
+    Text counts as already translated when at most `threshold` of its letters are
+    outside the target script, so a Hindi answer mentioning "NCERT" or "DNA" is left
+    alone. When source and target share a script (e.g. en -> fr) scripts cannot tell
+    them apart and the text is always sent for translation.
+    """
+    target_scripts = LANGUAGE_SCRIPTS.get(target_language)
+    if not target_scripts or target_scripts == LANGUAGE_SCRIPTS.get(source_language):
+        return True
+    threshold = config.SCRIPT_FOREIGN_RATIO_THRESHOLD if threshold is None else threshold
+    return foreign_ratio(text, target_language) > threshold
+
+
+def plausible_translation(text, translated, target_language, source_language="en", min_ratio=None, max_ratio=None):
+    """
+    Cheap check that translated is a translation of text, used on the lines of a joined batch.
+
+    Lines that shifted (one source line split, another merged) show up as an empty
+    line, a length far off the source's, or a line still in the source script.
+    Very short texts only need to be non-empty.
+    """
+    if not translated or not translated.strip():
+        return False
+    if len(text) < 12:
+        return True
+    min_ratio = config.TRANSLATION_BATCH_MIN_LENGTH_RATIO if min_ratio is None else min_ratio
+    max_ratio = config.TRANSLATION_BATCH_MAX_LENGTH_RATIO if max_ratio is None else max_ratio
+    if not min_ratio <= len(translated) / len(text) <= max_ratio:
+        return False
+    # The script only tells when source and target are written differently
+    target_scripts = LANGUAGE_SCRIPTS.get(target_language)
+    if target_scripts and target_scripts != LANGUAGE_SCRIPTS.get(source_language) \
+            and needs_translation(text, target_language, source_language):
+        return not needs_translation(translated, target_language, source_language)
+    return True
@@ -0,0 +1,165 @@
+"""
+Semantic cache for first-turn /chat questions.
+
+Teachers ask the same questions in different words ("explain photosynthesis
+for class 7" / "photosynthesis grade 7 explanation"). A question is embedded
+and compared against earlier questions in its (language, curriculum)
+partition; the stored answer is reused when the best cosine similarity clears
+the threshold and both questions mention the same numbers (so "class 7" never
+answers "class 8").
+
+Each partition is a small in-process NumPy matrix of unit vectors, stored as
+int8 (scaled by 127) or float32, searched with one matrix-vector product.
+Entries expire after ttl_seconds; when a partition is full the least recently
+used entry is evicted.
+"""
+import re
+import time
+
+import numpy as np
+
+# Answers to these depend on when they are asked
+TIME_SENSITIVE_RE = re.compile(r"\b(latest|today'?s?|tomorrow|yesterday|current|currently|now|news|weather|score|stock price)\b")
+NUMBER_RE = re.compile(r"\d+")
+
+
+class VectorIndex:
+    """Fixed-capacity matrix of unit vectors with one entry per row; top-1 cosine search."""
+
+    def __init__(self, dim, capacity, quantize=True):
+        self.quantize = quantize
+        self.matrix = np.zeros((capacity, dim), dtype=np.int8 if quantize else np.float32)
+        self.entries = []  # row -> entry dict
+        self.capacity = capacity
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, vector, entry):
+        row = len(self.entries)
+        self.matrix[row] = np.round(vector * 127) if self.quantize else vector
+        self.entries.append(entry)
+
+    def remove(self, row):
+        """Remove a row by moving the last row into its place."""
+        last = len(self.entries) - 1
+        if row != last:
+            self.matrix[row] = self.matrix[last]
+            self.entries[row] = self.entries[last]
+        self.entries.pop()
+
+    def search(self, vector):
+        """Return (row, cosine) of the closest entry, or (None, 0.0) when empty."""
+        if not self.entries:
+            return None, 0.0
+        scores = self.matrix[:len(self.entries)].astype(np.float32) @ vector
+        if self.quantize:
+            scores /= 127
+        row = int(np.argmax(scores))
+        return row, min(float(scores[row]), 1.0)  # int8 rounding can overshoot slightly
+
+    def nbytes(self):
+        return self.matrix[:len(self.entries)].nbytes
+
+
+class SemanticCache:
+    def __init__(self, embedder, threshold=0.9, capacity_per_partition=2000, ttl_seconds=7 * 24 * 3600,
+                 quantize=True, endpoints=("/chat",)):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.capacity = capacity_per_partition
+        self.ttl_seconds = ttl_seconds
+        self.quantize = quantize
+        self.endpoints = set(endpoints)
+        self.partitions = {}  # (language, curriculum) -> VectorIndex
+        self.lookups = 0
+        self.hits = 0
+        self.skipped = 0
+        self.stores = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def enabled_for(self, endpoint):
+        return endpoint in self.endpoints
+
+    @staticmethod
+    def cacheable_question(text):
+        return bool(text and text.strip()) and not TIME_SENSITIVE_RE.search(text.lower())
+
+    async def lookup(self, endpoint, text, language, curriculum):
+        """
+        Returns (answer, vector): the cached answer or None, and the question's embedding
+        to pass to store() after a miss (None when the question can't be cached).
+        """
+        if not self.enabled_for(endpoint) or not self.cacheable_question(text):
+            self.skipped += 1
+            return None, None
+        try:
+            vector = await self.embedder.embed_one(" ".join(text.split()))
+        except Exception as e:
+            self.errors += 1
+            print(f"Semantic cache: embedding failed ({e}), skipping lookup")
+            return None, None
+        self.lookups += 1
+        index = self.partitions.get((language, curriculum))
+        if index is None:
+            return None, vector
+        numbers = NUMBER_RE.findall(text)
+        now = time.time()
+        while True:
+            row, score = index.search(vector)
+            if row is None or score < self.threshold:
+                return None, vector
+            entry = index.entries[row]
+            if entry["expires_at"] < now:
+                index.remove(row)
+                self.evictions += 1
+                continue
+            if entry["numbers"] != numbers:
+                return None, vector
+            entry["last_used"] = now
+            entry["hits"] += 1
+            self.hits += 1
+            print(f"Semantic cache hit ({score:.3f}) for {text!r}: cached question {entry['question']!r}")
+            return entry["answer"], vector
+
+    def store(self, vector, text, answer, language, curriculum):
+        if vector is None or not answer:
+            return
+        key = (language, curriculum)
+        index = self.partitions.get(key)
+        if index is None:
+            index = self.partitions[key] = VectorIndex(len(vector), self.capacity, self.quantize)
+        if len(index) >= index.capacity:
+            oldest = min(range(len(index)), key=lambda row: index.entries[row]["last_used"])
+            index.remove(oldest)
+            self.evictions += 1
+        now = time.time()
+        index.add(vector, {
+            "question": text,
+            "answer": answer,
+            "numbers": NUMBER_RE.findall(text),
+            "expires_at": now + self.ttl_seconds,
+            "last_used": now,
+            "hits": 0,
+        })
+        self.stores += 1
+
+    def stats(self):
+        return {
+            "enabled": True,
+            "endpoints": sorted(self.endpoints),
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "skipped": self.skipped,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "partitions": {
+                f"{language}:{curriculum}": {"entries": len(index), "bytes": index.nbytes()}
+                for (language, curriculum), index in self.partitions.items()
+            },
+            "embedder": self.embedder.stats(),
+        }
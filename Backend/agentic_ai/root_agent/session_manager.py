@@ -0,0 +1,268 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.events import Event
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from singleflight import SingleFlight
+
+APP_NAME = "fastapi_adk_chatbot"
+
+
+class SessionManager:
+    """
+    Registry of live agent sessions with bounded memory use.
+
+    Runners hold no per-session state, so a small pool of them is built once and
+    shared by every session; conversation state lives only in the session service.
+
+    Sessions are kept in LRU order and evicted when the registry exceeds
+    max_sessions, when a user exceeds max_sessions_per_user, or when they have
+    been idle for longer than idle_ttl_seconds (checked by a background sweeper).
+    Evicted sessions are also removed from the ADK session service so their
+    event history is freed, and their artifacts (generated images) are deleted
+    from the in-memory artifact service. Durable services that provide unload_session() only
+    drop them from memory; the session is restored from disk on the next request.
+    """
+
+    def __init__(self, agent, session_service=None, max_sessions=2000, max_sessions_per_user=1000,
+                 idle_ttl_seconds=1800, sweep_interval_seconds=60, runner_pool_size=1, history_compactor=None):
+        self.agent = agent
+        self.history_compactor = history_compactor
+        self.session_service = session_service or InMemorySessionService()
+        # Shared by all runners so generated images can be loaded by name and version after the run
+        self.artifact_service = InMemoryArtifactService()
+        self.max_sessions = max_sessions
+        self.max_sessions_per_user = max_sessions_per_user
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.runner_pool_size = max(1, runner_pool_size)
+        self.runners = self._build_runners(agent)
+        # Extra pools for agent variants (e.g. per-language instructions), keyed by id(agent);
+        # variants are cached by their builders for the lifetime of the process
+        self._variant_runners = {}
+        self._next_runner = 0
+        self.sessions = OrderedDict()  # (user_id, session_id) -> last access time
+        self.user_session_counts = {}  # user_id -> number of live sessions
+        self._lock = asyncio.Lock()
+        # Concurrent first requests for one session share a single lookup/create
+        self._opening = SingleFlight()
+        self._sweeper_task = None
+        self.created = 0
+        self.restored = 0
+        self.evicted = {"lru": 0, "user_cap": 0, "idle_ttl": 0}
+
+    def _build_runners(self, agent):
+        return [
+            Runner(agent=agent, app_name=APP_NAME, session_service=self.session_service,
+                   artifact_service=self.artifact_service)
+            for _ in range(self.runner_pool_size)
+        ]
+
+    def _pooled_runner(self, agent=None) -> Runner:
+        runners = self.runners
+        if agent is not None and agent is not self.agent:
+            runners = self._variant_runners.get(id(agent))
+            if runners is None:
+                runners = self._variant_runners[id(agent)] = self._build_runners(agent)
+        self._next_runner = (self._next_runner + 1) % len(runners)
+        return runners[self._next_runner]
+
+    async def get_or_create_runner(self, user_id: str, session_id: str, agent=None) -> Runner:
+        """
+        Make sure the session exists and return a shared Runner to run it with.
+
+        agent selects a variant of the root agent; sessions are shared by all variants.
+        """
+        key = (user_id, session_id)
+        async with self._lock:
+            if key in self.sessions:
+                self.sessions[key] = time.time()
+                self.sessions.move_to_end(key)
+                return self._pooled_runner(agent)
+        # The service calls run outside the lock, so one slow lookup doesn't hold up every other session
+        await self._opening.do(key, lambda: self._open_session(user_id, session_id))
+        return self._pooled_runner(agent)
+
+    async def _open_session(self, user_id, session_id):
+        """Restore or create a session in the session service and register it."""
+        key = (user_id, session_id)
+        # A durable service may still hold the session from before a restart or eviction
+        existing = await self.session_service.get_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            session_id=session_id
+        )
+        if existing is None:
+            await self.session_service.create_session(
+                app_name=APP_NAME,
+                user_id=user_id,
+                session_id=session_id
+            )
+            self.created += 1
+            print(f"Created new session for user: {user_id}, session: {session_id}")
+        else:
+            self.restored += 1
+            print(f"Restored session for user: {user_id}, session: {session_id}")
+        async with self._lock:
+            if key in self.sessions:
+                # Another open of the same session registered it first
+                self.sessions[key] = time.time()
+                self.sessions.move_to_end(key)
+                return
+            self.sessions[key] = time.time()
+            self.user_session_counts[user_id] = self.user_session_counts.get(user_id, 0) + 1
+            evictions = self._select_evictions(user_id)
+
+        for evicted_key, reason in evictions:
+            await self._release_session(evicted_key, reason)
+
+    def _select_evictions(self, user_id):
+        """Pop the least recently used sessions over the per-user and global limits (lock held)."""
+        evictions = []
+        if self.max_sessions_per_user and self.user_session_counts.get(user_id, 0) > self.max_sessions_per_user:
+            oldest = next(key for key in self.sessions if key[0] == user_id)
+            evictions.append((self._pop(oldest), "user_cap"))
+        while self.max_sessions and len(self.sessions) > self.max_sessions:
+            oldest = next(iter(self.sessions))
+            evictions.append((self._pop(oldest), "lru"))
+        return evictions
+
+    def _pop(self, key):
+        del self.sessions[key]
+        remaining = self.user_session_counts.get(key[0], 1) - 1
+        if remaining > 0:
+            self.user_session_counts[key[0]] = remaining
+        else:
+            self.user_session_counts.pop(key[0], None)
+        return key
+
+    async def _release_session(self, key, reason):
+        user_id, session_id = key
+        self.evicted[reason] += 1
+        unload = getattr(self.session_service, "unload_session", None)
+        try:
+            if unload is not None:
+                unload(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+            else:
+                await self.session_service.delete_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        except Exception as e:
+            print(f"Error deleting evicted session {session_id}: {e}")
+        await self._delete_artifacts(user_id, session_id)
+
+    async def _delete_artifacts(self, user_id, session_id):
+        """Delete a session's artifacts; "user:" artifacts are shared by the user's sessions and kept."""
+        try:
+            filenames = await self.artifact_service.list_artifact_keys(
+                app_name=APP_NAME, user_id=user_id, session_id=session_id
+            )
+            for filename in filenames:
+                if not filename.startswith("user:"):
+                    await self.artifact_service.delete_artifact(
+                        app_name=APP_NAME, user_id=user_id, session_id=session_id, filename=filename
+                    )
+        except Exception as e:
+            print(f"Error deleting artifacts of session {session_id}: {e}")
+
+    async def discard_session(self, user_id: str, session_id: str):
+        """Remove a short-lived helper session from the registry and delete its history."""
+        key = (user_id, session_id)
+        async with self._lock:
+            if key not in self.sessions:
+                return
+            self._pop(key)
+        try:
+            await self.session_service.delete_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        except Exception as e:
+            print(f"Error deleting session {session_id}: {e}")
+        await self._delete_artifacts(user_id, session_id)
+
+    async def has_history(self, user_id: str, session_id: str) -> bool:
+        """True if the session exists and already has events (i.e. the next message is not a first turn)."""
+        session = await self.session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        return session is not None and bool(session.events)
+
+    async def prior_turns(self, user_id: str, session_id: str) -> int:
+        """Number of user messages already in the session's history."""
+        session = await self.session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        return sum(1 for event in session.events if event.author == "user") if session is not None else 0
+
+    async def append_turn(self, user_id: str, session_id: str, question: str, answer: str, author: str):
+        """
+        Record a question and an answer produced without running the agent (e.g. a cache hit),
+        so later turns in the session still see them.
+        """
+        session = await self.session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        if session is None:
+            return
+        invocation_id = Event.new_id()
+        for event_author, role, text in (("user", "user", question), (author, "model", answer)):
+            event = Event(
+                author=event_author,
+                invocation_id=invocation_id,
+                content=types.Content(role=role, parts=[types.Part(text=text)]),
+            )
+            await self.session_service.append_event(session, event)
+
+    async def compact_history(self, user_id: str, session_id: str):
+        """Run history compaction on a session after a turn; returns its estimated token size."""
+        if self.history_compactor is None:
+            return None
+        try:
+            return await self.history_compactor.compact(self.session_service, APP_NAME, user_id, session_id)
+        except Exception as e:
+            print(f"History compaction failed for session {session_id}: {e}")
+            return None
+
+    async def evict_idle_sessions(self):
+        cutoff = time.time() - self.idle_ttl_seconds
+        async with self._lock:
+            # LRU order means idle sessions are at the front
+            expired = []
+            for key, last_access in self.sessions.items():
+                if last_access >= cutoff:
+                    break
+                expired.append(key)
+            for key in expired:
+                self._pop(key)
+        for key in expired:
+            await self._release_session(key, "idle_ttl")
+        if expired:
+            print(f"Evicted {len(expired)} idle sessions")
+        return len(expired)
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            try:
+                await self.evict_idle_sessions()
+            except Exception as e:
+                print(f"Session sweeper error: {e}")
+
+    def start_sweeper(self):
+        if self.idle_ttl_seconds and self._sweeper_task is None:
+            self._sweeper_task = asyncio.create_task(self._sweep_forever())
+
+    async def stop_sweeper(self):
+        if self._sweeper_task is not None:
+            self._sweeper_task.cancel()
+            try:
+                await self._sweeper_task
+            except asyncio.CancelledError:
+                pass
+            self._sweeper_task = None
+
+    def stats(self):
+        return {
+            "live_sessions": len(self.sessions),
+            "runners": len(self.runners) * (1 + len(self._variant_runners)),
+            "agent_variants": len(self._variant_runners),
+            "users": len(self.user_session_counts),
+            "created": self.created,
+            "restored": self.restored,
+            "evicted": dict(self.evicted),
+        }
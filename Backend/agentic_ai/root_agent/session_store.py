@@ -0,0 +1,429 @@
+"""
+Durable ADK session service backed by SQLite.
+
+Sessions live in a local SQLite database in WAL mode, so conversations
+survive restarts and can be shared by several uvicorn workers on one host.
+
+- Reads are served from an in-process cache. A session's history is loaded
+  from disk the first time it is accessed, and loaded again when another
+  worker has written to it since.
+- Writes are write-behind. append_event updates the cache and queues the
+  write, and a background thread commits queued writes in one transaction
+  every flush interval, or sooner once flush_batch_size writes are waiting.
+  A crash loses at most the last flush interval.
+- History is compacted. A session keeps at most max_events_per_session
+  events, always cut at the start of a user turn. Sessions idle for longer
+  than retention_seconds are purged from disk.
+
+State keys are stored per session. The app:/user: prefixes are not shared
+across sessions the way InMemorySessionService shares them.
+"""
+import asyncio
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService, Session
+from google.adk.sessions.base_session_service import (
+    BaseSessionService,
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    create_time REAL NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_by_session ON events (app_name, user_id, session_id, id);
+CREATE INDEX IF NOT EXISTS sessions_by_update_time ON sessions (update_time);
+"""
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _filter_events(session, config):
+    """Apply GetSessionConfig the same way InMemorySessionService does."""
+    if not config:
+        return session
+    if config.num_recent_events:
+        session.events = session.events[-config.num_recent_events:]
+    if config.after_timestamp:
+        session.events = [event for event in session.events if event.timestamp >= config.after_timestamp]
+    return session
+
+
+def _turn_boundary(events, max_events):
+    """
+    Index of the first event to keep when trimming events to at most max_events.
+
+    The cut is moved forward to the next user message, so a tool call is never
+    separated from its response. When the window holds no user message (one long,
+    tool-heavy turn) the cut moves back to the start of that turn instead, so at
+    least the last complete turn is kept.
+    """
+    start = max(0, len(events) - max_events)
+    for cut in range(start, len(events)):
+        if events[cut].author == "user":
+            return cut
+    for cut in range(start - 1, -1, -1):
+        if events[cut].author == "user":
+            return cut
+    return 0
+
+
+class SqliteSessionService(BaseSessionService):
+    """ADK session service with a lazily loaded cache and write-behind persistence to SQLite."""
+
+    def __init__(self, path, flush_interval_seconds=0.2, flush_batch_size=256,
+                 max_events_per_session=200, retention_seconds=14 * 24 * 3600,
+                 compact_interval_seconds=600):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.flush_interval_seconds = flush_interval_seconds
+        self.flush_batch_size = flush_batch_size
+        self.max_events_per_session = max_events_per_session
+        self.retention_seconds = retention_seconds
+        self.compact_interval_seconds = compact_interval_seconds
+
+        self._read_conn = _connect(path)
+        self._read_conn.executescript(SCHEMA)
+        self._read_conn.commit()
+        self._read_lock = threading.Lock()
+
+        self._cache = {}  # (app_name, user_id, session_id) -> Session
+        self._queue = []  # pending write operations, applied in order
+        self._queued = 0  # sequence number of the last queued operation
+        self._written = 0  # sequence number of the last committed operation
+        self._dirty = set()  # sessions with queued writes
+        self._inflight = set()  # sessions with writes being committed
+        self._flush_requested = False
+        self._cond = threading.Condition()
+        self._closed = False
+        self._last_compaction = time.time()
+        self.loads = 0
+        self.reloads = 0
+        self.flushes = 0
+        self.written_ops = 0
+        self.trimmed_events = 0
+        self.purged_sessions = 0
+        self.write_errors = 0
+        self._writer = threading.Thread(target=self._write_loop, name="session-store-writer", daemon=True)
+        self._writer.start()
+
+    # --- BaseSessionService -------------------------------------------------
+
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        now = time.time()
+        session = Session(app_name=app_name, user_id=user_id, id=session_id, state=state or {}, last_update_time=now)
+        key = (app_name, user_id, session_id)
+        self._cache[key] = session
+        self._enqueue(("replace", key, now, []))
+        self._enqueue_session(key, session, create_time=now)
+        return copy.deepcopy(session)
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        session = self._cache.get(key)
+        if session is None:
+            loaded = await asyncio.to_thread(self._load, key)
+            if loaded is None:
+                return None
+            self.loads += 1
+            # Another request may have cached (and appended to) the session while we were reading
+            session = self._cache.setdefault(key, loaded)
+        else:
+            update_time = await asyncio.to_thread(self._stored_update_time, key)
+            if update_time is not None and update_time > session.last_update_time:
+                # Another worker wrote to this session since we cached it
+                session = await asyncio.to_thread(self._load, key) or session
+                self.reloads += 1
+                self._cache[key] = session
+        return _filter_events(copy.deepcopy(session), config)
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        await asyncio.to_thread(self.flush)
+        rows = await asyncio.to_thread(self._list_rows, app_name, user_id)
+        sessions = [
+            Session(app_name=app_name, user_id=user_id, id=session_id, state=json.loads(state), last_update_time=update_time)
+            for session_id, state, update_time in rows
+        ]
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        self._cache.pop(key, None)
+        self._enqueue(("delete", key))
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        await super().append_event(session=session, event=event)
+        if event.partial:
+            return event
+        session.last_update_time = event.timestamp
+
+        key = (session.app_name, session.user_id, session.id)
+        stored = self._cache.get(key)
+        if stored is None:
+            loaded = await asyncio.to_thread(self._load, key)
+            if loaded is None:
+                print(f"Failed to append event: session {session.id} not found")
+                return event
+            stored = self._cache.setdefault(key, loaded)
+        await super().append_event(session=stored, event=event)
+        stored.last_update_time = event.timestamp
+        self._enqueue(("event", key, event.timestamp, event.model_dump_json(exclude_none=True)))
+
+        if self.max_events_per_session and len(stored.events) > self.max_events_per_session:
+            start = _turn_boundary(stored.events, self.max_events_per_session)
+            if 0 < start < len(stored.events):
+                self.trimmed_events += start
+                stored.events = stored.events[start:]
+                self._enqueue(("trim", key, stored.events[0].timestamp))
+        self._enqueue_session(key, stored)
+        return event
+
+    # --- Cache management ---------------------------------------------------
+
+    def unload_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        """Drop a session from the in-process cache; it stays on disk and is reloaded on next access."""
+        self._cache.pop((app_name, user_id, session_id), None)
+
+    def replace_events(self, session: Session, events: list) -> None:
+        """Replace a session's stored history, e.g. with a compacted version of it."""
+        key = (session.app_name, session.user_id, session.id)
+        stored = self._cache.get(key)
+        if stored is None:
+            return
+        stored.events = list(events)
+        session.events = list(events)
+        self._enqueue((
+            "replace", key, None,
+            [(event.timestamp, event.model_dump_json(exclude_none=True)) for event in events],
+        ))
+        self._enqueue_session(key, stored)
+
+    # --- Disk access --------------------------------------------------------
+    # These block on SQLite (and _load on a flush); the async methods run them with asyncio.to_thread.
+
+    def _list_rows(self, app_name, user_id):
+        with self._read_lock:
+            return self._read_conn.execute(
+                "SELECT session_id, state, update_time FROM sessions WHERE app_name = ? AND user_id = ?",
+                (app_name, user_id),
+            ).fetchall()
+
+    def _stored_update_time(self, key):
+        with self._read_lock:
+            row = self._read_conn.execute(
+                "SELECT update_time FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key
+            ).fetchone()
+        return row[0] if row else None
+
+    def _load(self, key):
+        # Writes for this session may still be queued; commit them before reading it back
+        if key in self._dirty or key in self._inflight:
+            self.flush()
+        with self._read_lock:
+            row = self._read_conn.execute(
+                "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            query = "SELECT data FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY id DESC"
+            params = key
+            if self.max_events_per_session:
+                query += " LIMIT ?"
+                params = key + (self.max_events_per_session,)
+            event_rows = self._read_conn.execute(query, params).fetchall()
+            events = [Event.model_validate_json(data) for (data,) in reversed(event_rows)]
+            if len(events) == self.max_events_per_session and all(event.author != "user" for event in events):
+                # A single turn longer than the limit: read it back from its user message
+                event_rows = self._read_conn.execute(
+                    "SELECT data FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? AND id >= "
+                    "(SELECT COALESCE(MAX(id), 0) FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? "
+                    "AND json_extract(data, '$.author') = 'user') ORDER BY id",
+                    key + key,
+                ).fetchall()
+                events = [Event.model_validate_json(data) for (data,) in event_rows]
+        if self.max_events_per_session:
+            events = events[_turn_boundary(events, self.max_events_per_session):]
+        app_name, user_id, session_id = key
+        return Session(
+            app_name=app_name, user_id=user_id, id=session_id,
+            state=json.loads(row[0]), events=events, last_update_time=row[1],
+        )
+
+    # --- Write-behind -------------------------------------------------------
+
+    def _enqueue_session(self, key, session, create_time=None):
+        state = json.dumps(session.state, default=str)
+        self._enqueue(("session", key, state, create_time or session.last_update_time, session.last_update_time))
+
+    def _enqueue(self, op):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Session store is closed")
+            self._queue.append(op)
+            self._dirty.add(op[1])
+            self._queued += 1
+            if len(self._queue) >= self.flush_batch_size:
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Block until every write queued so far has been committed."""
+        with self._cond:
+            target = self._queued
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._written >= target or not self._writer.is_alive(), timeout)
+
+    def _write_loop(self):
+        conn = _connect(self.path)
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(
+                        lambda: self._closed or self._flush_requested or len(self._queue) >= self.flush_batch_size,
+                        self.flush_interval_seconds,
+                    )
+                    ops, self._queue = self._queue, []
+                    self._inflight, self._dirty = self._dirty, set()
+                    self._flush_requested = False
+                    target = self._queued
+                    closed = self._closed
+                if ops:
+                    self._write(conn, ops)
+                if time.time() - self._last_compaction >= self.compact_interval_seconds:
+                    self._compact(conn)
+                with self._cond:
+                    self._written = target
+                    self._inflight = set()
+                    self._cond.notify_all()
+                if closed:
+                    return
+        finally:
+            conn.close()
+
+    def _write(self, conn, ops):
+        try:
+            with conn:
+                for op in ops:
+                    kind, key = op[0], op[1]
+                    if kind == "session":
+                        _, _, state, create_time, update_time = op
+                        conn.execute(
+                            "INSERT INTO sessions (app_name, user_id, session_id, state, create_time, update_time) "
+                            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (app_name, user_id, session_id) "
+                            "DO UPDATE SET state = excluded.state, update_time = excluded.update_time",
+                            key + (state, create_time, update_time),
+                        )
+                    elif kind == "event":
+                        _, _, timestamp, data = op
+                        conn.execute(
+                            "INSERT INTO events (app_name, user_id, session_id, timestamp, data) VALUES (?, ?, ?, ?, ?)",
+                            key + (timestamp, data),
+                        )
+                    elif kind == "trim":
+                        conn.execute(
+                            "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? AND timestamp < ?",
+                            key + (op[2],),
+                        )
+                    elif kind == "replace":
+                        conn.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+                        conn.executemany(
+                            "INSERT INTO events (app_name, user_id, session_id, timestamp, data) VALUES (?, ?, ?, ?, ?)",
+                            [key + (timestamp, data) for timestamp, data in op[3]],
+                        )
+                    elif kind == "delete":
+                        conn.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+                        conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+            self.flushes += 1
+            self.written_ops += len(ops)
+        except sqlite3.Error as e:
+            self.write_errors += 1
+            print(f"Session store write failed ({len(ops)} operations dropped): {e}")
+
+    def _compact(self, conn):
+        """Purge sessions that have been idle for longer than the retention period."""
+        self._last_compaction = time.time()
+        if not self.retention_seconds:
+            return
+        cutoff = time.time() - self.retention_seconds
+        try:
+            with conn:
+                conn.execute(
+                    "DELETE FROM events WHERE (app_name, user_id, session_id) IN "
+                    "(SELECT app_name, user_id, session_id FROM sessions WHERE update_time < ?)",
+                    (cutoff,),
+                )
+                purged = conn.execute("DELETE FROM sessions WHERE update_time < ?", (cutoff,)).rowcount
+            self.purged_sessions += purged
+            if purged:
+                print(f"Session store purged {purged} expired sessions")
+        except sqlite3.Error as e:
+            print(f"Session store compaction failed: {e}")
+
+    def close(self):
+        """Commit pending writes and stop the writer thread."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        with self._read_lock:
+            self._read_conn.close()
+
+    def stats(self):
+        return {
+            "backend": "sqlite",
+            "cached_sessions": len(self._cache),
+            "pending_writes": len(self._queue),
+            "loads": self.loads,
+            "reloads": self.reloads,
+            "flushes": self.flushes,
+            "written_ops": self.written_ops,
+            "write_errors": self.write_errors,
+            "trimmed_events": self.trimmed_events,
+            "purged_sessions": self.purged_sessions,
+        }
+
+
+class MemorySessionService(InMemorySessionService):
+    """InMemorySessionService that also supports replace_events(), for history compaction."""
+
+    def replace_events(self, session: Session, events: list) -> None:
+        stored = self.sessions.get(session.app_name, {}).get(session.user_id, {}).get(session.id)
+        if stored is None:
+            return
+        stored.events = list(events)
+        session.events = list(events)
@@ -0,0 +1,59 @@
+import asyncio
+
+
+class _Call:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent requests into one upstream execution.
+
+    The first caller for a key starts factory() as its own task; callers arriving
+    while it runs await the same task. Each caller awaits it through a shield, so a
+    caller that is cancelled (e.g. its client disconnected) only stops waiting. The
+    task itself is cancelled once no caller is waiting for it any more.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> _Call
+        self.executions = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    async def do(self, key, factory):
+        """Return (result, shared): shared is True when another request's execution was reused."""
+        call = self._calls.get(key)
+        shared = call is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            call = self._calls[key] = _Call(asyncio.ensure_future(factory()))
+            call.task.add_done_callback(lambda task: self._finished(key, call))
+            self.executions += 1
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self.cancelled += 1
+                self._calls.pop(key, None)
+                call.task.cancel()
+
+    def _finished(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Nobody may be left to see the exception; don't let asyncio log it as unretrieved
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def stats(self):
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+            "in_flight": len(self._calls),
+        }
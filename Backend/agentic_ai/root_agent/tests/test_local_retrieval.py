@@ -0,0 +1,81 @@
+import asyncio
+import json
+import threading
+
+import numpy as np
+
+from lexical_index import LexicalIndex
+from local_retrieval import LocalRagRetrieval, LocalVectorIndex
+
+CHUNKS = [
+    {"id": "g7#0", "text": "Green plants make their food by photosynthesis.", "source": "g7.pdf", "grade": "7",
+     "subject": "science"},
+    {"id": "g7#1", "text": "The stomata let carbon dioxide into the leaf.", "source": "g7.pdf", "grade": "7",
+     "subject": "science"},
+    {"id": "g6#0", "text": "A fraction names a part of a whole.", "source": "g6.pdf", "grade": "6",
+     "subject": "mathematics"},
+]
+VECTORS = np.eye(3, dtype=np.float32)
+
+
+def write_index(path):
+    np.save(path / "embeddings.npy", VECTORS)
+    with open(path / "chunks.jsonl", "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(chunk) + "\n" for chunk in CHUNKS)
+    manifest = {"embedding_model": "text-embedding-004", "dimension": 3, "rows": 3, "version": "test",
+                "shards": {"7/science": [0, 2], "6/mathematics": [2, 3]}}
+    (path / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+
+
+def retriever(path, monkeypatch, hybrid=False):
+    """A LocalRagRetrieval whose embedder returns the query vector and which records search threads."""
+    write_index(path)
+    tool = LocalRagRetrieval(name="retrieve_local", description="test", index_path=str(path), similarity_top_k=2,
+                             vector_distance_threshold=0.5, hybrid=hybrid)
+    threads = []
+    search = LocalVectorIndex.search
+
+    def recording_search(self, *args, **kwargs):
+        threads.append(threading.current_thread())
+        return search(self, *args, **kwargs)
+
+    monkeypatch.setattr(LocalVectorIndex, "search", recording_search)
+    return tool, threads
+
+
+async def run(tool, query, vector, wanted):
+    await asyncio.to_thread(tool._load_index)
+
+    async def embed_one(text, task_type="RETRIEVAL_QUERY"):
+        return vector
+
+    tool._embedder.embed_one = embed_one
+    return await tool.retrieve(query, wanted), threading.current_thread()
+
+
+def test_search_and_shard_fallback_run_off_the_event_loop(tmp_path, monkeypatch):
+    tool, threads = retriever(tmp_path, monkeypatch)
+    # The grade 7 shard has nothing close to this vector, so the whole corpus is searched too
+    hits, loop_thread = asyncio.run(run(tool, "what is a fraction", VECTORS[2], {"grade": "7", "subject": "science"}))
+    assert [hit["id"] for hit in hits] == ["g6#0"]
+    assert tool.shard_fallbacks == 1
+    assert len(threads) == 2
+    assert loop_thread not in threads
+
+
+def test_hybrid_search_and_lexical_rescoring_run_off_the_event_loop(tmp_path, monkeypatch):
+    tool, threads = retriever(tmp_path, monkeypatch, hybrid=True)
+    lexical_threads = []
+    lexical_search = LexicalIndex.search
+
+    def recording_lexical_search(self, *args, **kwargs):
+        lexical_threads.append(threading.current_thread())
+        return lexical_search(self, *args, **kwargs)
+
+    monkeypatch.setattr(LexicalIndex, "search", recording_lexical_search)
+    # Close to the photosynthesis chunk; "stomata" is only found lexically and gets its cosine score
+    hits, loop_thread = asyncio.run(run(tool, "photosynthesis stomata", VECTORS[0], {"grade": "7", "subject": "science"}))
+    assert {hit["id"] for hit in hits} == {"g7#0", "g7#1"}
+    assert tool.lexical_only_results == 1
+    assert next(hit for hit in hits if hit["id"] == "g7#1")["score"] == 0.0
+    assert lexical_threads and loop_thread not in threads + lexical_threads
@@ -0,0 +1,40 @@
+from markdown_segmenter import mask_inline, reassemble, segment_markdown, skip_translated, unmask_inline
+
+HINDI_ANSWER = (
+    "## **प्रकाश संश्लेषण (Photosynthesis)**\n"
+    "\n"
+    "**(Photosynthesis)** वह प्रक्रिया है जिसमें हरे पौधे सूर्य के प्रकाश से भोजन बनाते हैं। "
+    "इसमें **DNA** नहीं, बल्कि **क्लोरोफिल** की भूमिका होती है।\n"
+    "\n"
+    "| शब्द | अर्थ |\n"
+    "|------|------|\n"
+    "| **DNA** | आनुवंशिक पदार्थ |\n"
+    "\n"
+    "This paragraph was left in English by the model.\n"
+)
+
+
+def test_segments_join_back_to_the_original():
+    pieces = segment_markdown(HINDI_ANSWER)
+    assert "".join(text for text, _ in pieces) == HINDI_ANSWER
+
+
+def test_inline_markup_stays_inside_the_sentence():
+    pieces = segment_markdown("**Photosynthesis** is how *green plants* make food. See [NCERT](https://ncert.nic.in).\n")
+    translatable = [text for text, translatable in pieces if translatable]
+    assert translatable == ["**Photosynthesis** is how *green plants* make food. See [NCERT](https://ncert.nic.in)."]
+
+
+def test_placeholders_round_trip_through_a_translation():
+    masked, spans = mask_inline("**DNA** is the *genetic* material.")
+    assert masked == "{{0}}DNA{{1}} is the {{2}}genetic{{3}} material."
+    assert unmask_inline("{{0}} डीएनए {{1}} {{2}}आनुवंशिक{{3}} पदार्थ है।", spans) == "**डीएनए** *आनुवंशिक* पदार्थ है।"
+    assert unmask_inline("डीएनए आनुवंशिक पदार्थ है।", spans) is None
+
+
+def test_mixed_script_answer_only_sends_english_paragraphs():
+    pieces = skip_translated(segment_markdown(HINDI_ANSWER), "hi")
+    translatable = [text for text, translatable in pieces if translatable]
+    # Bold English terms inside Hindi headings, sentences and tables are not sent on their own
+    assert translatable == ["This paragraph was left in English by the model."]
+    assert reassemble(pieces, ["यह अनुच्छेद"]).endswith("यह अनुच्छेद\n")
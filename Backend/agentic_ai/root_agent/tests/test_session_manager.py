@@ -0,0 +1,74 @@
+import asyncio
+
+from google.adk.agents import Agent
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from session_manager import APP_NAME, SessionManager
+
+
+def manager(**kwargs):
+    return SessionManager(Agent(name="test_agent", model="gemini-2.5-flash"), **kwargs)
+
+
+async def save_image(sessions, user_id, session_id, filename):
+    image = types.Part.from_bytes(data=b"\x89PNG", mime_type="image/png")
+    await sessions.artifact_service.save_artifact(
+        app_name=APP_NAME, user_id=user_id, session_id=session_id, filename=filename, artifact=image
+    )
+
+
+def test_evicted_and_discarded_sessions_lose_their_artifacts():
+    async def scenario():
+        sessions = manager(max_sessions=1)
+        await sessions.get_or_create_runner("u1", "s1")
+        await save_image(sessions, "u1", "s1", "diagram.png")
+        await save_image(sessions, "u1", "s1", "user:avatar.png")
+        await sessions.get_or_create_runner("u1", "s2")  # evicts s1
+        await save_image(sessions, "u1", "s2", "diagram.png")
+        await sessions.discard_session("u1", "s2")
+        return sessions.artifact_service.artifacts
+
+    artifacts = asyncio.run(scenario())
+    # Only the user-scoped artifact, shared by all of the user's sessions, is left
+    assert list(artifacts) == [f"{APP_NAME}/u1/user/user:avatar.png"]
+
+
+class SlowLookups:
+    """Wraps a session service so get_session waits until released."""
+
+    def __init__(self, service):
+        self.service = service
+        self.release = asyncio.Event()
+        self.creates = 0
+
+    async def get_session(self, **kwargs):
+        await self.release.wait()
+        return await self.service.get_session(**kwargs)
+
+    async def create_session(self, **kwargs):
+        self.creates += 1
+        return await self.service.create_session(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.service, name)
+
+
+def test_slow_session_lookup_does_not_block_other_sessions():
+    async def scenario():
+        service = SlowLookups(InMemorySessionService())
+        sessions = manager(session_service=service)
+        sessions.sessions[("u1", "live")] = 0.0
+        sessions.user_session_counts["u1"] = 1
+        opening = [asyncio.ensure_future(sessions.get_or_create_runner("u2", "new")) for _ in range(3)]
+        await asyncio.sleep(0)
+        # A live session is served while the new one is still being looked up
+        await asyncio.wait_for(sessions.get_or_create_runner("u1", "live"), timeout=1)
+        service.release.set()
+        await asyncio.gather(*opening)
+        return sessions, service
+
+    sessions, service = asyncio.run(scenario())
+    assert service.creates == 1
+    assert sessions.created == 1
+    assert sessions.user_session_counts == {"u1": 1, "u2": 1}
@@ -0,0 +1,31 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from translation_dispatcher import TranslationDispatcher
+
+
+def translate_batch(texts, source, target):
+    if "slow" in texts:
+        time.sleep(0.3)
+    return [f"{target}:{text}" for text in texts]
+
+
+def test_timeout_starts_with_the_upstream_call_not_the_queue():
+    async def scenario():
+        dispatcher = TranslationDispatcher(translate_batch, ThreadPoolExecutor(max_workers=1), window_seconds=0.001,
+                                           timeout_seconds=0.2)
+        slow = asyncio.ensure_future(dispatcher.translate("slow", "en", "hi"))
+        await asyncio.sleep(0.01)
+        # Queued behind the slow batch for longer than the timeout, but its own call is quick
+        queued = await dispatcher.translate("quick", "en", "ta")
+        with pytest.raises(asyncio.TimeoutError):
+            await slow
+        return dispatcher, queued
+
+    dispatcher, queued = asyncio.run(scenario())
+    assert queued == "ta:quick"
+    assert dispatcher.stats()["timed_out"] == 1
+    assert dispatcher.stats()["in_flight"] == 0
@@ -0,0 +1,35 @@
+from google.cloud.aiplatform_v1beta1.types import RagContexts
+
+from vertex_retrieval import chunk_record
+
+
+def context(score, distance=0.0):
+    return RagContexts.Context(
+        source_uri="gs://textbooks/ncert/grade_7_science.pdf",
+        source_display_name="grade_7_science.pdf",
+        text="Green plants make their food by photosynthesis.",
+        score=score,
+        distance=distance,
+    )
+
+
+def test_cosine_distance_score_becomes_a_similarity():
+    # Under COSINE_DISTANCE, Vertex reports the distance in both score and the deprecated distance
+    record = chunk_record(context(0.15, 0.15), "COSINE_DISTANCE")
+    assert record["score"] == 0.85
+    assert record["source"] == "grade_7_science.pdf"
+    assert record["id"].startswith("grade_7_science.pdf#")
+
+
+def test_closer_chunks_score_higher_under_a_distance_metric():
+    near = chunk_record(context(0.1), "COSINE_DISTANCE")
+    far = chunk_record(context(0.5), "COSINE_DISTANCE")
+    assert near["score"] > far["score"]
+
+
+def test_exact_match_distance_of_zero():
+    assert chunk_record(context(0.0), "COSINE_DISTANCE")["score"] == 1.0
+
+
+def test_similarity_metric_score_is_used_as_is():
+    assert chunk_record(context(0.8), "DOT_PRODUCT")["score"] == 0.8
@@ -36,11 +36,10 @@ async def generate_images(imagen_prompt: str, tool_context: ToolContext):
                 report_artifact = types.Part.from_bytes(
                     data=image_bytes, mime_type="image/png"
                 )
+                artifact_version = None
                 try:
-                    tool_context.save_artifact(artifact=report_artifact, filename=artifact_name)
-                    artifact_list = tool_context.list_artifacts()
-                    print("Artifacts in context:", artifact_list)
-                    print(f"Image also saved as ADK artifact: {artifact_name}")
+                    artifact_version = await tool_context.save_artifact(filename=artifact_name, artifact=report_artifact)
+                    print(f"Image also saved as ADK artifact: {artifact_name} (version {artifact_version})")
                 except Exception as e:
                     print(f"error occured in saving artifacts:", e)
 
@@ -48,6 +47,7 @@ async def generate_images(imagen_prompt: str, tool_context: ToolContext):
                     "status": "success",
                     "message": f"Image generated .  ADK artifact: {artifact_name}.",
                     "artifact_name": artifact_name,
+                    "artifact_version": artifact_version,
                 }
         else:
             # model_dump_json might not exist or be the best way to get error details
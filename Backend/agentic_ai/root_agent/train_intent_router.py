@@ -0,0 +1,85 @@
+"""
+Train the intent router's TF-IDF + logistic regression model offline.
+
+Reads labelled examples ({"text": ..., "route": ...} per line), fits a
+multinomial logistic regression with NumPy and writes the JSON model loaded
+by intent_router.IntentModel. Prints k-fold cross-validation accuracy and
+how many held-out examples clear the routing threshold.
+
+Usage (from root_agent/):
+    python train_intent_router.py [examples.jsonl] [output.json]
+"""
+import json
+import sys
+
+import numpy as np
+
+import config
+from intent_router import IntentModel, ngrams, tfidf_matrix, tokenize
+
+
+def load_examples(path):
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                example = json.loads(line)
+                texts.append(example["text"].lower())
+                labels.append(example["route"])
+    return texts, labels
+
+
+def fit(texts, labels, max_n=2, l2=1e-3, learning_rate=2.0, epochs=600):
+    classes = sorted(set(labels))
+    document_frequency = {}
+    for text in texts:
+        for term in set(ngrams(tokenize(text), max_n)):
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+    terms = sorted(document_frequency)
+    vocabulary = {term: i for i, term in enumerate(terms)}
+    n = len(texts)
+    idf = np.array([np.log((1 + n) / (1 + document_frequency[term])) + 1 for term in terms], dtype=np.float32)
+
+    features = tfidf_matrix(texts, vocabulary, idf, max_n)
+    targets = np.zeros((n, len(classes)), dtype=np.float32)
+    targets[np.arange(n), [classes.index(label) for label in labels]] = 1.0
+    coef = np.zeros((len(classes), len(terms)), dtype=np.float32)
+    intercept = np.zeros(len(classes), dtype=np.float32)
+    for _ in range(epochs):
+        logits = features @ coef.T + intercept
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        error = (probabilities - targets) / n
+        coef -= learning_rate * (error.T @ features + l2 * coef)
+        intercept -= learning_rate * error.sum(axis=0)
+    return IntentModel(classes, terms, idf, coef, intercept, max_n)
+
+
+def cross_validate(texts, labels, folds=5, threshold=0.8):
+    order = np.random.default_rng(0).permutation(len(texts))
+    correct = confident = confident_correct = 0
+    for fold in range(folds):
+        held_out = set(order[fold::folds].tolist())
+        model = fit([t for i, t in enumerate(texts) if i not in held_out],
+                    [l for i, l in enumerate(labels) if i not in held_out])
+        for i in held_out:
+            route, confidence = model.predict(texts[i])
+            correct += route == labels[i]
+            if confidence >= threshold:
+                confident += 1
+                confident_correct += route == labels[i]
+    print(f"{folds}-fold accuracy: {correct / len(texts):.2%}; "
+          f"{confident}/{len(texts)} held-out examples above threshold {threshold}, "
+          f"{confident_correct / max(confident, 1):.2%} of those correct")
+
+
+if __name__ == "__main__":
+    examples_path = sys.argv[1] if len(sys.argv) > 1 else "intent_examples.jsonl"
+    output_path = sys.argv[2] if len(sys.argv) > 2 else config.INTENT_ROUTER_MODEL_PATH
+    texts, labels = load_examples(examples_path)
+    cross_validate(texts, labels, threshold=config.INTENT_ROUTER_THRESHOLD)
+    model = fit(texts, labels)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(model.to_json(), f, ensure_ascii=False)
+    print(f"Wrote {output_path}: {len(model.classes)} routes, {len(model.vocabulary)} terms from {len(texts)} examples")
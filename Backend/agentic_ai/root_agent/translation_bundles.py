@@ -0,0 +1,206 @@
+"""
+Precompiled UI translation bundles.
+
+Each bundle is a per-language catalog of ENGLISH_UI_STRINGS, seeded from the
+hand-checked FALLBACK_TRANSLATIONS and completed with machine translation.
+Bundles are written to disk as JSON, loaded and gzip-compressed once at startup
+and served with an ETag so the UI never waits on per-key upstream calls.
+
+The bundles checked in under translation_bundles/ are only read at runtime.
+Bundles rebuilt by the server (stale refresh, ?no_cache=true) are written to
+TRANSLATION_BUNDLE_CACHE_DIR under DATA_DIR and take precedence when loaded.
+
+Build step (run from root_agent/):
+    python translation_bundles.py                # all supported languages
+    python translation_bundles.py hi kn ta       # selected languages
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+
+import config
+from ui_translations import ENGLISH_UI_STRINGS, FALLBACK_TRANSLATIONS, SUPPORTED_LANGUAGES
+
+
+def source_hash():
+    """Fingerprint of the English key set; a bundle built from other strings is stale."""
+    payload = json.dumps(ENGLISH_UI_STRINGS, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def seed_catalog(language_code):
+    """Return (catalog, missing_keys): seeded translations and the keys still to translate."""
+    if language_code == "en":
+        return dict(ENGLISH_UI_STRINGS), []
+    seeds = FALLBACK_TRANSLATIONS.get(language_code, {})
+    catalog = {key: seeds[key] for key in ENGLISH_UI_STRINGS if key in seeds}
+    missing_keys = [key for key in ENGLISH_UI_STRINGS if key not in catalog]
+    return catalog, missing_keys
+
+
+def merge_seeds(language_code, translations):
+    """Machine translations with the hand-checked seed entries laid over them."""
+    seeds, _ = seed_catalog(language_code)
+    return {**translations, **seeds}
+
+
+def make_bundle(language_code, catalog):
+    # Keys that could not be translated fall back to English; the bundle is then
+    # marked incomplete so the next refresh retries them
+    translations = {key: catalog.get(key) or text for key, text in ENGLISH_UI_STRINGS.items()}
+    return {
+        "language": language_code,
+        "source_hash": source_hash(),
+        "complete": all(catalog.get(key) for key in ENGLISH_UI_STRINGS),
+        "built_at": time.time(),
+        "translations": translations,
+    }
+
+
+def write_bundle(bundle, bundle_dir=None):
+    bundle_dir = bundle_dir or config.TRANSLATION_BUNDLE_DIR
+    os.makedirs(bundle_dir, exist_ok=True)
+    path = os.path.join(bundle_dir, f"{bundle['language']}.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(bundle, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+class CompiledBundle:
+    """A bundle ready to serve: response body, gzip body and ETag are computed once."""
+
+    def __init__(self, bundle):
+        self.language = bundle["language"]
+        self.source_hash = bundle.get("source_hash")
+        self.complete = bundle.get("complete", True)
+        self.translations = bundle["translations"]
+        self.body = json.dumps({"translations": self.translations}, ensure_ascii=False).encode("utf-8")
+        self.gzip_body = gzip.compress(self.body, mtime=0)
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+
+    @property
+    def is_stale(self):
+        return not self.complete or self.source_hash != source_hash()
+
+
+class BundleStore:
+    def __init__(self, bundle_dir=None, cache_dir=None):
+        self.bundle_dir = bundle_dir or config.TRANSLATION_BUNDLE_DIR  # read-only, checked in
+        self.cache_dir = cache_dir or config.TRANSLATION_BUNDLE_CACHE_DIR  # rebuilt bundles
+        self.bundles = {}  # language_code -> CompiledBundle
+        self.refreshing = False
+
+    def _load_dir(self, bundle_dir):
+        if not os.path.isdir(bundle_dir):
+            return
+        for filename in sorted(os.listdir(bundle_dir)):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(bundle_dir, filename), encoding="utf-8") as f:
+                    bundle = json.load(f)
+                compiled = CompiledBundle(bundle)
+            except Exception as e:
+                print(f"Skipping translation bundle {filename}: {e}")
+                continue
+            current = self.bundles.get(compiled.language)
+            # A rebuilt bundle only replaces the checked-in one while it matches the English key set
+            if current is None or not compiled.is_stale or current.is_stale:
+                self.bundles[compiled.language] = compiled
+
+    def load(self):
+        """Load the checked-in bundles, then rebuilt ones; the English bundle is always built in memory."""
+        self.bundles["en"] = CompiledBundle(make_bundle("en", dict(ENGLISH_UI_STRINGS)))
+        self._load_dir(self.bundle_dir)
+        self._load_dir(self.cache_dir)
+        print(f"Loaded translation bundles: {sorted(self.bundles)}")
+        return self
+
+    def get(self, language_code):
+        return self.bundles.get(language_code)
+
+    def put(self, bundle):
+        compiled = CompiledBundle(bundle)
+        self.bundles[compiled.language] = compiled
+        try:
+            write_bundle(bundle, self.cache_dir)
+        except Exception as e:
+            print(f"Could not write translation bundle for {compiled.language}: {e}")
+        return compiled
+
+    def stale_languages(self, languages=None):
+        """Languages whose bundle is missing, incomplete or built from an older English key set."""
+        languages = languages or SUPPORTED_LANGUAGES
+        return [
+            code for code in languages
+            if code != "en" and (code not in self.bundles or self.bundles[code].is_stale)
+        ]
+
+    async def refresh(self, translate_many, languages=None):
+        """
+        Rebuild stale bundles in the background.
+
+        translate_many(texts, source_language, target_language) is the async batch
+        translator used by the API, so already translated strings come from translation memory.
+        """
+        if self.refreshing:
+            return
+        self.refreshing = True
+        try:
+            for language_code in self.stale_languages(languages):
+                catalog, missing_keys = seed_catalog(language_code)
+                if missing_keys:
+                    texts = [ENGLISH_UI_STRINGS[key] for key in missing_keys]
+                    translated, failed_indices = await translate_many(texts, "en", language_code)
+                    failed_keys = {missing_keys[i] for i in failed_indices}
+                    catalog.update({key: text for key, text in zip(missing_keys, translated) if key not in failed_keys})
+                    if failed_keys:
+                        print(f"Translation bundle {language_code}: {len(failed_keys)} keys failed, will retry")
+                self.put(make_bundle(language_code, catalog))
+                print(f"Rebuilt translation bundle for {language_code}")
+        finally:
+            self.refreshing = False
+
+    def stats(self):
+        return {
+            "languages": sorted(self.bundles),
+            "stale": self.stale_languages(),
+            "refreshing": self.refreshing,
+        }
+
+
+def build_bundles(languages):
+    """Offline build step: translate each catalog with GoogleTranslator through translation memory."""
+    from deep_translator import GoogleTranslator
+    from translation_memory import TranslationMemory
+
+    memory = TranslationMemory(
+        config.TRANSLATION_CACHE_PATH,
+        memory_entries=config.TRANSLATION_CACHE_MEMORY_ENTRIES,
+        enabled=config.TRANSLATION_CACHE_ENABLED,
+    )
+    for language_code in languages:
+        catalog, missing_keys = seed_catalog(language_code)
+        translator = GoogleTranslator(source="en", target=language_code)
+        for key in missing_keys:
+            text = ENGLISH_UI_STRINGS[key]
+            try:
+                translated = memory.get("en", language_code, text)
+                if translated is None:
+                    translated = translator.translate(text)
+                    memory.put("en", language_code, text, translated)
+                catalog[key] = translated
+            except Exception as e:
+                print(f"{language_code}: could not translate {key}: {e}")
+        path = write_bundle(make_bundle(language_code, catalog))
+        print(f"{language_code}: {len(catalog)}/{len(ENGLISH_UI_STRINGS)} keys -> {path}")
+
+
+if __name__ == "__main__":
+    requested = sys.argv[1:] or [code for code in SUPPORTED_LANGUAGES if code != "en"]
+    build_bundles(requested)
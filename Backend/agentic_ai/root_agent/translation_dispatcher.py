@@ -0,0 +1,164 @@
+import asyncio
+
+
+def _consume_exception(future):
+    # Waiters may all have timed out; don't let asyncio log the exception as unretrieved
+    if not future.cancelled():
+        future.exception()
+
+
+class TranslationDispatcher:
+    """
+    Coalesces translation requests across concurrent API calls.
+
+    Identical in-flight (source, target, text) requests share one future, and
+    small requests for the same language pair that arrive within `window_seconds`
+    are merged into one upstream batch. translate_batch(texts, source, target) is a
+    blocking function run on `executor`; it returns one result per text, where a
+    result may be an Exception for items that failed, or None when the texts could
+    not be translated as one batch. The items are then translated with
+    translate_one(text, source, target), each on its own executor thread.
+
+    With timeout_seconds, a request fails with asyncio.TimeoutError when its upstream
+    call has not returned that long after it started on an executor thread; time spent
+    waiting in the batching window or queued behind other batches does not count.
+    """
+
+    def __init__(self, translate_batch, executor, window_seconds=0.015, max_batch_items=40, max_batch_chars=4500,
+                 translate_one=None, timeout_seconds=None):
+        self.translate_batch = translate_batch
+        self.translate_one = translate_one
+        self.executor = executor
+        self.timeout_seconds = timeout_seconds
+        self.window_seconds = window_seconds
+        self.max_batch_items = max_batch_items
+        self.max_batch_chars = max_batch_chars
+        self._inflight = {}  # (source, target, text) -> Future
+        self._pending = {}  # (source, target) -> [(text, Future)]
+        self._pending_chars = {}  # (source, target) -> total characters queued
+        self._flush_handles = {}  # (source, target) -> TimerHandle
+        self._timeouts = {}  # Future -> TimerHandle of its upstream call's timeout
+        self.requests = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.batch_fallbacks = 0
+        self.timed_out = 0
+
+    async def translate(self, text, source_language, target_language):
+        self.requests += 1
+        key = (source_language, target_language, text)
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        future.add_done_callback(_consume_exception)
+        self._inflight[key] = future
+
+        pair = (source_language, target_language)
+        self._pending.setdefault(pair, []).append((text, future))
+        self._pending_chars[pair] = self._pending_chars.get(pair, 0) + len(text)
+        if (len(self._pending[pair]) >= self.max_batch_items
+                or self._pending_chars[pair] >= self.max_batch_chars):
+            self._flush(pair)
+        elif pair not in self._flush_handles:
+            self._flush_handles[pair] = loop.call_later(self.window_seconds, self._flush, pair)
+        # Shielded so a caller timing out does not cancel the result for everyone else
+        return await asyncio.shield(future)
+
+    def _flush(self, pair):
+        handle = self._flush_handles.pop(pair, None)
+        if handle is not None:
+            handle.cancel()
+        batch = self._pending.pop(pair, [])
+        self._pending_chars.pop(pair, None)
+        if batch:
+            asyncio.ensure_future(self._run_batch(pair, batch))
+
+    async def _run_batch(self, pair, batch):
+        source_language, target_language = pair
+        texts = [text for text, _ in batch]
+        self.batches += 1
+        self.batched_items += len(texts)
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                self.executor, self._upstream, loop, pair, batch, self.translate_batch, texts, source_language,
+                target_language,
+            )
+        except Exception as e:
+            results = [e] * len(texts)
+        if results is None and self.translate_one is not None:
+            # Fan the items out across the pool; each waiter gets its result as soon as it is ready
+            self.batch_fallbacks += 1
+            await asyncio.gather(*(self._run_one(pair, text, future) for text, future in batch))
+            return
+        if results is None:
+            results = [RuntimeError("batch translation failed")] * len(texts)
+        for (text, future), result in zip(batch, results):
+            self._settle(pair, text, future, result)
+
+    async def _run_one(self, pair, text, future):
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self.executor, self._upstream, loop, pair, [(text, future)], self.translate_one, text, *pair
+            )
+        except Exception as e:
+            result = e
+        self._settle(pair, text, future, result)
+
+    def _upstream(self, loop, pair, items, function, *args):
+        """Runs on an executor thread: starts the timeouts of the waiting items, then makes the call."""
+        if self.timeout_seconds is not None:
+            loop.call_soon_threadsafe(self._start_timeouts, pair, items)
+        return function(*args)
+
+    def _start_timeouts(self, pair, items):
+        loop = asyncio.get_running_loop()
+        for text, future in items:
+            if future.done():
+                continue
+            # A batch that fell back to per-item calls restarts the clock for each item
+            previous = self._timeouts.pop(future, None)
+            if previous is not None:
+                previous.cancel()
+            self._timeouts[future] = loop.call_later(self.timeout_seconds, self._time_out, pair, text, future)
+
+    def _time_out(self, pair, text, future):
+        self._timeouts.pop(future, None)
+        # Later requests for the same text start a fresh call instead of joining the late one
+        if self._inflight.get((pair[0], pair[1], text)) is future:
+            del self._inflight[(pair[0], pair[1], text)]
+        if not future.done():
+            self.timed_out += 1
+            future.set_exception(asyncio.TimeoutError())
+
+    def _settle(self, pair, text, future, result):
+        timeout = self._timeouts.pop(future, None)
+        if timeout is not None:
+            timeout.cancel()
+        if self._inflight.get((pair[0], pair[1], text)) is future:
+            del self._inflight[(pair[0], pair[1], text)]
+        if future.done():
+            return
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "batched_items": self.batched_items,
+            "batch_fallbacks": self.batch_fallbacks,
+            "timed_out": self.timed_out,
+            "in_flight": len(self._inflight),
+            # Caller requests per upstream batch; 1.0 means no coalescing happened
+            "coalescing_ratio": round(self.requests / self.batches, 3) if self.batches else 0.0,
+        }
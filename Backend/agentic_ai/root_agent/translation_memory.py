@@ -0,0 +1,81 @@
+import hashlib
+import unicodedata
+
+from cache_store import LRUCache, SqliteKVStore
+
+
+class TranslationMemory:
+    """
+    Two-tier translation memory: an in-process LRU in front of a SQLite store.
+
+    Entries are keyed by (source language, target language, normalized text), so
+    the same UI string is only ever sent to the upstream translator once.
+    """
+
+    def __init__(self, path, memory_entries=5000, enabled=True):
+        self.enabled = enabled
+        self.memory = LRUCache(max_entries=memory_entries)
+        self.store = None
+        if enabled:
+            try:
+                self.store = SqliteKVStore(path, table="translations")
+            except Exception as e:
+                print(f"Translation memory: persistent store unavailable ({e}), using memory only")
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    @staticmethod
+    def normalize(text):
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    def key(self, source_language, target_language, text):
+        digest = hashlib.sha1(self.normalize(text).encode("utf-8")).hexdigest()
+        return f"{source_language}:{target_language}:{digest}"
+
+    def get(self, source_language, target_language, text):
+        if not self.enabled:
+            return None
+        key = self.key(source_language, target_language, text)
+        translated = self.memory.get(key)
+        if translated is not None:
+            self.memory_hits += 1
+            return translated
+        if self.store is not None:
+            try:
+                translated = self.store.get(key)
+            except Exception as e:
+                print(f"Translation memory read error: {e}")
+                translated = None
+            if translated is not None:
+                self.disk_hits += 1
+                self.memory.set(key, translated)
+                return translated
+        self.misses += 1
+        return None
+
+    def put(self, source_language, target_language, text, translated):
+        if not self.enabled or not translated:
+            return
+        key = self.key(source_language, target_language, text)
+        self.memory.set(key, translated)
+        if self.store is not None:
+            try:
+                self.store.set(key, translated)
+            except Exception as e:
+                print(f"Translation memory write error: {e}")
+        self.writes += 1
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_evictions": self.memory.evictions,
+        }
@@ -0,0 +1,173 @@
+"""UI string catalog shared by the translation endpoints and the bundle build step."""
+
+# Languages the frontend can switch to (code -> display name)
+SUPPORTED_LANGUAGES = {
+    'en': 'English', 'hi': 'Hindi', 'kn': 'Kannada', 'te': 'Telugu', 
+    'ta': 'Tamil', 'ml': 'Malayalam', 'bn': 'Bengali', 'gu': 'Gujarati',
+    'mr': 'Marathi', 'pa': 'Punjabi', 'or': 'Odia', 'as': 'Assamese',
+    'fr': 'French', 'de': 'German', 'es': 'Spanish', 'pt': 'Portuguese',
+    'ja': 'Japanese', 'ko': 'Korean', 'ar': 'Arabic', 'ru': 'Russian', 'zh': 'Chinese'
+}
+
+# Base English UI strings (UI keys)
+ENGLISH_UI_STRINGS = {
+    # Navigation
+    "dashboard": "Dashboard",
+    "learning_concepts": "Learning Concepts",
+    "prepare_lessons": "Prepare Lessons",
+    "create_curriculum": "Create Curriculum",
+    "ai_assistant": "AI Assistant",
+
+    # Common UI
+    "welcome": "Welcome",
+    "loading": "Loading...",
+    "save": "Save",
+    "cancel": "Cancel",
+    "submit": "Submit",
+    "close": "Close",
+    "next": "Next",
+    "previous": "Previous",
+    "search": "Search",
+    "filter": "Filter",
+
+    # Dashboard
+    "quick_actions": "Quick Actions",
+    "recent_activities": "Recent Activities",
+    "teaching_stats": "Teaching Statistics",
+    "grade_level": "Grade Level",
+    "curriculum_type": "Curriculum Type",
+
+    # Learning Concepts
+    "explain_concept": "Explain Concept",
+    "select_topic": "Select Topic",
+    "grade_optional": "Grade (Optional)",
+    "not_selected": "Not Selected",
+    "send_message": "Send Message",
+
+    # Prepare Lessons
+    "generate_materials": "Generate Materials",
+    "study_material": "Study Material",
+    "assessment_questions": "Assessment Questions",
+    "generated_diagram": "Generated Diagram",
+    "select_subject": "Select Subject",
+    "select_grade": "Select Grade",
+
+    # AI Assistant
+    "teaching_assistant": "Teaching Assistant",
+    "ask_question": "Ask a question...",
+    "mentor_guidance": "Mentor Guidance",
+
+    # Messages
+    "welcome_message": "Welcome to Sahayak, your AI teaching assistant!",
+    "how_can_i_help": "How can I help you with your teaching today?",
+    "processing": "Processing your request...",
+    "error_message": "An error occurred. Please try again.",
+
+    # User Profile
+    "profile": "Profile",
+    "settings": "Settings",
+    "logout": "Logout",
+    "teaching_grades": "Teaching Grades",
+    "school_name": "School Name",
+    "district": "District",
+    "state": "State"
+}
+
+# Hand-checked translations for common UI elements, used as seeds for the
+# translation bundles and as the fallback when no translator is available
+FALLBACK_TRANSLATIONS = {
+    'hi': {
+        'dashboard': 'डैशबोर्ड',
+        'learning_concepts': 'अवधारणाएं सीखें',
+        'prepare_lessons': 'पाठ तैयार करें',
+        'create_curriculum': 'पाठ्यक्रम बनाएं',
+        'ai_assistant': 'एआई सहायक',
+        'welcome': 'स्वागत है',
+        'loading': 'लोड हो रहा है...',
+        'save': 'सहेजें',
+        'cancel': 'रद्द करें',
+        'submit': 'सबमिट करें',
+        'close': 'बंद करें',
+        'next': 'अगला',
+        'previous': 'पिछला',
+        'search': 'खोजें',
+        'filter': 'फ़िल्टर',
+        'quick_actions': 'त्वरित कार्य',
+        'recent_activities': 'हाल की गतिविधियां',
+        'teaching_stats': 'शिक्षण आंकड़े',
+        'grade_level': 'कक्षा स्तर',
+        'curriculum_type': 'पाठ्यक्रम प्रकार',
+        'explain_concept': 'अवधारणा समझाएं',
+        'select_topic': 'विषय चुनें',
+        'grade_optional': 'कक्षा (वैकल्पिक)',
+        'not_selected': 'चयनित नहीं',
+        'send_message': 'संदेश भेजें',
+        'generate_materials': 'सामग्री उत्पन्न करें',
+        'study_material': 'अध्ययन सामग्री',
+        'assessment_questions': 'मूल्यांकन प्रश्न',
+        'generated_diagram': 'उत्पन्न आरेख',
+        'select_subject': 'विषय चुनें',
+        'select_grade': 'कक्षा चुनें',
+        'teaching_assistant': 'शिक्षण सहायक',
+        'ask_question': 'प्रश्न पूछें...',
+        'mentor_guidance': 'मार्गदर्शन',
+        'welcome_message': 'सहायक में आपका स्वागत है, आपका एआई शिक्षण सहायक!',
+        'how_can_i_help': 'मैं आपकी शिक्षण में कैसे मदद कर सकता हूं?',
+        'processing': 'आपका अनुरोध संसाधित हो रहा है...',
+        'error_message': 'एक त्रुटि हुई। कृपया पुनः प्रयास करें।',
+        'profile': 'प्रोफ़ाइल',
+        'settings': 'सेटिंग्स',
+        'logout': 'लॉगआउट',
+        'teaching_grades': 'शिक्षण कक्षाएं',
+        'school_name': 'स्कूल का नाम',
+        'district': 'जिला',
+        'state': 'राज्य'
+    },
+    'kn': {
+        'dashboard': 'ಡ್ಯಾಶ್‌ಬೋರ್ಡ್',
+        'learning_concepts': 'ಕಲಿಕೆಯ ಪರಿಕಲ್ಪನೆಗಳು',
+        'prepare_lessons': 'ಪಾಠಗಳನ್ನು ತಯಾರಿಸಿ',
+        'create_curriculum': 'ಪಾಠ್ಯಕ್ರಮ ರಚಿಸಿ',
+        'ai_assistant': 'ಎಐ ಸಹಾಯಕ',
+        'welcome': 'ಸುಸ್ವಾಗತ',
+        'loading': 'ಲೋಡ್ ಆಗುತ್ತಿದೆ...',
+        'save': 'ಉಳಿಸಿ',
+        'cancel': 'ರದ್ದುಮಾಡಿ',
+        'submit': 'ಸಲ್ಲಿಸಿ',
+        'close': 'ಮುಚ್ಚಿ',
+        'next': 'ಮುಂದೆ',
+        'previous': 'ಹಿಂದೆ',
+        'search': 'ಹುಡುಕಿ',
+        'filter': 'ಫಿಲ್ಟರ್',
+        'quick_actions': 'ತ್ವರಿತ ಕ್ರಿಯೆಗಳು',
+        'recent_activities': 'ಇತ್ತೀಚಿನ ಚಟುವಟಿಕೆಗಳು',
+        'teaching_stats': 'ಅಧ್ಯಾಪನ ಅಂಕಿಅಂಶಗಳು',
+        'grade_level': 'ತರಗತಿ ಮಟ್ಟ',
+        'curriculum_type': 'ಪಾಠ್ಯಕ್ರಮ ಪ್ರಕಾರ',
+        'explain_concept': 'ಪರಿಕಲ್ಪನೆಯನ್ನು ವಿವರಿಸಿ',
+        'select_topic': 'ವಿಷಯವನ್ನು ಆಯ್ಕೆಮಾಡಿ',
+        'grade_optional': 'ತರಗತಿ (ಐಚ್ಛಿಕ)',
+        'not_selected': 'ಆಯ್ಕೆಮಾಡಲಾಗಿಲ್ಲ',
+        'send_message': 'ಸಂದೇಶ ಕಳುಹಿಸಿ',
+        'generate_materials': 'ಸಾಮಗ್ರಿಗಳನ್ನು ರಚಿಸಿ',
+        'study_material': 'ಅಧ್ಯಯನ ಸಾಮಗ್ರಿ',
+        'assessment_questions': 'ಮೌಲ್ಯಮಾಪನ ಪ್ರಶ್ನೆಗಳು',
+        'generated_diagram': 'ರಚಿಸಲಾದ ರೇಖಾಚಿತ್ರ',
+        'select_subject': 'ವಿಷಯವನ್ನು ಆಯ್ಕೆಮಾಡಿ',
+        'select_grade': 'ತರಗತಿಯನ್ನು ಆಯ್ಕೆಮಾಡಿ',
+        'teaching_assistant': 'ಅಧ್ಯಾಪನ ಸಹಾಯಕ',
+        'ask_question': 'ಪ್ರಶ್ನೆಯನ್ನು ಕೇಳಿ...',
+        'mentor_guidance': 'ಮಾರ್ಗದರ್ಶನ',
+        'welcome_message': 'ಸಹಾಯಕಕ್ಕೆ ಸುಸ್ವಾಗತ, ನಿಮ್ಮ ಎಐ ಅಧ್ಯಾಪನ ಸಹಾಯಕ!',
+        'how_can_i_help': 'ನಿಮ್ಮ ಅಧ್ಯಾಪನದಲ್ಲಿ ನಾನು ಹೇಗೆ ಸಹಾಯ ಮಾಡಬಹುದು?',
+        'processing': 'ನಿಮ್ಮ ವಿನಂತಿಯನ್ನು ಸಂಸ್ಕರಿಸಲಾಗುತ್ತಿದೆ...',
+        'error_message': 'ದೋಷ ಸಂಭವಿಸಿದೆ. ದಯವಿಟ್ಟು ಮತ್ತೆ ಪ್ರಯತ್ನಿಸಿ.',
+        'profile': 'ಪ್ರೊಫೈಲ್',
+        'settings': 'ಸೆಟ್ಟಿಂಗ್‌ಗಳು',
+        'logout': 'ಲಾಗ್‌ಔಟ್',
+        'teaching_grades': 'ಅಧ್ಯಾಪನ ತರಗತಿಗಳು',
+        'school_name': 'ಶಾಲೆಯ ಹೆಸರು',
+        'district': 'ಜಿಲ್ಲೆ',
+        'state': 'ರಾಜ್ಯ'
+    }
+}
@@ -0,0 +1,205 @@
+"""
+Vertex AI RAG retrieval restricted to one shard of a corpus.
+
+The corpus's file list is read with rag.list_files and grouped by
+(grade, subject) using corpora.parse_book_name; the map is refreshed every
+refresh_seconds. Each search passes the file IDs of the shards matching the
+session's textbook filter and the query as rag_file_ids, so Vertex only scores
+those books. Without a grade or subject the whole corpus is searched, as before.
+
+The file list also gives the corpus version (a hash of file IDs and update
+times) that keys the retrieval cache, so adding or re-importing a book
+invalidates cached results at the next refresh.
+"""
+import asyncio
+import hashlib
+import time
+
+from google.adk.tools.retrieval.base_retrieval_tool import BaseRetrievalTool
+from google.adk.tools.retrieval.vertex_ai_rag_retrieval import VertexAiRagRetrieval
+from google.adk.utils.model_name_utils import is_gemini_2_model
+from google.genai import types
+from vertexai.preview import rag
+
+from corpora import RETRIEVERS, matching_shards, parse_book_name, resolve_filter, shard_key
+from metrics import LatencyStats
+
+# Metrics for which a context's score is a distance (lower is better) rather than a similarity
+DISTANCE_METRICS = {"COSINE_DISTANCE", "EUCLIDEAN_DISTANCE"}
+
+
+def last_user_text(llm_request):
+    """Text of the latest user message in an LLM request (function responses carry no text)."""
+    for content in reversed(llm_request.contents or []):
+        if content.role == "user" and content.parts:
+            text = "".join(part.text for part in content.parts if part.text)
+            if text:
+                return text
+    return ""
+
+
+def chunk_record(context, distance_metric="COSINE_DISTANCE"):
+    """
+    {"id", "text", "source", "score"} for one retrieved Vertex RAG context; score is a similarity.
+
+    distance_metric is the corpus's vector distance metric. Under a distance metric (the
+    RagManagedDb default is COSINE_DISTANCE) context.score holds the distance, like the
+    deprecated context.distance, and is converted to 1 - distance; otherwise it is used as is.
+    """
+    source = context.source_display_name or context.source_uri or ""
+    digest = hashlib.sha1((context.text or "").encode("utf-8")).hexdigest()[:12]
+    if distance_metric in DISTANCE_METRICS:
+        score = 1.0 - (context.score or context.distance or 0.0)
+    else:
+        score = context.score
+    return {"id": f"{source}#{digest}", "text": context.text, "source": source, "score": round(score, 4)}
+
+
+class ShardedVertexRagRetrieval(VertexAiRagRetrieval):
+    """
+    With builtin_retrieval and a Gemini 2 model, the model retrieves through the built-in
+    tool inside its own call; otherwise retrieval is a function call handled by run_async,
+    where results go through the retrieval cache and the context packer.
+    """
+
+    def __init__(self, *, name, description, rag_corpus, similarity_top_k=None, vector_distance_threshold=None,
+                 refresh_seconds=3600, cache=None, packer=None, builtin_retrieval=True,
+                 distance_metric="COSINE_DISTANCE"):
+        super().__init__(
+            name=name,
+            description=description,
+            rag_resources=[rag.RagResource(rag_corpus=rag_corpus)],
+            similarity_top_k=similarity_top_k,
+            vector_distance_threshold=vector_distance_threshold,
+        )
+        self.rag_corpus = rag_corpus
+        self.refresh_seconds = refresh_seconds
+        self.cache = cache
+        self.packer = packer
+        self.builtin_retrieval = builtin_retrieval
+        self.distance_metric = distance_metric
+        self._shards = None  # "<grade>/<subject>" -> [file id]
+        self._loaded_at = 0.0
+        self.version = None
+        self.latency = LatencyStats()
+        self.queries = 0
+        self.shard_searches = 0
+        self.shard_fallbacks = 0
+        self.list_errors = 0
+        RETRIEVERS.append(self)
+
+    def _list_files(self):
+        shards = {}
+        digest = hashlib.sha1()
+        for file in sorted(rag.list_files(corpus_name=self.rag_corpus), key=lambda file: file.name):
+            file_id = file.name.rsplit("/", 1)[-1]
+            digest.update(f"{file_id}:{file.update_time}\n".encode("utf-8"))
+            book = parse_book_name(file.display_name or "")
+            if book:
+                shards.setdefault(shard_key(book.grade, book.subject), []).append(file_id)
+        return shards, digest.hexdigest()[:16]
+
+    async def shards(self):
+        if self._shards is None or time.time() - self._loaded_at > self.refresh_seconds:
+            try:
+                self._shards, self.version = await asyncio.to_thread(self._list_files)
+                print(f"Loaded {len(self._shards)} textbook shards for {self.name} (version {self.version})")
+            except Exception as e:
+                # Keep the previous map (or search unfiltered) and retry after the next refresh interval
+                self.list_errors += 1
+                print(f"Could not list files of {self.rag_corpus}: {e}")
+                self._shards = self._shards or {}
+            self._loaded_at = time.time()
+        return self._shards
+
+    async def shard_keys(self, state, query):
+        """Keys of the shards to search for this query; empty for the whole corpus."""
+        shards = await self.shards()
+        wanted = resolve_filter(state, query, {key.partition("/")[2] for key in shards})
+        return matching_shards(shards, wanted)
+
+    def file_ids(self, keys):
+        return [file_id for key in keys for file_id in self._shards.get(key, [])] or None
+
+    def scoped_store(self, file_ids):
+        if not file_ids:
+            return self.vertex_rag_store
+        return self.vertex_rag_store.model_copy(update={
+            "rag_resources": [types.VertexRagStoreRagResource(rag_corpus=self.rag_corpus, rag_file_ids=file_ids)],
+        })
+
+    async def process_llm_request(self, *, tool_context, llm_request):
+        if not self.builtin_retrieval or not is_gemini_2_model(llm_request.model):
+            # Declare the retrieval function; calls come back through run_async
+            await BaseRetrievalTool.process_llm_request(self, tool_context=tool_context, llm_request=llm_request)
+            return
+        # Gemini 2 retrieves by itself through the built-in tool, so the shard is chosen up front
+        file_ids = self.file_ids(await self.shard_keys(tool_context.state, last_user_text(llm_request)))
+        self.queries += 1
+        if file_ids:
+            self.shard_searches += 1
+        llm_request.config = llm_request.config or types.GenerateContentConfig()
+        llm_request.config.tools = llm_request.config.tools or []
+        llm_request.config.tools.append(
+            types.Tool(retrieval=types.Retrieval(vertex_rag_store=self.scoped_store(file_ids)))
+        )
+
+    def _query(self, text, file_ids):
+        return rag.retrieval_query(
+            text=text,
+            rag_resources=[rag.RagResource(rag_corpus=self.rag_corpus, rag_file_ids=file_ids)],
+            similarity_top_k=self.vertex_rag_store.similarity_top_k,
+            vector_distance_threshold=self.vertex_rag_store.vector_distance_threshold,
+        )
+
+    async def retrieve(self, query, state=None):
+        """Return the matching chunk records for a query, best first, from the cache when possible."""
+        keys = await self.shard_keys(state, query)
+        cache_key = None
+        # Without a version (the file list couldn't be read yet) results can't be validated later
+        if self.cache is not None and self.version is not None:
+            cache_key = self.cache.key(
+                self.rag_corpus, self.version, query, self.vertex_rag_store.similarity_top_k,
+                self.vertex_rag_store.vector_distance_threshold,
+                scope={"shards": sorted(keys), "metric": self.distance_metric},
+            )
+            cached = self.cache.get(self.name, cache_key)
+            if cached is not None:
+                return cached
+        started = time.perf_counter()
+        self.queries += 1
+        file_ids = self.file_ids(keys)
+        response = await asyncio.to_thread(self._query, query, file_ids)
+        if file_ids:
+            self.shard_searches += 1
+            if not response.contexts.contexts:
+                # Nothing close enough in the shard; the book may be filed under another name
+                self.shard_fallbacks += 1
+                response = await asyncio.to_thread(self._query, query, None)
+        self.latency.record("retrieve", time.perf_counter() - started)
+        chunks = [chunk_record(context, self.distance_metric) for context in response.contexts.contexts]
+        if cache_key is not None:
+            self.cache.put(cache_key, chunks)
+        return chunks
+
+    async def run_async(self, *, args, tool_context):
+        chunks = await self.retrieve(args["query"], tool_context.state)
+        if self.packer is not None:
+            chunks = self.packer.pack(args["query"], chunks)
+        if not chunks:
+            return f"No matching result found with the config: {self.vertex_rag_store}"
+        return [chunk["text"] for chunk in chunks]
+
+    def stats(self):
+        return {
+            "backend": "vertex",
+            "rag_corpus": self.rag_corpus,
+            "builtin_retrieval": self.builtin_retrieval,
+            "version": self.version,
+            "shards": len(self._shards) if self._shards is not None else None,
+            "queries": self.queries,
+            "shard_searches": self.shard_searches,
+            "shard_fallbacks": self.shard_fallbacks,
+            "list_errors": self.list_errors,
+            "latency": self.latency.stats(),
+        }
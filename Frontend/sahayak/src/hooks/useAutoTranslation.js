@@ -79,26 +79,26 @@ export const useAutoTranslation = (options = {}) => {
         const texts = batch.map(node => node.textContent.trim());
 
         try {
-          const translatedTexts = await translationService.translateBatch(
-            texts, 
-            currentLanguage
-          );
-
-          // Apply translations
-          batch.forEach((node, index) => {
-            if (translatedTexts[index] && 
-                translatedTexts[index] !== texts[index] &&
-                node.parentElement) {
-              
-              // Store original text as data attribute
-              if (!node.parentElement.hasAttribute('data-original-text')) {
-                node.parentElement.setAttribute('data-original-text', texts[index]);
+          // Apply each translation as soon as it streams in
+          await translationService.translateBatchStream(
+            texts,
+            currentLanguage,
+            (index, translatedText) => {
+              const node = batch[index];
+              if (translatedText &&
+                  translatedText !== texts[index] &&
+                  node.parentElement) {
+                
+                // Store original text as data attribute
+                if (!node.parentElement.hasAttribute('data-original-text')) {
+                  node.parentElement.setAttribute('data-original-text', texts[index]);
+                }
+                
+                node.textContent = translatedText;
+                node.parentElement.setAttribute('data-translated', currentLanguage);
               }
-              
-              node.textContent = translatedTexts[index];
-              node.parentElement.setAttribute('data-translated', currentLanguage);
             }
-          });
+          );
 
           // Small delay between batches to avoid overwhelming the API
           if (i + batchSize < textNodes.length) {
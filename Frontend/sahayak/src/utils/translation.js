@@ -118,6 +118,74 @@ export class TranslationService {
     }
   }
 
+  // Streaming batch translation: onTranslated(index, translatedText) is called as soon as
+  // each text is ready, instead of waiting for the slowest text in the batch
+  async translateBatchStream(texts, targetLanguage, onTranslated, sourceLanguage = 'en') {
+    if (targetLanguage === 'en') {
+      return;
+    }
+
+    // Only send texts that need translation, remembering their position in the original batch
+    const indices = [];
+    const pendingTexts = [];
+    texts.forEach((text, index) => {
+      const cacheKey = `${text}_${sourceLanguage}_${targetLanguage}`;
+      if (!this.needsTranslation(text, targetLanguage)) {
+        return;
+      }
+      if (this.cache.has(cacheKey)) {
+        onTranslated(index, this.cache.get(cacheKey));
+        return;
+      }
+      indices.push(index);
+      pendingTexts.push(text);
+    });
+
+    if (pendingTexts.length === 0) {
+      return;
+    }
+
+    try {
+      const response = await fetch(`${this.baseURL}/api/translate-batch/stream`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+          texts: pendingTexts,
+          target_language: targetLanguage,
+          source_language: sourceLanguage
+        }),
+      });
+
+      if (!response.ok || !response.body) {
+        throw new Error(`Streaming translation API error: ${response.status}`);
+      }
+
+      // Parse NDJSON records as they arrive
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const record = JSON.parse(line);
+          if (record.done) continue;
+          const text = pendingTexts[record.index];
+          this.cache.set(`${text}_${sourceLanguage}_${targetLanguage}`, record.translated_text);
+          onTranslated(indices[record.index], record.translated_text);
+        }
+      }
+    } catch (error) {
+      console.error('Streaming translation error:', error);
+    }
+  }
+
   // Clear cache
   clearCache() {
     this.cache.clear();